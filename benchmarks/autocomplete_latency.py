@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Measure the latency of autocompletion while typing.
+
+Usage: autocomplete_latency.py [LINES ...]
+
+A recorded keystroke stream (see KEYSTROKES) is typed in generated scores
+of growing size (by default 200, 2000 and 10000 lines). After every
+keystroke the completions are computed like the completer does, and the
+median (p50), 95th percentile (p95) and maximum latency are printed,
+followed by the time spent in the most expensive analyzer test functions.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from frescobaldi_app import toplevel
+toplevel.install()
+
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QApplication
+
+
+# One score section, repeated to get a score of the desired size.
+SECTION = r"""
+%% section {0}
+melody{0} = \relative c'' {{
+  \clef treble \key g \major \time 3/4
+  g4 b8( a) g4 | d'2. \mark \markup {{ \bold "Fine" }}
+  \override Staff.TimeSignature.stencil = ##f
+  e8 fis g4 fis8 e | d2 r4 \bar "|."
+}}
+
+verse{0} = \lyricmode {{
+  Twin -- kle twin -- kle lit -- tle star, how I won -- der what you are.
+}}
+
+\score {{
+  <<
+    \new Staff = "melody{0}" \melody{0}
+    \new Lyrics \lyricsto "melody{0}" \verse{0}
+  >>
+  \layout {{ \context {{ \Staff \consists "Ambitus_engraver" }} }}
+}}
+"""
+
+# The keystrokes that are replayed, typed before the last line of the score.
+# Every character is a keystroke; the stream visits music, markup, scheme,
+# lyrics, \context and string contexts.
+KEYSTROKES = r"""
+newmelody = \relative c' {
+  \new Staff \with { \consists "Span_arpeggio_engraver" }
+  \override Voice.NoteHead.color = #red
+  \set Staff.instrumentName = \markup \italic "Flute"
+  c4 d e \tweak color #blue f | \clef bass g1
+  \mel
+}
+words = \lyricmode { Some more ly -- rics \markup \bold twin }
+"""
+
+
+def score(lines):
+    """Return the text of a generated score of approximately lines lines."""
+    count = max(1, lines // SECTION.count('\n'))
+    return '\\version "2.24.0"\n' + ''.join(
+        SECTION.format(i) for i in range(count))
+
+
+def percentile(values, p):
+    """Return the p-th percentile of the sorted list of values."""
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def replay(doc, analyzer):
+    """Type the keystrokes at the end of doc, return the sorted latencies."""
+    cursor = QTextCursor(doc)
+    cursor.movePosition(QTextCursor.End)
+    latencies = []
+    for char in KEYSTROKES:
+        cursor.insertText(char)
+        start = time.perf_counter()
+        analyzer.completions(QTextCursor(cursor))
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [200, 2000, 10000]
+    qapp = QApplication([])
+
+    import document
+    import autocomplete.analyzer
+
+    print("{0:>8} {1:>8} {2:>8} {3:>8} {4:>8}".format(
+        "lines", "keys", "p50 ms", "p95 ms", "max ms"))
+    for lines in sizes:
+        doc = document.EditorDocument()
+        doc.documentLayout()
+        doc.setPlainText(score(lines))
+        latencies = replay(doc, autocomplete.analyzer.Analyzer())
+        print("{0:8} {1:8} {2:8.2f} {3:8.2f} {4:8.2f}".format(
+            doc.blockCount(), len(latencies),
+            percentile(latencies, 50) * 1000,
+            percentile(latencies, 95) * 1000,
+            latencies[-1] * 1000))
+
+    print()
+    print("{0:<24} {1:>8} {2:>10} {3:>10}".format(
+        "function", "calls", "total ms", "max ms"))
+    for name, calls, total, maximum in autocomplete.analyzer.timings()[:10]:
+        print("{0:<24} {1:>8} {2:>10.2f} {3:>10.3f}".format(
+            name, calls, total * 1000, maximum * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Measure replacing a whole document with cursordiff.insert_text().
+
+Usage: cursordiff_apply.py [--difflib] [LINES ...]
+
+Generated scores of growing size (by default 1000, 5000 and 10000 lines)
+are transposed and reformatted, and the result replaces the whole document
+using cursordiff.insert_text(), like convert-ly and edit in place do.
+
+Printed are the time to compute the diff, the number of edits, and the time
+to apply them to the document. With --difflib, the time is also printed
+that difflib.SequenceMatcher needs for the same diff, like cursordiff did
+before (this can take very long for the larger sizes).
+"""
+
+import difflib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from frescobaldi_app import toplevel
+toplevel.install()
+
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QApplication
+
+
+# One score section, repeated to get a score of the desired size.
+SECTION = r"""
+melody{0} = \relative c'' {{
+  \key g \major \time 3/4
+  g4 b8( a) g4 | d'2. |
+e8 fis g4 fis8 e | d2 r4 |
+  {{ c4 e g }} <c e g>2 |
+      b4-. a-. g-. | fis2.\fermata \bar "|."
+}}
+"""
+
+
+def score(lines):
+    """Return the text of a generated score of approximately lines lines."""
+    count = max(1, lines // SECTION.count('\n'))
+    return '\\version "2.24.0"\n' + ''.join(
+        SECTION.format(chr(ord('A') + i % 26) * (1 + i // 26))
+        for i in range(count))
+
+
+def transposed(text):
+    """Return the text transposed a major second up."""
+    import ly.document
+    import ly.pitch
+    import ly.pitch.transpose
+    doc = ly.document.Document(text)
+    transposer = ly.pitch.transpose.Transposer(
+        ly.pitch.Pitch(0), ly.pitch.Pitch(1))
+    ly.pitch.transpose.transpose(ly.document.Cursor(doc), transposer)
+    return doc.plaintext()
+
+
+def reformatted(text):
+    """Return the text reformatted."""
+    import ly.document
+    import ly.indent
+    import ly.reformat
+    doc = ly.document.Document(text)
+    ly.reformat.reformat(ly.document.Cursor(doc), ly.indent.Indenter())
+    return doc.plaintext()
+
+
+def measure(func, *args):
+    """Return the result of func(*args) and the time it took in msec."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    args = sys.argv[1:]
+    use_difflib = '--difflib' in args
+    sizes = [int(arg) for arg in args if arg != '--difflib'] or [1000, 5000, 10000]
+    qapp = QApplication([])
+
+    import cursordiff
+    import document
+
+    print("{0:>10} {1:>8} {2:>10} {3:>8} {4:>10} {5:>12}".format(
+        "operation", "lines", "diff ms", "edits", "apply ms", "difflib ms"))
+    for lines in sizes:
+        text = score(lines)
+        for name, func in (('transpose', transposed), ('reformat', reformatted)):
+            new = func(text)
+            edits, diff_time = measure(list, cursordiff.diff(text, new))
+            doc = document.EditorDocument()
+            doc.setPlainText(text)
+            cursor = QTextCursor(doc)
+            cursor.select(QTextCursor.Document)
+            dummy, apply_time = measure(cursordiff.insert_text, cursor, new)
+            assert doc.toPlainText() == new
+            difflib_time = float('nan')
+            if use_difflib:
+                matcher = difflib.SequenceMatcher(None, text, new)
+                dummy, difflib_time = measure(matcher.get_opcodes)
+            print("{0:>10} {1:8} {2:10.1f} {3:8} {4:10.1f} {5:12.1f}".format(
+                name, doc.blockCount(), diff_time, len(edits), apply_time,
+                difflib_time))
+
+
+if __name__ == '__main__':
+    main()
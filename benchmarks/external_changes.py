@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Measure checking documents that were changed on disk by another program.
+
+Usage: external_changes.py [FILES [MB]]
+
+A number of files (by default 20) of a certain size (by default 5 MB) are
+opened as documents and marked changed on disk, like after switching a
+branch in git. A third of them really changes, a third changes in size and
+the rest stays the same.
+
+Printed are the time the old check spent in the main thread comparing the
+files with the encoded text of the documents, the time checkChangedDocuments()
+spends in the main thread, and the time until its result is available.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from frescobaldi_app import toplevel
+toplevel.install()
+
+from PyQt5.QtCore import QEventLoop, QTimer, QUrl
+from PyQt5.QtWidgets import QApplication
+
+
+LINE = "\\relative { c'4 d e f | g2 g | a4 a a a | g1 }\n"
+
+
+def old_check(docs):
+    """Compare the files with the encoded documents, like before."""
+    for d in docs:
+        with open(d.url().toLocalFile(), 'rb') as diskfile:
+            diskfile.read() == d.encodedText()
+
+
+def main():
+    args = sys.argv[1:]
+    count = int(args[0]) if args else 20
+    size = float(args[1]) if len(args) > 1 else 5
+    qapp = QApplication([])
+
+    import document
+    import documentwatcher
+    import externalchanges
+
+    shown = []
+    externalchanges.display = shown.append
+
+    with tempfile.TemporaryDirectory() as directory:
+        docs = []
+        for i in range(count):
+            filename = os.path.join(directory, "file{0}.ly".format(i))
+            with open(filename, 'w') as f:
+                f.write(LINE * int(size * 1e6 / len(LINE)))
+            docs.append(document.EditorDocument.new_from_url(
+                QUrl.fromLocalFile(filename)))
+        for i, d in enumerate(docs):
+            with open(d.url().toLocalFile(), 'r+') as f:
+                if i % 3 == 0:
+                    f.write('%')
+                elif i % 3 == 1:
+                    f.seek(0, 2)
+                    f.write('%')
+            documentwatcher.DocumentWatcher.instance(d).changed = True
+
+        start = time.perf_counter()
+        old_check(docs)
+        old_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        externalchanges.checkChangedDocuments()
+        main_time = time.perf_counter() - start
+        loop = QEventLoop()
+        def poll():
+            if shown:
+                loop.quit()
+            else:
+                QTimer.singleShot(1, poll)
+        poll()
+        loop.exec_()
+        total_time = time.perf_counter() - start
+
+        print("{0} files of {1} MB, {2} changed".format(
+            count, size, len(shown[0])))
+        print("old check:        {0:10.1f} ms".format(old_time * 1000))
+        print("new, main thread: {0:10.1f} ms".format(main_time * 1000))
+        print("new, until done:  {0:10.1f} ms".format(total_time * 1000))
+        for d in docs:
+            d.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Compare loading MIDI files as a Song and as a TableSong.
+
+Usage: midi_parser.py [FILE ...]
+
+Without arguments, a large MIDI file (16 tracks of 50000 notes each, with
+tempo and time signature changes) is generated and used.
+
+For both paths the time needed to load the song, the time needed to load
+it and create the events for the player ("play"), and the memory used by
+the loaded song are printed.
+"""
+
+import os
+import struct
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from frescobaldi_app import toplevel
+toplevel.install()
+
+import midifile.parser
+import midifile.song
+
+
+def var_len(value):
+    """Return the MIDI variable-length encoding of value."""
+    result = [value & 0x7F]
+    value >>= 7
+    while value:
+        result.insert(0, (value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(result)
+
+
+def generate(ntracks=16, notes=50000):
+    """Return the bytes of a generated type 1 MIDI file."""
+    tracks = []
+    for n in range(ntracks):
+        track = bytearray()
+        if n == 0:
+            for i in range(notes // 100):
+                track += var_len(0 if i == 0 else 100 * 384)
+                track += b'\xff\x51\x03' + struct.pack('>i', 400000 + i * 1000)[1:]
+                track += b'\x00\xff\x58\x04' + bytes((3 + i % 3, 2, 24, 8))
+        else:
+            channel = n % 16
+            for i in range(notes):
+                track += b'\x00' + bytes((0x90 | channel, 40 + i % 40, 80))
+                track += var_len(384) + bytes((0x80 | channel, 40 + i % 40, 0))
+        track += b'\x00\xff\x2f\x00'
+        tracks.append(b'MTrk' + struct.pack('>i', len(track)) + bytes(track))
+    header = b'MThd' + struct.pack('>ihhh', 6, 1, ntracks, 384)
+    return header + b''.join(tracks)
+
+
+def measure(cls, division, tracks):
+    """Load the tracks and return (seconds, play seconds, bytes, song)."""
+    start = time.perf_counter()
+    song = cls(division, tracks)
+    seconds = time.perf_counter() - start
+    song.music
+    play_seconds = time.perf_counter() - start
+    tracemalloc.start()
+    song = cls(division, tracks)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return seconds, play_seconds, size, song
+
+
+def main():
+    if sys.argv[1:]:
+        files = [(f, open(f, 'rb').read()) for f in sys.argv[1:]]
+    else:
+        files = [("generated", generate())]
+    print("{0:>8} {1:>8} {2:>8} {3:>8} {4:>8} {5:>8}  {6}".format(
+        "song s", "table s", "play", "play", "song MB", "table MB", "file"))
+    for name, data in files:
+        fmt, division, tracks = midifile.parser.parse_midi_data(data)
+        if fmt == 2:
+            tracks = tracks[:1]
+        song_time, song_play, song_mem, song = measure(
+            midifile.song.Song, division, tracks)
+        table_time, table_play, table_mem, table = measure(
+            midifile.song.TableSong, division, tracks)
+        if (song.beats != table.beats or song.length != table.length
+                or song.tempo_map.times != table.tempo_map.times):
+            print("MISMATCH:", name)
+        print("{0:8.3f} {1:8.3f} {2:8.3f} {3:8.3f} {4:8.1f} {5:8.1f}  {6}".format(
+            song_time, table_time, song_play, table_play,
+            song_mem / 1e6, table_mem / 1e6, name))
+
+
+if __name__ == '__main__':
+    main()
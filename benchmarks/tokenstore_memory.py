@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Compare the memory used by tuples of Tokens and by TokenStores.
+
+Usage: tokenstore_memory.py [FILE ...]
+
+Without arguments, the LilyPond files shipped with Frescobaldi are used
+as corpus.
+"""
+
+import glob
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from frescobaldi_app import toplevel
+toplevel.install()
+
+import ly.lex
+import tokenstore
+
+
+def corpus():
+    """Return the default list of files to measure."""
+    base = os.path.join(os.path.dirname(__file__), '..', 'frescobaldi_app')
+    return sorted(glob.glob(os.path.join(base, '**', '*.ly'), recursive=True)
+                + glob.glob(os.path.join(base, '**', '*.ily'), recursive=True))
+
+
+def main():
+    files = sys.argv[1:] or corpus()
+    total = dict(lines=0, tokens=0, tuple=0, store=0)
+    print("{0:>8} {1:>8} {2:>10} {3:>10} {4:>6}  {5}".format(
+        "lines", "tokens", "tuple", "store", "ratio", "file"))
+    for filename in files:
+        with open(filename, encoding='utf-8', errors='replace') as f:
+            text = f.read()
+        report = tokenstore.memory_report(text, ly.lex.guessState(text))
+        for k in total:
+            total[k] += report[k]
+        print("{lines:8} {tokens:8} {tuple:10} {store:10} {ratio:6.2f}  {file}".format(
+            ratio=report['tuple'] / max(1, report['store']),
+            file=os.path.relpath(filename), **report))
+    print("{lines:8} {tokens:8} {tuple:10} {store:10} {ratio:6.2f}  total".format(
+        ratio=total['tuple'] / max(1, total['store']), **total))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Measure reading the document variables of large documents.
+
+Usage: variables_scan.py [LINES ...]
+
+For generated documents of growing size (by default 10000, 100000 and
+500000 lines), the time is printed to read the variables from the text
+(like when loading or saving a file) by splitting the whole text into
+lines, like Frescobaldi did before, and with variables.variables().
+
+Then keystrokes are typed in the middle and at the end of a document, and
+the time is printed the VariableManager spends per keystroke to keep the
+variables up to date.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from frescobaldi_app import toplevel
+toplevel.install()
+
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QApplication
+
+
+HEAD = "% -*- mode: lilypond; coding: utf-8; tab-width: 4;\n"
+LINE = "  c'4 d' e' f' | g'2 g' | a'4 a' a' a' | g'1 |\n"
+TAIL = "% -*- indent-tabs: false; document-tabs: true;"
+
+REPEAT = 20     # how many times a measurement is repeated
+KEYSTROKES = 200
+
+
+def splitlines_variables(text):
+    """Read the variables by splitting the whole text, like before."""
+    import variables
+    lines = text.splitlines()
+    start, count = 0, len(lines)
+    d = {}
+    if count > 2 * variables._LINES:
+        d.update(m.group(1, 2)
+                 for n, m in variables.positions(lines[:variables._LINES]))
+        start = count - variables._LINES
+    d.update(m.group(1, 2) for n, m in variables.positions(lines[start:]))
+    return d
+
+
+def measure(func, *args):
+    """Return the shortest time in msec of REPEAT calls of func(*args)."""
+    best = float('inf')
+    for i in range(REPEAT):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def typing(doc, position):
+    """Return the msec per keystroke to keep the variables up to date."""
+    import variables
+    manager = variables.manager(doc)
+    cursor = QTextCursor(doc)
+    cursor.setPosition(position)
+    start = time.perf_counter()
+    for i in range(KEYSTROKES):
+        cursor.insertText("c")
+        manager.variables()
+    return (time.perf_counter() - start) * 1000 / KEYSTROKES
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 500000]
+    qapp = QApplication([])
+
+    import document
+    import variables
+
+    print("{0:>8} {1:>8} {2:>12} {3:>12} {4:>10} {5:>10}".format(
+        "lines", "MB", "split ms", "headtail ms", "middle ms", "end ms"))
+    for lines in sizes:
+        text = HEAD + LINE * lines + TAIL
+        assert splitlines_variables(text) == variables.variables(text)
+        doc = document.EditorDocument()
+        doc.setPlainText(text)
+        print("{0:8} {1:8.1f} {2:12.3f} {3:12.3f} {4:10.4f} {5:10.4f}".format(
+            doc.blockCount(), len(text) / 1e6,
+            measure(splitlines_variables, text),
+            measure(variables.variables, text),
+            typing(doc, len(text) // 2),
+            typing(doc, doc.characterCount() - 1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -40,6 +40,7 @@ if importlib.util.find_spec('PyQt5.QtWebEngineWidgets'):
 ### end needed for QWebEngine
 
 import appinfo
+import startupprofile
 
 qApp = None                     # instantiate() puts the QApplication obj. here
 windows = []
@@ -85,11 +86,15 @@ def activeWindow():
 def openUrl(url, encoding=None):
     """Returns a Document instance for the given QUrl.
 
-    If there is already a document with that url, it is returned.
+    If there is already a document with that url, it is returned (and
+    loaded if it was lazy). An IOError is raised if the document can't be
+    loaded.
 
     """
     d = findDocument(url)
-    if not d:
+    if d:
+        d.loadLazy()
+    else:
         # special case if there is only one document:
         # if that is empty and unedited, use it.
         if (len(documents) == 1
@@ -120,6 +125,9 @@ def findDocument(url):
 def instantiate():
     """Instantiate the global QApplication object."""
     global qApp
+    if '--engrave' in sys.argv[1:]:
+        # engraving from the command line does not need a display
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
     args = list(map(os.fsencode, [os.path.abspath(sys.argv[0])] + sys.argv[1:]))
     if platform.system() == "Windows":
         args.append("-platform") 
@@ -143,10 +151,11 @@ def oninit(func):
     decorator.
 
     """
+    timed = startupprofile.timed_init(func)
     if qApp:
-        func()
+        timed()
     else:
-        appInstantiated.connect(func)
+        appInstantiated.connect(timed)
     return func
 
 def run():
@@ -265,8 +274,6 @@ def job_queue():
     global _job_queue
     if _job_queue is None:
         import job.queue
-        #TODO: save the number of runners in the Preferences
-        #NOTE: Provide code for *changing* the number of runners
         _job_queue = job.queue.GlobalJobQueue()
     return _job_queue
 
@@ -68,6 +68,14 @@ class CompleterManager(plugin.MainWindowPlugin):
 app.mainwindowCreated.connect(CompleterManager.instance)
 
 
+@app.documentLoaded.connect
+def _document_loaded(doc):
+    """Start harvesting the words of a loaded document in the background."""
+    if QSettings().value("autocomplete", True, bool):
+        from . import wordindex
+        wordindex.index(doc)
+
+
 class Actions(actioncollection.ActionCollection):
     name = 'autocomplete'
     def createActions(self, parent):
@@ -24,6 +24,7 @@ Analyze text to determine suitable completions.
 
 import re
 import os
+import time
 
 import ly.lex as lx
 import ly.lex.lilypond as lp
@@ -35,6 +36,26 @@ from . import completiondata
 from . import documentdata
 
 
+# the time spent in the test functions: name -> [calls, seconds, max seconds]
+_timings = {}
+
+
+def timings():
+    """Return a list of (name, calls, seconds, max_seconds) tuples.
+
+    The tuples describe the time spent in every test function of the
+    Analyzer, the most expensive function first.
+
+    """
+    return sorted(((name, c, t, m) for name, (c, t, m) in _timings.items()),
+                  key=lambda i: i[2], reverse=True)
+
+
+def reset_timings():
+    """Forget the time spent in the test functions."""
+    _timings.clear()
+
+
 class Analyzer(object):
     """Analyzes text at some cursor position and gives suitable completions."""
     def analyze(self, cursor):
@@ -72,7 +93,16 @@ class Analyzer(object):
             return
         else:
             for function in tests:
+                t = time.perf_counter()
                 model = function(self)
+                t = time.perf_counter() - t
+                try:
+                    timing = _timings[function.__name__]
+                except KeyError:
+                    timing = _timings[function.__name__] = [0, 0.0, 0.0]
+                timing[0] += 1
+                timing[1] += t
+                timing[2] = max(timing[2], t)
                 if model:
                     self.model = model
                     return
@@ -0,0 +1,139 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Keeps information harvested from the tokens of every text block.
+
+When the document changes, only the changed blocks are harvested again, and
+the blocks after them of which the highlighter changed the tokens (e.g.
+because a string was opened).
+
+"""
+
+
+import cursortools
+import plugin
+import tokeniter
+
+
+class BlockIndex(plugin.DocumentPlugin):
+    """Base class for information harvested per text block.
+
+    Implement harvest() to return the information for the tokens of a block.
+    The information of all blocks is in the _items list, a block that is not
+    harvested yet has None.
+
+    """
+    def __init__(self, document):
+        document.contentsChange.connect(self.slotContentsChange)
+        self._items = []
+        self.reset()
+
+    def reset(self):
+        """Forget all harvested blocks."""
+        self.forget(self._items)
+        n = self.document().blockCount()
+        self._keys = [None] * n     # the lexer key of every harvested block
+        self._items = [None] * n    # the harvested information per block
+        self._dirty = set(range(n)) # the numbers of the blocks to harvest
+        self.changed()
+
+    def slotContentsChange(self, position, removed, added):
+        """Called when the document changes, marks the changed blocks."""
+        doc = self.document()
+        end = min(position + added, doc.characterCount() - 1)
+        first = doc.findBlock(position).blockNumber()
+        last = doc.findBlock(end).blockNumber()
+        old_last = last + len(self._keys) - doc.blockCount()
+        if first < 0 or last < first or old_last < first - 1:
+            # should not happen, just harvest everything again
+            self.reset()
+            return
+        count = last - first + 1
+        self.forget(self._items[first:old_last+1])
+        self._keys[first:old_last+1] = [None] * count
+        self._items[first:old_last+1] = [None] * count
+        delta = last - old_last
+        self._dirty = set(b if b < first else b + delta
+                          for b in self._dirty if not first <= b <= old_last)
+        self._dirty.update(range(first, last + 1))
+        self.changed()
+
+    def isDirty(self):
+        """Return True if there are blocks that need to be harvested."""
+        return bool(self._dirty)
+
+    def update(self, count=-1):
+        """Harvest the blocks that changed.
+
+        If count is given, stop after that number of blocks have been
+        harvested and return False if there are still blocks left.
+
+        """
+        doc = self.document()
+        if self._keys and self._keys[0] is not None:
+            # if the highlighter started a new generation (e.g. the mode
+            # changed), all tokens may be different
+            key = getattr(cursortools.data(doc.firstBlock()), 'lexkey', None)
+            if key is not None and key[0] != self._keys[0][0]:
+                self._dirty.update(range(doc.blockCount()))
+        if not self._dirty:
+            return True
+        self.changed()
+        keys, items = self._keys, self._items
+        for num in sorted(self._dirty):
+            block = doc.findBlockByNumber(num)
+            while block.isValid():
+                if not count:
+                    self._dirty.add(block.blockNumber())
+                    return False
+                num = block.blockNumber()
+                tokens = tokeniter.tokens(block)
+                key = getattr(cursortools.data(block), 'lexkey', None)
+                if num not in self._dirty and key == keys[num]:
+                    break
+                if items[num] is not None:
+                    self.forget((items[num],))
+                keys[num] = key
+                items[num] = self.harvest(tokens)
+                self._dirty.discard(num)
+                block = block.next()
+                count -= 1
+        return True
+
+    def harvest(self, tokens):
+        """Implement to return the information for the tokens of a block."""
+        raise NotImplementedError
+
+    def forget(self, items):
+        """Called with the items of blocks that are removed or harvested again.
+
+        Items of blocks that are not harvested are None. The default
+        implementation does nothing.
+
+        """
+        pass
+
+    def changed(self):
+        """Called when the document changed or blocks are harvested.
+
+        The default implementation does nothing.
+
+        """
+        pass
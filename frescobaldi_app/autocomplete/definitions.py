@@ -0,0 +1,99 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Keeps the identifier definitions and include commands of a Document.
+
+The definitions are stored per text block, see the blockindex module.
+
+"""
+
+
+import itertools
+
+import ly.lex
+import ly.lex.lilypond
+
+from . import blockindex
+
+
+def index(document):
+    """Return the DefinitionsIndex for the specified Document."""
+    return DefinitionsIndex.instance(document)
+
+
+class DefinitionsIndex(blockindex.BlockIndex):
+    """The identifier definitions and include commands per text block.
+
+    For every block a tuple (name, include_args) is stored.
+
+    """
+    def harvest(self, tokens):
+        """Return the defined name (or None) and the \\include arguments."""
+        return definition(tokens), tuple(include_args(tokens))
+
+    def changed(self):
+        """Reimplemented to clear the cached results."""
+        self._cache = {}
+
+    def names(self, position):
+        """Return the sorted list of identifiers defined until position."""
+        self.update()
+        num = self.document().findBlock(position).blockNumber() + 1
+        try:
+            return self._cache['names', num]
+        except KeyError:
+            result = self._cache['names', num] = sorted(
+                set(filter(None, (item[0] for item in self._items[:num]))))
+            return result
+
+    def include_args(self, position):
+        """Return the list of \\include arguments until position."""
+        self.update()
+        num = self.document().findBlock(position).blockNumber() + 1
+        try:
+            return self._cache['includes', num]
+        except KeyError:
+            result = self._cache['includes', num] = list(
+                itertools.chain.from_iterable(
+                    item[1] for item in self._items[:num]))
+            return result
+
+
+def definition(tokens):
+    """Return the identifier defined in the tokens of a line, if any.
+
+    Like ly.docinfo.DocInfo.definitions(), a Name at the beginning of a line
+    is regarded as a definition.
+
+    """
+    if tokens and isinstance(tokens[0], ly.lex.lilypond.Name):
+        return str(tokens[0])
+
+
+def include_args(tokens):
+    """Yield the arguments of \\include commands in the tokens of a line."""
+    tokens = iter(tokens)
+    for t in tokens:
+        if t == "\\include" and isinstance(t, ly.lex.lilypond.Keyword):
+            for t in tokens:
+                if not isinstance(t, (ly.lex.Space, ly.lex.Comment)):
+                    if t == '"':
+                        yield ''.join(itertools.takewhile(lambda t: t != '"', tokens))
+                    break
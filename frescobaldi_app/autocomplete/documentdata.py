@@ -33,6 +33,7 @@ import ly.data
 from . import completiondata
 from . import harvest
 from . import util
+from . import wordindex
 
 
 def doc(document):
@@ -44,29 +45,29 @@ class DocumentDataSource(plugin.DocumentPlugin):
     @util.keep
     def words(self):
         """Returns the list of words in comments, markup etc."""
-        return listmodel.ListModel(
-            sorted(set(harvest.words(self.document()))))
+        wordindex.index(self.document())
+        return listmodel.ListModel(wordindex.words.words())
 
     @util.keep
     def schemewords(self):
-        """Scheme names, including those harvested from document."""
+        """Scheme names, including those harvested from documents."""
+        wordindex.index(self.document())
         schemewords = set(itertools.chain(
             ly.data.all_scheme_words(),
-            (str(t)
-                for t in harvest.schemewords(self.document())
-                if len(t) > 2),
+            wordindex.schemewords.words(),
             ))
         return listmodel.ListModel(sorted(schemewords))
 
     @util.keep
     def markup(self, cursor):
         """Completes markup commands and normal text from the document."""
+        wordindex.index(self.document())
         return listmodel.ListModel(
             ['\\' + w for w in sorted(ly.words.markupcommands)]
             + [ '\\' + w for w in sorted(set(itertools.chain(
                 harvest.markup_commands(cursor),
                 harvest.include_markup_commands(cursor))))]
-            + sorted(set(harvest.words(self.document()))))
+            + wordindex.words.words())
 
     @util.keep
     def scorecommands(self, cursor):
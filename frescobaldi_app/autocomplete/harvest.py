@@ -31,6 +31,8 @@ import tokeniter
 import ly.lex.lilypond
 import ly.lex.scheme
 
+from . import definitions
+
 
 def get_docinfo(cursor):
     """Return a ly DocInfo instance for the cursor's document up to its position."""
@@ -40,7 +42,7 @@ def get_docinfo(cursor):
 
 def names(cursor):
     """Harvests names from assignments until the cursor."""
-    return get_docinfo(cursor).definitions()
+    return definitions.index(cursor.document()).names(cursor.position())
 
 
 def markup_commands(cursor):
@@ -57,8 +59,11 @@ def schemewords(document):
 
 def include_identifiers(cursor):
     """Harvests identifier definitions from included files."""
-    dinfo = documentinfo.info(cursor.document())
-    files = fileinfo.includefiles(get_docinfo(cursor), dinfo.includepath())
+    doc = cursor.document()
+    dinfo = documentinfo.info(doc)
+    args = definitions.index(doc).include_args(cursor.position())
+    files = fileinfo.find_includefiles(doc.url().toLocalFile(), args,
+                                       dinfo.includepath())
     return itertools.chain.from_iterable(fileinfo.docinfo(f).definitions()
                                          for f in files)
 
@@ -0,0 +1,165 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Harvests words from all open documents for autocompletion.
+
+The words in strings, lyrics, markup and comments, and the scheme words are
+harvested per text block when the application is idle, and merged in two
+global WordSets that are shared by all open documents.
+
+"""
+
+
+import bisect
+import collections
+
+from PyQt5.QtCore import QTimer
+
+import app
+import ly.lex.scheme
+
+from . import blockindex
+from . import harvest
+
+
+# number of blocks harvested at a time
+CHUNK_SIZE = 200
+
+# wait this many msec after a change before harvesting
+IDLE_DELAY = 500
+
+
+class WordSet(object):
+    """A sorted set of words, that counts how often every word was added."""
+    def __init__(self):
+        self._counts = collections.Counter()
+        self._words = []
+        self._list = None
+
+    def add(self, words):
+        """Add the words."""
+        for w in words:
+            if not self._counts[w]:
+                bisect.insort(self._words, w)
+                self._list = None
+            self._counts[w] += 1
+
+    def discard(self, words):
+        """Remove the words once, a word disappears if its count drops to 0."""
+        for w in words:
+            self._counts[w] -= 1
+            if not self._counts[w]:
+                del self._counts[w]
+                del self._words[bisect.bisect_left(self._words, w)]
+                self._list = None
+
+    def __contains__(self, word):
+        return word in self._counts
+
+    def __len__(self):
+        return len(self._words)
+
+    def words(self):
+        """Return the sorted list of words.
+
+        The same list is returned until the set changes, do not alter it.
+
+        """
+        if self._list is None:
+            self._list = list(self._words)
+        return self._list
+
+    def startswith(self, prefix):
+        """Return the sorted list of words starting with prefix."""
+        i = bisect.bisect_left(self._words, prefix)
+        j = bisect.bisect_left(self._words, prefix + '\uffff', i)
+        return self._words[i:j]
+
+
+# the global sets
+words = WordSet()
+schemewords = WordSet()
+
+
+def index(document):
+    """Return the WordIndex for the specified Document."""
+    return WordIndex.instance(document)
+
+
+class WordIndex(blockindex.BlockIndex):
+    """Harvests the words of a Document in the background.
+
+    For every block a tuple (words, schemewords) is stored, both are tuples
+    of unique words. The words are added to the global WordSets.
+
+    """
+    def __init__(self, document):
+        self._timer = QTimer(singleShot=True, timeout=self.slotTimeout)
+        super(WordIndex, self).__init__(document)
+
+    def harvest(self, tokens):
+        """Return the words and scheme words in the tokens of a block."""
+        w = set()
+        s = set()
+        for t in tokens:
+            if isinstance(t, harvest._word_types):
+                w.update(m.group() for m in harvest._words(t))
+            elif type(t) is ly.lex.scheme.Word and len(t) > 2:
+                s.add(str(t))
+        w, s = tuple(w), tuple(s)
+        words.add(w)
+        schemewords.add(s)
+        return w, s
+
+    def forget(self, items):
+        """Remove the words of the items from the global WordSets."""
+        for item in items:
+            if item is not None:
+                words.discard(item[0])
+                schemewords.discard(item[1])
+
+    def changed(self):
+        """Reimplemented to harvest changed blocks when idle."""
+        if self.isDirty():
+            self._timer.start(IDLE_DELAY)
+
+    def slotTimeout(self):
+        """Harvest a chunk of blocks."""
+        if self.update(CHUNK_SIZE):
+            self._timer.stop()
+        else:
+            self._timer.start(0)
+
+    def close(self):
+        """Stop harvesting and remove our words from the global WordSets."""
+        self._timer.stop()
+        self.document().contentsChange.disconnect(self.slotContentsChange)
+        self.forget(self._items)
+        self._items = [None] * len(self._items)
+        self._keys = [None] * len(self._keys)
+        self._dirty.clear()
+
+
+@app.documentClosed.connect
+def _document_closed(doc):
+    for i in WordIndex.instances():
+        if i.document() is doc:
+            i.close()
+            break
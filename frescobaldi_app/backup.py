@@ -31,12 +31,28 @@ from PyQt5.QtCore import QSettings
 def backup(filename):
     """Makes a backup of 'filename'.
 
+    The backup is a hard link to the file if possible. This is safe because
+    documents are saved by replacing the file with a new one (see
+    document.write_file()), so the backup keeps the old contents. If a hard
+    link can't be made, the file is copied.
+
     Returns True if the backup succeeded.
 
     """
     if filename:
+        name = backupName(filename)
+        target = os.path.realpath(filename)
+        try:
+            try:
+                os.link(target, name)
+            except FileExistsError:
+                os.remove(name)
+                os.link(target, name)
+            return True
+        except (IOError, OSError):
+            pass
         try:
-            shutil.copy(filename, backupName(filename))
+            shutil.copy(filename, name)
             return True
         except (IOError, OSError):
             pass
@@ -0,0 +1,169 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Engrave files from the command line, without opening a window.
+
+This is used by the --engrave command line option. The files are engraved
+using the same machinery as in the GUI: the include path, automatic
+LilyPond version selection and the -d options from the preferences are
+used. The jobs are run in parallel in a job.queue.JobQueue.
+
+When all jobs are done, a summary in JSON format is written, containing
+the timings and the result of every job.
+
+"""
+
+
+import glob
+import json
+import os
+import sys
+import time
+
+from PyQt5.QtCore import QUrl
+
+import app
+import document
+import job
+import job.cache
+import job.lilypond
+import job.queue
+
+
+def find_files(args):
+    """Yield the LilyPond files specified by the paths and glob patterns.
+
+    Directories are searched recursively for *.ly files.
+
+    """
+    seen = set()
+    for arg in args:
+        names = glob.glob(arg, recursive=True) if glob.has_magic(arg) else [arg]
+        for name in sorted(names):
+            if os.path.isdir(name):
+                files = sorted(glob.glob(os.path.join(name, '**', '*.ly'), recursive=True))
+            else:
+                files = [name]
+            for filename in files:
+                filename = os.path.abspath(filename)
+                if filename not in seen:
+                    seen.add(filename)
+                    yield filename
+
+
+class BatchEngraver(object):
+    """Engraves a list of files in a JobQueue and collects the results."""
+    def __init__(self, files, mode='publish', num_runners=None, verbose=False):
+        self.files = files
+        self.mode = mode
+        self.verbose = verbose
+        if num_runners is None:
+            num_runners = job.queue.num_runners()['engrave']
+        self.queue = job.queue.JobQueue(
+            queue_mode=job.queue.QueueMode.SINGLE,
+            num_runners=num_runners)
+        self.queue.finished.connect(self.slotFinished)
+        self.queue.job_done.connect(self.slotJobDone)
+        self.results = []
+        self._starttime = 0.0
+        self._elapsed = 0.0
+
+    def start(self):
+        """Create the jobs and start the queue."""
+        self._starttime = time.time()
+        job_class = (job.lilypond.PreviewJob if self.mode == 'preview'
+                     else job.lilypond.PublishJob)
+        count = 0
+        for filename in self.files:
+            try:
+                doc = document.Document.new_from_url(QUrl.fromLocalFile(filename))
+            except (OSError, IOError) as e:
+                self.results.append({
+                    'file': filename,
+                    'success': False,
+                    'error': e.strerror or str(e),
+                    'time': 0.0,
+                    'output': [],
+                })
+                continue
+            self.queue.add_job(job_class(doc))
+            count += 1
+        if count:
+            self.queue.start()
+        else:
+            self.slotFinished()
+
+    def slotJobDone(self, j):
+        """Called when a job has finished."""
+        result = {
+            'file': j.filename(),
+            'success': bool(j.success),
+            'time': round(j.elapsed_time(), 3),
+            'command': j.command,
+            'output': job.cache.result_files(j) if j.success else [],
+        }
+        if not j.success:
+            result['error'] = j.stderr()[-2000:]
+        self.results.append(result)
+        if self.verbose:
+            sys.stderr.write(j.stderr())
+        sys.stderr.write("[{0}/{1}] {2} {3} ({4})\n".format(
+            len(self.results), len(self.files),
+            "ok" if j.success else "FAILED",
+            j.filename(), j.elapsed2str(j.elapsed_time())))
+
+    def slotFinished(self):
+        """Called when the queue has finished."""
+        self._elapsed = time.time() - self._starttime
+        app.qApp.quit()
+
+    def failed(self):
+        """Return the number of failed files."""
+        return sum(1 for r in self.results if not r['success'])
+
+    def summary(self):
+        """Return a dictionary with the summary of the run."""
+        return {
+            'files': len(self.files),
+            'succeeded': len(self.results) - self.failed(),
+            'failed': self.failed(),
+            'runners': self.queue.num_runners(),
+            'time': round(self._elapsed, 3),
+            'jobs': self.results,
+        }
+
+
+def run(args):
+    """Engrave the files given on the command line and return an exit code."""
+    files = list(find_files(args.files))
+    if not files:
+        sys.stderr.write(_("No files to engrave.") + '\n')
+        return 2
+    engraver = BatchEngraver(files, args.engrave_mode, args.jobs, args.verbose)
+    engraver.start()
+    if engraver.queue.is_running():
+        app.qApp.exec_()
+    summary = json.dumps(engraver.summary(), indent=2)
+    if args.summary and args.summary != '-':
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            f.write(summary + '\n')
+    else:
+        sys.stdout.write(summary + '\n')
+    return 1 if engraver.failed() else 0
@@ -22,15 +22,30 @@ Replaces selected text of a QTextCursor without erasing all the other
 QTextCursor instances that exist in the selected range.
 
 This is done by making a diff between the existing selection and the replacing
-text, and applying that diff.
+text, and applying that diff. The diff is made per line first, then per word,
+so it is also fast for large texts.
 """
 
 
+import bisect
 import difflib
+import itertools
+import re
 
 import cursortools
 
 
+# pieces of text (or lists of items) up to this length are compared using
+# difflib.SequenceMatcher without its junk heuristic
+_SMALL = 200
+
+# longer pieces are compared with the junk heuristic, in chunks of at most
+# this length
+_LARGE = 2000
+
+_words = re.compile(r'\w+|\s+|[^\w\s]').findall
+
+
 def insert_text(cursor, text):
     """Replaces selected text of a QTextCursor.
 
@@ -47,14 +62,11 @@ def insert_text(cursor, text):
     new_pos = start + len(text)
 
     old = cursor.selection().toPlainText()
-    diff = difflib.SequenceMatcher(None, old, text).get_opcodes()
 
-    # make a list of edits
-    edits = sorted(
-        ((start + i1, start + i2, text[j1:j2])
-         for tag, i1, i2, j1, j2 in diff
-         if tag != 'equal'),
-        reverse = True)
+    # make a list of edits, the last edit first
+    edits = [(start + i1, start + i2, text[j1:j2])
+             for i1, i2, j1, j2 in diff(old, text)]
+    edits.reverse()
 
     # perform the edits
     with cursortools.compress_undo(cursor):
@@ -65,3 +77,159 @@ def insert_text(cursor, text):
     cursor.setPosition(new_pos)
 
 
+def diff(old, new):
+    """Yield tuples (i1, i2, j1, j2) describing how to change old into new.
+
+    Every tuple means that old[i1:i2] is to be replaced with new[j1:j2], the
+    tuples are yielded in ascending order.
+
+    The texts are first compared per line, changed lines per word, and the
+    changed words per character, so that the diff remains fast for large
+    texts.
+
+    """
+    a, b = old.splitlines(True), new.splitlines(True)
+    a_pos, b_pos = _offsets(a), _offsets(b)
+    for i1, i2, j1, j2 in _changes(a, b):
+        if i2 - i1 == j2 - j1:
+            # probably every line has been changed, compare them one by one
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                yield from _diff_words(a[i], b[j], a_pos[i], b_pos[j])
+        else:
+            yield from _diff_words(old[a_pos[i1]:a_pos[i2]],
+                new[b_pos[j1]:b_pos[j2]], a_pos[i1], b_pos[j1])
+
+
+def _diff_words(old, new, old_pos, new_pos):
+    """Yield the changes between old and new, per word.
+
+    The positions are increased with old_pos and new_pos.
+
+    """
+    a, b = _words(old), _words(new)
+    a_pos, b_pos = _offsets(a), _offsets(b)
+    for i1, i2, j1, j2 in _changes(a, b):
+        i1, i2, j1, j2 = a_pos[i1], a_pos[i2], b_pos[j1], b_pos[j2]
+        i, j = i1 + old_pos, j1 + new_pos
+        for k1, k2, l1, l2 in _sequence_matcher(old[i1:i2], new[j1:j2]):
+            yield i + k1, i + k2, j + l1, j + l2
+
+
+def _offsets(pieces):
+    """Return the list of the positions of the pieces of a text.
+
+    The list has one more entry: the length of the text.
+
+    """
+    return [0] + list(itertools.accumulate(map(len, pieces)))
+
+
+def _sequence_matcher(a, b):
+    """Return the list of changed ranges (i1, i2, j1, j2) found by difflib.
+
+    Short sequences are compared exhaustively. Longer ones are compared using
+    the junk heuristic of difflib, which ignores very frequent items, and
+    sequences longer than _LARGE are split in chunks that are compared one
+    by one. So the time needed remains acceptable, while most unchanged
+    parts are still found.
+
+    """
+    if len(a) <= _SMALL and len(b) <= _SMALL:
+        return _opcodes(a, b, False)
+    count = -(-max(len(a), len(b)) // _LARGE)
+    result = []
+    for n in range(count):
+        i1, i2 = len(a) * n // count, len(a) * (n + 1) // count
+        j1, j2 = len(b) * n // count, len(b) * (n + 1) // count
+        result.extend((k1 + i1, k2 + i1, l1 + j1, l2 + j1)
+            for k1, k2, l1, l2 in _opcodes(a[i1:i2], b[j1:j2], True))
+    return result
+
+
+def _opcodes(a, b, autojunk):
+    """Return the changed ranges (i1, i2, j1, j2) of a SequenceMatcher."""
+    return [(i1, i2, j1, j2) for tag, i1, i2, j1, j2
+            in difflib.SequenceMatcher(None, a, b, autojunk).get_opcodes()
+            if tag != 'equal']
+
+
+def _changes(a, b):
+    """Return the sorted list of ranges (i1, i2, j1, j2) where a and b differ.
+
+    This uses the patience diff algorithm: the items that occur only once in
+    both sequences are matched, and the ranges between them are compared
+    again. A range without such unique items is compared using difflib, see
+    _sequence_matcher(). So the time needed does not grow quadratically with
+    the length of the sequences.
+
+    """
+    result = []
+    ranges = [(0, len(a), 0, len(b))]
+    while ranges:
+        i1, i2, j1, j2 = ranges.pop()
+        # skip equal items at the start and the end
+        while i1 < i2 and j1 < j2 and a[i1] == b[j1]:
+            i1 += 1
+            j1 += 1
+        while i1 < i2 and j1 < j2 and a[i2-1] == b[j2-1]:
+            i2 -= 1
+            j2 -= 1
+        if i1 == i2 or j1 == j2:
+            if i1 < i2 or j1 < j2:
+                result.append((i1, i2, j1, j2))
+            continue
+        anchors = _unique_matches(a, i1, i2, b, j1, j2)
+        if anchors:
+            for i, j in anchors:
+                ranges.append((i1, i, j1, j))
+                i1, j1 = i + 1, j + 1
+            ranges.append((i1, i2, j1, j2))
+        else:
+            result.extend((k1 + i1, k2 + i1, l1 + j1, l2 + j1)
+                for k1, k2, l1, l2 in _sequence_matcher(a[i1:i2], b[j1:j2]))
+    result.sort()
+    return result
+
+
+def _unique_matches(a, i1, i2, b, j1, j2):
+    """Return the longest list of (i, j) pairs of unique equal items.
+
+    Only the items that occur once in a[i1:i2] and once in b[j1:j2] are
+    considered; the list is in ascending order of both i and j.
+
+    """
+    items = {}
+    for i in range(i1, i2):
+        item = items.get(a[i])
+        if item is None:
+            items[a[i]] = [i, 1, None, 0]
+        else:
+            item[1] += 1
+    for j in range(j1, j2):
+        item = items.get(b[j])
+        if item is not None:
+            item[2] = j
+            item[3] += 1
+    pairs = sorted((i, j) for i, count, j, count_b in items.values()
+                   if count == 1 and count_b == 1)
+
+    # find the longest increasing subsequence of j (patience sorting)
+    tops = []       # j of the top card of every pile
+    top_pairs = []  # index in pairs of the top card of every pile
+    previous = []   # index in pairs of the card on the previous pile
+    for n, (i, j) in enumerate(pairs):
+        pile = bisect.bisect(tops, j)
+        previous.append(top_pairs[pile-1] if pile else None)
+        if pile == len(tops):
+            tops.append(j)
+            top_pairs.append(n)
+        else:
+            tops[pile] = j
+            top_pairs[pile] = n
+    result = []
+    n = top_pairs[-1] if top_pairs else None
+    while n is not None:
+        result.append(pairs[n])
+        n = previous[n]
+    result.reverse()
+    return result
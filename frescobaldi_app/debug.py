@@ -31,6 +31,13 @@ def f(doc):
 def f(doc):
     print("loaded:", doc)
 
+@app.documentCreated.connect
+def f(doc):
+    import highlighter
+    def lexed(count, seconds):
+        print("lexed: {0} blocks in {1:.3f}s".format(count, seconds))
+    highlighter.highlighter(doc).lexed.connect(lexed, owner=doc)
+
 @app.documentClosed.connect
 def f(doc):
     print("closed:", doc)
@@ -57,6 +64,16 @@ def modules():
     print('\n'.join(v.__name__ for k, v in sorted(sys.modules.items()) if v is not None))
 
 
+def completions():
+    """Print the time spent in the autocomplete analyzer test functions."""
+    import autocomplete.analyzer
+    print("{0:<24} {1:>8} {2:>10} {3:>10} {4:>10}".format(
+        "function", "calls", "total ms", "mean ms", "max ms"))
+    for name, calls, total, maximum in autocomplete.analyzer.timings():
+        print("{0:<24} {1:>8} {2:>10.2f} {3:>10.3f} {4:>10.3f}".format(
+            name, calls, total * 1000, total * 1000 / calls, maximum * 1000))
+
+
 # avoid builtins._ being overwritten
 sys.displayhook = app.displayhook
 
@@ -30,21 +30,124 @@ GUI environment. That means: use EditorDocument for documents open in the
 editor, Document for "abstract" documents, for example to pass a generated
 document to a job.lilypond.LilyPondJob without implicitly creating a tab.
 
+Documents are saved atomically: the data are written to a temporary file
+which then replaces the file (see write_file()). An EditorDocument can also
+be saved in the background, see EditorDocument.saveInBackground().
+
 """
 
 
+import concurrent.futures
+import contextlib
+import errno
+import hashlib
 import os
+import stat
+import uuid
 
-from PyQt5.QtCore import QUrl
+from PyQt5.QtCore import QObject, QUrl, pyqtSignal
 from PyQt5.QtGui import QTextCursor, QTextDocument
 from PyQt5.QtWidgets import QPlainTextDocumentLayout
 
 import app
+import backup
 import util
 import variables
 import signals
 
 
+_executor = None    # the thread pool saving documents in the background
+_saves = {}         # Future: function to call in the main thread when done
+
+
+def _digest(data):
+    """Return a (size, digest) tuple for the bytes string data."""
+    return len(data), hashlib.sha1(data).digest()
+
+
+def write_file(filename, data):
+    """Write the bytes string data to filename, safely.
+
+    The data are written to a temporary file in the same directory, which
+    is flushed to disk and then renamed to filename. So filename always
+    contains either the old or the new data. The permissions of an existing
+    file are kept, and a symbolic link is followed.
+
+    If no temporary file can be created (e.g. because the directory is not
+    writable), the file is overwritten directly. An OSError is raised if
+    the file can't be written.
+
+    This function can be called in any thread.
+
+    """
+    filename = os.path.realpath(filename)
+    try:
+        mode = stat.S_IMODE(os.stat(filename).st_mode)
+    except FileNotFoundError:
+        mode = None
+    else:
+        # we would be able to replace a read-only file
+        if not os.access(filename, os.W_OK):
+            raise PermissionError(errno.EACCES, os.strerror(errno.EACCES),
+                                  filename)
+    directory, name = os.path.split(filename)
+    temp = os.path.join(directory,
+        '.{0}.{1}.tmp'.format(name, uuid.uuid4().hex[:8]))
+    try:
+        fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_EXCL
+                           | getattr(os, 'O_BINARY', 0), 0o666)
+    except OSError:
+        with open(filename, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        return
+    try:
+        with open(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(temp, mode)
+        os.replace(temp, filename)
+    except:
+        with contextlib.suppress(OSError):
+            os.remove(temp)
+        raise
+
+
+def waitForSaves():
+    """Wait until all documents saving in the background have been saved."""
+    for future in list(_saves):
+        concurrent.futures.wait([future])
+        _finishSave(future)
+
+
+def _save_executor():
+    """Return the thread pool used to save documents in the background."""
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(2)
+    return _executor
+
+
+def _finishSave(future):
+    """Call the function that finishes a background save, if not yet done."""
+    finish = _saves.pop(future, None)
+    if finish:
+        finish()
+
+
+class _Relay(QObject):
+    """Carries the finished saves from the worker threads to the main thread."""
+    done = pyqtSignal(object)
+
+
+_relay = _Relay()
+_relay.done.connect(_finishSave)
+app.aboutToQuit.connect(waitForSaves)
+
+
 class AbstractDocument(QTextDocument):
     """Base class for a Frescobaldi document. Not intended to be instantiated.
 
@@ -52,6 +155,35 @@ class AbstractDocument(QTextDocument):
     or lilypondinfo etc. for additional meta information.
 
     """
+    _lazy = False
+    _diskDigest = None
+    _saveFuture = None
+
+    @classmethod
+    def read_data(cls, url):
+        """Return the contents of the url as a bytes string.
+
+        Currently only local files are supported. An IOError is raised
+        when trying to read a nonlocal URL.
+
+        """
+        filename = url.toLocalFile()
+
+        # currently, we do not support non-local files
+        if not filename:
+            raise IOError("not a local file")
+        with open(filename, 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def decode_data(data, encoding=None):
+        """Return the bytes string data decoded as text.
+
+        The line separator is always '\\n'.
+
+        """
+        text = util.decode(data, encoding)
+        return util.universal_newlines(text)
 
     @classmethod
     def load_data(cls, url, encoding=None):
@@ -66,15 +198,7 @@ class AbstractDocument(QTextDocument):
         The line separator is always '\\n'.
 
         """
-        filename = url.toLocalFile()
-
-        # currently, we do not support non-local files
-        if not filename:
-            raise IOError("not a local file")
-        with open(filename, 'rb') as f:
-            data = f.read()
-        text = util.decode(data, encoding)
-        return util.universal_newlines(text)
+        return cls.decode_data(cls.read_data(url), encoding)
 
     @classmethod
     def new_from_url(cls, url, encoding=None):
@@ -86,8 +210,10 @@ class AbstractDocument(QTextDocument):
         """
         d = cls(url, encoding)
         if not url.isEmpty():
-            d.setPlainText(cls.load_data(url, encoding))
+            data = cls.read_data(url)
+            d.setPlainText(cls.decode_data(data, encoding))
             d.setModified(False)
+            d._setDiskData(data)
         return d
 
     def __init__(self, url=None, encoding=None):
@@ -121,7 +247,9 @@ class AbstractDocument(QTextDocument):
         if url is None:
             url = QUrl()
         u = url if not url.isEmpty() else self.url()
-        text = self.load_data(u, encoding or self._encoding)
+        data = self.read_data(u)
+        text = self.decode_data(data, encoding or self._encoding)
+        self._lazy = False
         if keepUndo:
             c = QTextCursor(self)
             c.select(QTextCursor.Document)
@@ -129,14 +257,69 @@ class AbstractDocument(QTextDocument):
         else:
             self.setPlainText(text)
         self.setModified(False)
+        self._setDiskData(data)
         if not url.isEmpty():
             self.setUrl(url)
 
+    def diskDigest(self):
+        """Return a (size, digest) tuple describing the contents on disk.
+
+        The digest is the SHA-1 hash of the bytes that were last loaded
+        from or saved to disk. If the document was neither loaded nor
+        saved, the size and digest of encodedText() are returned.
+
+        This is used to check whether a file was really changed on disk,
+        without encoding the whole document again.
+
+        """
+        if self._diskDigest is None:
+            return _digest(self.encodedText())
+        return self._diskDigest
+
+    def _setDiskData(self, data):
+        """Remember size and digest of the bytes loaded or saved."""
+        self._diskDigest = _digest(data)
+
+    def isLazy(self):
+        """Return True if the contents of the document are not loaded yet.
+
+        An EditorDocument can be created lazily, e.g. when restoring a
+        session. It then has its url but no contents, until loadLazy() is
+        called.
+
+        """
+        return self._lazy
+
+    def loadLazy(self):
+        """Load the contents of a lazily created document.
+
+        Does nothing if the document is not lazy. If loading fails, an
+        IOError is raised and the document remains lazy, so that it is never
+        saved with its contents missing.
+
+        """
+        if self._lazy:
+            self.load()
+
+    def isSaving(self):
+        """Return True if the document is being saved in the background."""
+        return self._saveFuture is not None
+
+    def waitForSave(self):
+        """Wait until saving the document in the background has finished.
+
+        Does nothing if the document is not being saved in the background.
+
+        """
+        future = self._saveFuture
+        if future:
+            concurrent.futures.wait([future])
+            _finishSave(future)
+
     def _save(self, url, filename):
-        with open(filename, "wb") as f:
-            f.write(self.encodedText())
-            f.flush()
-            os.fsync(f.fileno())
+        data = self.encodedText()
+        write_file(filename, data)
+        self._setDiskData(data)
         self.setModified(False)
         if not url.isEmpty():
             self.setUrl(url)
@@ -153,7 +336,12 @@ class AbstractDocument(QTextDocument):
         This method is never called directly but only from the overriding
         subclass methods that make further specific use of the modified results.
 
+        A lazy document is loaded first; if that fails, the IOError is raised
+        and nothing is written.
+
         """
+        self.waitForSave()
+        self.loadLazy()
         if url is None:
             url = QUrl()
         u = url if not url.isEmpty() else self.url()
@@ -245,8 +433,15 @@ class EditorDocument(AbstractDocument):
             app.documentLoaded(d)
         return d
 
-    def __init__(self, url=None, encoding=None):
+    def __init__(self, url=None, encoding=None, lazy=False):
+        """Create a new EditorDocument.
+
+        If lazy is True and an url is given, the document is lazy: the
+        contents are loaded when loadLazy() is called, see isLazy().
+
+        """
         super(EditorDocument, self).__init__(url, encoding)
+        self._lazy = lazy and not self.url().isEmpty()
         self.modificationChanged.connect(self.slotModificationChanged)
         app.documents.append(self)
         app.documentCreated(self)
@@ -255,6 +450,7 @@ class EditorDocument(AbstractDocument):
         app.documentModificationChanged(self)
 
     def close(self):
+        self.waitForSave()
         self.closed()
         app.documentClosed(self)
         app.documents.remove(self)
@@ -271,6 +467,67 @@ class EditorDocument(AbstractDocument):
         self.saved()
         app.documentSaved(self)
 
+    def saveInBackground(self, url=None, encoding=None, makeBackup=False,
+                         finished=None):
+        """Save the document like save(), but write it in a background thread.
+
+        The text is read and the saving signals are entered immediately.
+        Encoding the text and writing the file is done in a worker thread.
+        When the file is written, the document is set unmodified (unless it
+        was changed in the meantime) and the saved signals are emitted.
+
+        If makeBackup is True, a backup is made of the file first (see the
+        backup module), which is removed after saving if the user does not
+        want to keep it.
+
+        If given, finished is called in the main thread when saving has
+        finished, with None or the IOError that made saving fail.
+
+        An IOError is raised immediately when trying to save a nonlocal URL.
+
+        """
+        url, filename = super().save(url, encoding)
+        text = self.toPlainText()
+        encoding = self.encoding()
+        revision = self.revision()
+        context = contextlib.ExitStack()
+        context.enter_context(self.saving())
+        context.enter_context(app.documentSaving(self))
+
+        def save():
+            """Runs in a worker thread."""
+            backed_up = makeBackup and backup.backup(filename)
+            data = util.encode(util.platform_newlines(text), encoding)
+            write_file(filename, data)
+            if backed_up:
+                backup.removeBackup(filename)
+            return _digest(data)
+
+        def finish():
+            """Runs in the main thread."""
+            if self._saveFuture is future:
+                self._saveFuture = None
+            error = None
+            with context:
+                try:
+                    self._diskDigest = future.result()
+                except (IOError, OSError) as e:
+                    error = e
+                else:
+                    if self.revision() == revision:
+                        self.setModified(False)
+                    if not url.isEmpty():
+                        self.setUrl(url)
+            if error is None:
+                self.saved()
+                app.documentSaved(self)
+            if finished:
+                finished(error)
+
+        future = self._saveFuture = _save_executor().submit(save)
+        _saves[future] = finish
+        future.add_done_callback(_relay.done.emit)
+
     def setUrl(self, url):
         old = super(EditorDocument, self).setUrl(url)
         if url != old:
@@ -43,8 +43,9 @@ r"\b(?P<alert>(FIXME|HACK|XXX+)\b\W*\w+)",
 ]
 
 
-# cache the outline regexp
+# cache the outline regexp, and whether it can match a newline
 _outline_re = None
+_outline_multiline = None
 
 
 def outline_re():
@@ -55,9 +56,19 @@ def outline_re():
     return _outline_re
 
 
+def outline_multiline():
+    """Return True if the outline expression can match across line ends."""
+    global _outline_multiline
+    if _outline_multiline is None:
+        from search.matchindex import may_match_newline
+        _outline_multiline = may_match_newline(outline_re())
+    return _outline_multiline
+
+
 def _reset_outline_re():
-    global _outline_re
+    global _outline_re, _outline_multiline
     _outline_re = None
+    _outline_multiline = None
 
 
 app.settingsChanged.connect(_reset_outline_re, -999)
@@ -91,23 +102,157 @@ def create_outline_re():
     return re.compile(rx, re.MULTILINE | re.UNICODE)
 
 
+class OutlineItem(object):
+    """An item in the outline of a document.
+
+    Behaves like a match object (providing start(), end(), group() and
+    groupdict()), but the position is updated when the document changes
+    before the item.
+
+    """
+    __slots__ = ('_start', '_end', '_text', '_groups')
+
+    def __init__(self, match, offset=0):
+        self._start = match.start() + offset
+        self._end = match.end() + offset
+        self._text = match.group()
+        self._groups = match.groupdict()
+
+    def start(self):
+        return self._start
+
+    def end(self):
+        return self._end
+
+    def group(self):
+        return self._text
+
+    def groupdict(self):
+        return self._groups
+
+
 class DocumentStructure(plugin.DocumentPlugin):
+    """Maintains the outline of a document.
+
+    The outline is created when first asked for and then kept up to date:
+    when the document changes only the text around the change is searched
+    again, until the found items are the same as before the change.
+    Unchanged items remain the same OutlineItem instances, so users can
+    easily see which items are new or removed.
+
+    """
     def __init__(self, document):
         self._outline = None
 
     def invalidate(self):
-        """Called when the document changes or the settings are changed."""
-        self._outline = None
-        app.settingsChanged.disconnect(self.invalidate)
-        self.document().contentsChanged.disconnect(self.invalidate)
+        """Called when the settings are changed."""
+        if self._outline is not None:
+            self._outline = None
+            app.settingsChanged.disconnect(self.invalidate)
+            self.document().contentsChange.disconnect(self.slotContentsChange)
 
     def outline(self):
-        """Return the document outline as a series of match objects."""
+        """Return the document outline as a list of OutlineItem instances."""
         if self._outline is None:
-            self._outline = list(outline_re().finditer(self.document().toPlainText()))
-            self.document().contentsChanged.connect(self.invalidate)
+            text = self.document().toPlainText()
+            self._outline = list(map(OutlineItem, outline_re().finditer(text)))
+            self.document().contentsChange.connect(self.slotContentsChange)
             app.settingsChanged.connect(self.invalidate, -999)
         return self._outline
 
+    def slotContentsChange(self, position, removed, added):
+        """Called when the document changes, updates the outline."""
+        outline = self._outline
+        doc = self.document()
+        # start searching at the beginning of the line before the change,
+        # as an outline pattern can match a line end
+        block = doc.findBlock(position)
+        if block.previous().isValid():
+            block = block.previous()
+        start = block.position()
+
+        # find the first item that ends after the start, and also search it
+        # again, the change could influence it
+        lo, hi = 0, len(outline)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if outline[mid].end() > start:
+                hi = mid
+            else:
+                lo = mid + 1
+        multiline = outline_multiline()
+        if multiline:
+            # a match can span many lines, so start at the previous item,
+            # or at the beginning if there is none
+            if lo:
+                lo -= 1
+            else:
+                start = 0
+        first = j = lo
+        if first < len(outline):
+            start = min(start, outline[first].start())
+
+        # search until the found items are the same as the old ones
+        delta = added - removed
+        end = position + added
+        new = []
+        if multiline:
+            items = (OutlineItem(m) for m in
+                     outline_re().finditer(doc.toPlainText(), start))
+        else:
+            items = outline_items(doc, start)
+        for item in items:
+            if item.start() >= end:
+                old_start = item.start() - delta
+                while j < len(outline) and outline[j].start() < old_start:
+                    j += 1
+                if (j < len(outline) and outline[j].start() == old_start
+                        and outline[j].end() == item.end() - delta):
+                    break
+            new.append(item)
+        else:
+            j = len(outline)
+        if delta:
+            for item in outline[j:]:
+                item._start += delta
+                item._end += delta
+        outline[first:j] = new
+
+
+def outline_items(doc, position):
+    """Yield OutlineItem instances for the matches in doc from position on.
 
+    Instead of the whole text of the document, the text of a few blocks at a
+    time is searched, the number of blocks doubling each time. A match that
+    ends in the last block of those is searched again with more text, as it
+    could continue in the next block.
 
+    """
+    search = outline_re().finditer
+    block = doc.findBlock(position)
+    count = 8
+    last = None
+    while block.isValid():
+        pos = block.position()
+        lines = []
+        while block.isValid() and len(lines) < count:
+            lines.append(block.text())
+            block = block.next()
+        text = '\n'.join(lines)
+        # the last block is only searched completely at the end of the document
+        boundary = len(text) - len(lines[-1]) if block.isValid() else len(text) + 1
+        for m in search(text, position - pos):
+            if m.end() >= boundary:
+                break
+            if (m.start() + pos, m.end() + pos) != last:
+                item = OutlineItem(m, pos)
+                last = item.start(), item.end()
+                yield item
+        else:
+            if not block.isValid():
+                return
+            position = pos + boundary
+        if last and last[1] > position:
+            position = last[1]
+        block = doc.findBlock(position)
+        count *= 2
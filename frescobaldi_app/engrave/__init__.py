@@ -32,8 +32,10 @@ import app
 import actioncollection
 import actioncollectionmanager
 import documentinfo
+import includegraph
 import job.attributes
 import job.lilypond
+import job.manager
 import plugin
 import icons
 import signals
@@ -45,6 +47,34 @@ def engraver(mainwindow):
     return Engraver.instance(mainwindow)
 
 
+def engrave_masters(document):
+    """Queue preview jobs for the open documents that include document.
+
+    Called when a document is saved, if the user has enabled that
+    in the preferences.
+
+    """
+    if not QSettings().value("lilypond_settings/engrave_masters_on_save", False, bool):
+        return
+    filename = document.url().toLocalFile()
+    mainwindow = app.activeWindow()
+    if not filename or not mainwindow:
+        return
+    for doc in includegraph.master_documents(filename):
+        if doc is not document and not job.manager.is_running(doc):
+            try:
+                j = job.lilypond.PreviewJob(doc)
+            except IOError:
+                continue    # the master document can't be read
+            job.attributes.get(j).mainwindow = mainwindow
+            job.manager.manager(doc).queue_job(j)
+
+# The include graph is updated in the background, so this uses the masters
+# that were known when the document was saved. That is enough: saving a
+# document changes the files it includes, not the files that include it.
+app.documentSaved.connect(engrave_masters, 1)
+
+
 class Engraver(plugin.MainWindowPlugin):
 
     stickyChanged = signals.Signal()    # Document
@@ -197,7 +227,17 @@ class Engraver(plugin.MainWindowPlugin):
         doc = document or self.document()
         if may_save:
             self.saveDocumentIfDesired()
-        self.runJob(job_class(doc, args), doc)
+        try:
+            j = job_class(doc, args)
+        except IOError as e:
+            filename = doc.url().toLocalFile()
+            msg = _("{message}\n\n{strerror} ({errno})").format(
+                message = _("Could not read from: {url}").format(url=filename),
+                strerror = e.strerror,
+                errno = e.errno)
+            QMessageBox.critical(self.mainwindow(), app.caption(_("Error")), msg)
+            return
+        self.runJob(j, doc)
 
     def engraveAbort(self):
         j = job.manager.job(self.document())
@@ -108,7 +108,10 @@ class AutoCompiler(plugin.MainWindowPlugin):
                 if may_compile:
                     mgr.slotJobStarted()
         if may_compile:
-            j = job.lilypond.PreviewJob(doc)
+            try:
+                j = job.lilypond.PreviewJob(doc)
+            except IOError:
+                return      # the document can't be read
             job.attributes.get(j).hidden = True
             eng.runJob(j, doc)
 
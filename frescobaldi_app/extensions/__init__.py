@@ -21,7 +21,9 @@
 The extensions framework
 """
 
+import concurrent.futures
 import importlib
+import json
 import os
 import sys
 import re
@@ -32,6 +34,7 @@ from PyQt5.QtCore import (
     QObject,
     QSettings,
     QSize,
+    QStandardPaths,
     Qt
 )
 from PyQt5.QtGui import (
@@ -56,6 +59,40 @@ import qsettings
 from . import actions, settings
 
 
+# Increase this when the format of the manifest changes
+_MANIFEST_VERSION = 1
+
+# Maximum number of threads used to import extension modules
+_MAX_IMPORT_THREADS = 4
+
+
+def _manifest_filename():
+    """Return the name of the file the extension manifest is cached in."""
+    return os.path.join(QStandardPaths.writableLocation(
+        QStandardPaths.CacheLocation), 'extensions', 'manifest.json')
+
+
+def _mtime(path):
+    """Return the modification time of path, or None if it doesn't exist."""
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _import_extension(name):
+    """Import the module of an extension.
+
+    Returns the module and the time needed to import it in milliseconds.
+    This is called in a worker thread for extensions that don't depend
+    on other extensions.
+
+    """
+    start = perf_counter()
+    module = importlib.import_module(name)
+    return module, (perf_counter() - start) * 1000
+
+
 class Extension(QObject):
     """
     Base class for all Extension objects.
@@ -130,7 +167,7 @@ class Extension(QObject):
         self._config_widget = None
         self._icon = None
         self._metadata = None
-        self._load_time = ''
+        self._load_time = None
         self.create_panel()
 
         # Hook that can be implemented to update extension status
@@ -192,6 +229,12 @@ class Extension(QObject):
     def load_time(self):
         """Return the loading time for the Extension object, formatted
         as a string with milliseconds."""
+        if self._load_time is None:
+            return ''
+        return "{:.2f} ms".format(self._load_time)
+
+    def load_time_ms(self):
+        """Return the loading time in milliseconds, or None if unknown."""
         return self._load_time
 
     def menu(self, target):
@@ -258,8 +301,8 @@ class Extension(QObject):
         return self._root_directory
 
     def set_load_time(self, ms):
-        """Store the time needed to load the application.
-        A string with two fractional digits in 'ms'."""
+        """Store the time needed to load the extension (importing
+        the module and creating the Extension object) in milliseconds."""
         self._load_time = ms
 
     def settings(self):
@@ -545,6 +588,7 @@ class Extensions(QObject):
         self._menus = {}
         self._icons = {}
         self._infos = {}
+        self._manifest = {}
         self._extensions = {}
         self._extensions_ordered = []
         self._failed_infos = {}
@@ -554,6 +598,7 @@ class Extensions(QObject):
         # These will be set in load_settings():
         self._root_directory = None
         self._active = False
+        self._load_time_budget = 0
         self._inactive_extensions = []
         self.load_settings()
         app.settingsChanged.connect(self.settings_changed)
@@ -566,7 +611,7 @@ class Extensions(QObject):
         # regardless of 'active' state
         self.load_infos()
         if self.active():
-            self._extensions_ordered = self.check_dependencies()
+            self._extensions_ordered = list(self.check_dependencies())
             #if not self._failed_dependencies:
             self.load_extensions()
             if (self._failed_infos
@@ -677,23 +722,45 @@ class Extensions(QObject):
         return reversed(result)
 
     def load_extensions(self):
-        """Load active extensions in topological order."""
+        """Load active extensions in topological order.
+
+        The modules of extensions that don't depend on other extensions
+        are imported in worker threads, the others in the main thread
+        when their turn comes. The Extension objects are always created
+        in the main thread, in topological order.
+
+        """
         root = self.root_directory()
         if not root in sys.path:
             sys.path.append(root)
 
-        for ext in [ext for ext  in self._extensions_ordered
-            if not ext in self.inactive_extensions()]:
+        ordered = [ext for ext in self._extensions_ordered
+            if not ext in self.inactive_extensions()]
+        independent = [ext for ext in ordered
+            if not self._infos[ext]
+                or self._infos[ext]['dependencies'] == '---']
+        imports = {}
+        if len(independent) > 1:
+            executor = concurrent.futures.ThreadPoolExecutor(
+                min(len(independent), _MAX_IMPORT_THREADS))
+            imports = {ext: executor.submit(_import_extension, ext)
+                for ext in independent}
+            executor.shutdown(wait=False)
+
+        for ext in ordered:
             try:
-                # measure loading time
-                start = perf_counter()
                 # Try importing the module. Will fail here if there's
                 # no Python module in the subdirectory or loading the module
                 # produces errors
-                module = importlib.import_module(ext)
+                if ext in imports:
+                    module, import_time = imports[ext].result()
+                else:
+                    module, import_time = _import_extension(ext)
+                # measure the time to create the extension
+                start = perf_counter()
                 # Add extension's icons dir (if present) to icon search path
                 icon_path = os.path.join(self.root_directory(), ext, 'icons')
-                if os.path.isdir(icon_path):
+                if self._manifest.get(ext, {}).get('icons'):
                     search_paths = QDir.searchPaths('icons')
                     QDir.setSearchPaths('icons', [icon_path] + search_paths)
                 # Instantiate the extension,
@@ -701,8 +768,7 @@ class Extensions(QObject):
                 # (doesn't have an Extension class) or has other errors in it
                 extension = module.Extension(self, ext)
                 end = perf_counter()
-                extension.set_load_time(
-                    "{:.2f} ms".format((end - start) * 1000))
+                extension.set_load_time(import_time + (end - start) * 1000)
                 self._extensions[ext] = extension
             except Exception as e:
                 self._failed_extensions[ext] = sys.exc_info()
@@ -713,8 +779,9 @@ class Extensions(QObject):
         """
         icon_file_name = os.path.join(
             self.root_directory(), name, 'icons', 'extension.svg')
-        self._icons[name] = (
-            QIcon(icon_file_name) if os.path.exists(icon_file_name) else None)
+        entry = self._manifest.get(name)
+        exists = entry['icon'] if entry else os.path.exists(icon_file_name)
+        self._icons[name] = QIcon(icon_file_name) if exists else None
 
     def icon(self, name):
         """Return a main icon for the given extension, or None."""
@@ -759,12 +826,82 @@ class Extensions(QObject):
 
     def load_infos(self):
         """Load extension metadata from all subdirs that include an
-        extension.cnf file."""
+        extension.cnf file.
+
+        The metadata are cached in a manifest file, and an extension.cnf
+        file is only read again if the modification time of the file,
+        the extension directory or its icons directory has changed.
+
+        """
         root = self.root_directory()
-        subdirs = [dir for dir in os.listdir(root) if os.path.isfile(
-            os.path.join(root, dir, 'extension.cnf'))]
-        for d in subdirs:
-            self._infos[d] = self._load_infos(d)
+        manifest = self._read_manifest()
+        for d in os.listdir(root):
+            directory = os.path.join(root, d)
+            key = [
+                _mtime(directory),
+                _mtime(os.path.join(directory, 'extension.cnf')),
+                _mtime(os.path.join(directory, 'icons')),
+            ]
+            if key[1] is None:
+                continue
+            entry = manifest.get(d)
+            if not entry or entry['key'] != key:
+                entry = self._manifest_entry(d, key)
+            elif entry['error'] is not None:
+                self._failed_infos[d] = entry['error']
+            self._manifest[d] = entry
+            self._infos[d] = entry['infos']
+        if self._manifest != manifest:
+            self._write_manifest()
+
+    def _manifest_entry(self, extension_name, key):
+        """Read the metadata of an extension and return its manifest entry.
+
+        key is the list of modification times the entry depends on.
+
+        """
+        icon_path = os.path.join(self.root_directory(), extension_name, 'icons')
+        return {
+            'key': key,
+            'infos': self._load_infos(extension_name),
+            'error': self._failed_infos.get(extension_name),
+            'icons': os.path.isdir(icon_path),
+            'icon': os.path.isfile(os.path.join(icon_path, 'extension.svg')),
+        }
+
+    def _read_manifest(self):
+        """Return the cached manifest entries for the root directory.
+
+        Returns an empty dictionary if there is no (usable) manifest.
+
+        """
+        try:
+            with open(_manifest_filename(), encoding='utf-8') as f:
+                data = json.load(f)
+            if (data['version'] == _MANIFEST_VERSION
+                and data['root'] == self.root_directory()):
+                return data['extensions']
+        except Exception:
+            # any problem with the manifest simply means we read
+            # the extension.cnf files again
+            pass
+        return {}
+
+    def _write_manifest(self):
+        """Write the manifest entries to the manifest file."""
+        filename = _manifest_filename()
+        data = {
+            'version': _MANIFEST_VERSION,
+            'root': self.root_directory(),
+            'extensions': self._manifest,
+        }
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with open(filename + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(filename + '.tmp', filename)
+        except (OSError, TypeError, ValueError):
+            pass
 
     def extensions(self):
         """Return a list of all loaded extensions, ordered by their
@@ -819,9 +956,19 @@ class Extensions(QObject):
         s = QSettings()
         s.beginGroup('extension-settings')
         self._active = s.value('active', True, bool)
+        self._load_time_budget = s.value('load-time-budget', 100, int)
         self._inactive_extensions = qsettings.get_string_list(s, 'installed/inactive')
         self._root_directory = s.value('root-directory', '', str)
 
+    def load_time_budget(self):
+        """Return the time in milliseconds an extension may take to load.
+
+        Extensions that take longer are flagged in the Preferences dialog.
+        0 means there is no budget.
+
+        """
+        return self._load_time_budget
+
     def mainwindow(self):
         """Reference to the main window."""
         return self._mainwindow
@@ -898,6 +1045,7 @@ class Extensions(QObject):
         active = s.value('active', True, bool)
         inactive = qsettings.get_string_list(s, 'installed/inactive')
         root = s.value('root-directory', '', str)
+        self._load_time_budget = s.value('load-time-budget', 100, int)
         inactive_changed = False
         if len(inactive) != len(self._inactive_extensions):
             inactive_changed = True
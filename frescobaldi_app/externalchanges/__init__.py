@@ -25,11 +25,28 @@ The documentwatcher module is used to do the actual monitoring work,
 this module checks if a touched file really changed and pops up the window
 if needed.
 
+A file is considered changed if its size differs from the size of the bytes
+last loaded or saved, or else if its SHA-1 hash differs (see
+document.AbstractDocument.diskDigest()). The files are read and hashed in
+worker threads, and the window is shown once for all changed documents.
+
 """
 
 
+import concurrent.futures
+import hashlib
+import os
+import threading
+
+from PyQt5.QtCore import QObject, QSettings, QTimer, pyqtSignal
+
+
+# read files in chunks of this size when hashing
+_CHUNK = 1 << 20
 
-from PyQt5.QtCore import QSettings, QTimer
+_executor = None    # the thread pool hashing files
+_running = None     # identifies the running check
+_pending = False    # True if a check was requested while one was running
 
 
 def enabled():
@@ -61,23 +78,79 @@ def changedDocuments():
     When a document is not modified and the file on disk is exactly the same,
     the document is not considered having been changed on disk.
 
+    """
+    candidates = _candidates()
+    results = _check_executor().map(_unchanged, candidates)
+    return _apply(candidates, results)
+
+
+def _candidates():
+    """Return a list of (watcher, filename, digest) tuples to check.
+
+    These are the documents that are marked changed, but are not modified
+    and have a local filename. Lazily loaded documents are marked unchanged,
+    because they will be loaded from disk when they are shown.
+
     """
     import documentwatcher
+    candidates = []
     for w in documentwatcher.DocumentWatcher.instances():
         d = w.document()
         if w.changed and not d.isModified():
+            if d.isLazy():
+                w.changed = False
+                continue
             filename = d.url().toLocalFile()
             if filename:
-                try:
-                    with open(filename, 'rb') as diskfile:
-                        if diskfile.read() == d.encodedText():
-                            w.changed = False
-                except (OSError, IOError):
-                    pass
+                candidates.append((w, filename, d.diskDigest()))
+    return candidates
+
+
+def _unchanged(candidate):
+    """Return True if the file on disk has the size and digest we know.
+
+    The file is only read if the size matches. Runs in a worker thread.
+
+    """
+    w, filename, (size, digest) = candidate
+    try:
+        if os.path.getsize(filename) != size:
+            return False
+        h = hashlib.sha1()
+        with open(filename, 'rb') as diskfile:
+            for chunk in iter(lambda: diskfile.read(_CHUNK), b''):
+                h.update(chunk)
+    except (OSError, IOError):
+        return False
+    return h.digest() == digest
+
+
+def _apply(candidates, results):
+    """Mark unchanged documents and return the list of changed Documents.
+
+    A result is ignored if the document was modified, loaded or saved
+    while its file was being checked.
+
+    """
+    import documentwatcher
+    for (w, filename, digest), unchanged in zip(candidates, results):
+        d = w.document()
+        if (unchanged and d is not None and not d.isModified()
+                and d.diskDigest() == digest):
+            w.changed = False
     return [w.document() for w in documentwatcher.DocumentWatcher.instances()
               if w.changed]
 
 
+def _check_executor():
+    """Return the thread pool used to read and hash files."""
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            min(4, os.cpu_count() or 1))
+    return _executor
+
+
 def display(documents):
     """Display the window showing the specified Documents."""
     from . import widget
@@ -92,12 +165,58 @@ def displayChangedDocuments():
 
 
 def checkChangedDocuments():
-    """Display the window if there are changed files."""
-    docs = changedDocuments()
-    if docs:
+    """Display the window if there are changed files.
+
+    The files are checked in the background. If a check is already running,
+    another check is done when it has finished.
+
+    """
+    global _running, _pending
+    if _running:
+        _pending = True
+        return
+    candidates = _candidates()
+    running = _running = object()
+    def run():
+        result = None   # means the check failed
+        try:
+            result = candidates, list(_check_executor().map(_unchanged, candidates))
+        except RuntimeError:
+            # the thread pool is shut down when the application quits
+            pass
+        finally:
+            # always report back, otherwise no check would be done anymore
+            _relay.done.emit(running, result)
+    threading.Thread(target=run, daemon=True).start()
+
+
+def _slotCheckDone(running, result):
+    """Called in the main thread when a check has finished.
+
+    The result is None if the check failed.
+
+    """
+    global _running, _pending
+    if running is not _running:
+        return
+    _running = None
+    docs = _apply(*result) if result is not None else None
+    if _pending:
+        _pending = False
+        checkChangedDocuments()
+    elif docs:
         display(docs)
 
 
+class _Relay(QObject):
+    """Carries the result from the checking thread to the main thread."""
+    done = pyqtSignal(object, object)
+
+
+_relay = _Relay()
+_relay.done.connect(_slotCheckDone)
+
+
 # timer to wait before really looking at the changed files, a file could
 # probably still be changing.
 _timer = QTimer(singleShot=True, timeout=checkChangedDocuments)
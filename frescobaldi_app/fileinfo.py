@@ -19,15 +19,28 @@
 
 """
 Computes and caches various information about files.
+
+Besides the in-memory cache, the tokens and some harvested information
+(definitions, include args etc.) of files are optionally stored on disk,
+so they are available without lexing the files again after a restart.
 """
 
 
+import concurrent.futures
+import hashlib
+import importlib
 import itertools
+import pickle
 import re
 import os
+import sys
+import threading
 import atexit
 
+from PyQt5.QtCore import QObject, QSettings, QStandardPaths, pyqtSignal
+
 import ly.document
+import ly.pkginfo
 import lydocinfo
 import ly.lex
 import filecache
@@ -36,6 +49,7 @@ import variables
 
 
 _document_cache = filecache.FileCache()
+_directory_cache = filecache.FileCache()
 _suffix_chars_re = re.compile(r'[^-\w]', re.UNICODE)
 
 
@@ -44,6 +58,13 @@ _suffix_chars_re = re.compile(r'[^-\w]', re.UNICODE)
 ### (The segfault is preceded by a "corrupted double-linked list" message.)
 atexit.register(_document_cache.clear)
 
+# the caches are also used by the threads that search for included files
+_cache_lock = threading.RLock()
+_executor = None
+
+# whether file names are compared case insensitively
+_case_insensitive = sys.platform.startswith(('win', 'darwin'))
+
 
 class _CachedDocument(object):
     """Contains a document and related items."""
@@ -57,16 +78,25 @@ class _CachedDocument(object):
 def _cached(filename):
     """Return a _CachedDocument instance for the filename, else creates one."""
     filename = os.path.realpath(filename)
-    try:
-        c = _document_cache[filename]
-    except KeyError:
-        with open(filename, 'rb') as f:
-            text = util.decode(f.read())
-        c = _document_cache[filename] = _CachedDocument()
-        c.variables = v = variables.variables(text)
-        c.document = ly.document.Document(text, v.get("mode"))
-        c.filename = c.document.filename = filename
-    return c
+    with _cache_lock:
+        try:
+            return _document_cache[filename]
+        except KeyError:
+            pass
+    # read the file outside the lock, so other threads can read files too
+    with open(filename, 'rb') as f:
+        text = util.decode(f.read())
+    c = _CachedDocument()
+    c.variables = v = variables.variables(text)
+    c.document = ly.document.Document(text, v.get("mode"))
+    c.filename = c.document.filename = filename
+    with _cache_lock:
+        # another thread may have been quicker
+        try:
+            return _document_cache[filename]
+        except KeyError:
+            _document_cache[filename] = c
+            return c
 
 
 def document(filename):
@@ -78,7 +108,19 @@ def docinfo(filename):
     """Return a (cached) LyDocInfo instance for the specified file."""
     c = _cached(filename)
     if c.docinfo is None:
-        c.docinfo = lydocinfo.DocInfo(c.document, c.variables)
+        # load or create the DocInfo outside the lock, it can take a while
+        persistent = _persistent_cache_enabled()
+        info = _load_docinfo(c) if persistent else None
+        save = persistent and info is None
+        if info is None:
+            info = lydocinfo.DocInfo(c.document, c.variables)
+        with _cache_lock:
+            if c.docinfo is None:
+                c.docinfo = info
+            else:
+                save = False    # another thread was quicker
+        if save:
+            _save_docinfo(c)
     return c.docinfo
 
 
@@ -87,10 +129,175 @@ def music(filename):
     c = _cached(filename)
     if c.music is None:
         import music
-        c.music = music.Document(c.document)
+        doc = music.Document(c.document)
+        with _cache_lock:
+            if c.music is None:
+                c.music = doc
     return c.music
 
 
+# increase when the format of the persistent cache changes
+_PERSISTENT_CACHE_VERSION = 1
+
+# the least recently used entries are removed when the persistent cache
+# grows larger than this
+_PERSISTENT_CACHE_MAX_SIZE = 50 * 1024 * 1024
+
+# whether the persistent cache was already pruned in this session
+_persistent_cache_pruned = False
+
+# the attributes a DocInfo instance sets on itself, see _docinfo_attributes()
+_docinfo_attrs = None
+
+# the DocInfo methods whose results are stored in the persistent cache
+_persistent_methods = (
+    'version_string',
+    'include_args',
+    'scheme_load_args',
+    'output_args',
+    'definitions',
+    'markup_definitions',
+)
+
+
+def _persistent_cache_enabled():
+    """Return True if the on-disk cache should be used."""
+    return QSettings().value("fileinfo/persistent_cache", True, bool)
+
+
+def _persistent_cache_directory():
+    """Return the directory the persistent cache is stored in."""
+    return os.path.join(QStandardPaths.writableLocation(
+        QStandardPaths.CacheLocation), 'fileinfo')
+
+
+def _persistent_cache_filename(filename):
+    """Return the name of the file the info for filename is stored in."""
+    name = hashlib.sha1(filename.encode('utf-8', 'surrogateescape')).hexdigest()
+    return os.path.join(_persistent_cache_directory(), name[:2], name)
+
+
+def prune_persistent_cache(max_size=_PERSISTENT_CACHE_MAX_SIZE):
+    """Remove the least recently used entries until the cache fits max_size.
+
+    The modification time of an entry is updated when it is used, so entries
+    of files that are not opened anymore are removed first.
+
+    """
+    util.prune_files(_persistent_cache_directory(), max_size)
+
+
+def _persistent_key(filename):
+    """Return the key that must match for a stored entry to be valid."""
+    st = os.stat(filename)
+    return (filename, st.st_mtime, st.st_size,
+            ly.pkginfo.version, _PERSISTENT_CACHE_VERSION)
+
+
+def _token_class(name):
+    """Return the token class from its 'module:qualname' name."""
+    module, qualname = name.split(':')
+    obj = importlib.import_module(module)
+    for attr in qualname.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _save_docinfo(c):
+    """Store the tokens and harvested information of the DocInfo on disk."""
+    info = c.docinfo
+    try:
+        key = _persistent_key(c.filename)
+    except OSError:
+        return
+    classes = {}
+    def class_index(cls):
+        name = '{0}:{1}'.format(cls.__module__, cls.__qualname__)
+        return classes.setdefault(name, len(classes))
+    tokens = [(class_index(type(t)), t.pos, str(t)) for t in info.tokens]
+    def dump(value):
+        # Tokens in results are stored as (class, pos, text) tuples as well
+        if isinstance(value, ly.lex.Token):
+            return ('token', class_index(type(value)), value.pos, str(value))
+        elif isinstance(value, (list, tuple)):
+            return [dump(v) for v in value]
+        return value
+    results = {name: dump(getattr(info, name)()) for name in _persistent_methods}
+    data = {
+        'key': key,
+        'classes': sorted(classes, key=classes.get),
+        'tokens': tokens,
+        'results': results,
+    }
+    filename = _persistent_cache_filename(c.filename)
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename + '.tmp', 'wb') as f:
+            pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(filename + '.tmp', filename)
+    except (OSError, pickle.PickleError):
+        return
+    global _persistent_cache_pruned
+    with _cache_lock:
+        prune, _persistent_cache_pruned = not _persistent_cache_pruned, True
+    if prune:
+        prune_persistent_cache()
+
+
+def _docinfo_attributes():
+    """Return the set of attribute names a DocInfo sets in its constructor.
+
+    A DocInfo restored from the persistent cache must have all of them,
+    otherwise the internals of python-ly have changed and the stored
+    information can't be used.
+
+    """
+    global _docinfo_attrs
+    if _docinfo_attrs is None:
+        info = lydocinfo.DocInfo(ly.document.Document(), {})
+        _docinfo_attrs = frozenset(vars(info))
+    return _docinfo_attrs
+
+
+def _load_docinfo(c):
+    """Return a DocInfo for the cached document read from disk, or None."""
+    try:
+        key = _persistent_key(c.filename)
+        with open(_persistent_cache_filename(c.filename), 'rb') as f:
+            data = pickle.load(f)
+        if data['key'] != key:
+            return None
+        classes = [_token_class(name) for name in data['classes']]
+        tokens = tuple(classes[i](text, pos) for i, pos, text in data['tokens'])
+        def load(value):
+            if isinstance(value, tuple) and value and value[0] == 'token':
+                return classes[value[1]](value[3], value[2])
+            elif isinstance(value, list):
+                return [load(v) for v in value]
+            return value
+        results = {name: load(value) for name, value in data['results'].items()}
+        info = lydocinfo.DocInfo.__new__(lydocinfo.DocInfo)
+        info._d = c.document
+        info.variables = c.variables
+        info.tokens = tokens
+        info.classes = tuple(map(type, tokens))
+        # fill the cache of the methods decorated with ly.docinfo._cache
+        info._cache_ = {getattr(lydocinfo.DocInfo, name).__wrapped__: value
+                        for name, value in results.items()}
+        if not _docinfo_attributes() <= set(vars(info)):
+            return None
+    except Exception:
+        # any problem with the stored data, or with the internals of
+        # python-ly, simply means we have to lex again
+        return None
+    try:
+        # mark the entry as recently used
+        os.utime(_persistent_cache_filename(c.filename))
+    except OSError:
+        pass
+    return info
+
+
 def textmode(text, guess=True):
     """Returns the type of the given text ('lilypond, 'html', etc.).
 
@@ -116,33 +323,196 @@ def includefiles(dinfo, include_path=()):
     searched for files.
 
     """
-    filename = dinfo.document.filename
+    return find_includefiles(dinfo.document.filename, dinfo.include_args(), include_path)
+
+
+def find_includefiles(filename, include_args, include_path=(), cancelled=None):
+    """Returns a set of filenames that are included using the include_args.
+
+    The include_args are the \\include arguments of the file filename (which
+    may be None). The files are looked for in the same way as includefiles()
+    does. The included files of different \\include commands are searched
+    for concurrently.
+
+    If cancelled (a threading.Event) is given and set, the search stops and
+    the files found so far are returned.
+
+    """
     basedir = os.path.dirname(filename) if filename else None
     files = set()
-
-    def tryarg(directory, arg):
-        path = os.path.realpath(os.path.join(directory, arg))
-        if path not in files and os.path.isfile(path):
-            files.add(path)
-            args = docinfo(path).include_args()
-            find(args, os.path.dirname(path))
-            return True
-
-    def find(incl_args, directory):
-        for arg in incl_args:
-            # new, recursive, relative include
-            if not (directory and tryarg(directory, arg)):
-                # old include (relative to master file)
-                if not (basedir and tryarg(basedir, arg)):
-                    # if path is given, also search there:
-                    for p in include_path:
-                        if tryarg(p, arg):
-                            break
-
-    find(dinfo.include_args(), basedir)
+    listings = {}
+
+    def submit(incl_args, directory):
+        # new, recursive, relative include; then the old include (relative to
+        # the master file); then the include path
+        directories = [directory, basedir]
+        directories.extend(include_path)
+        directories = [d for i, d in enumerate(directories)
+                       if d and d not in directories[:i]]
+        return [executor.submit(_resolve_include, arg, directories, listings, cancelled)
+                for arg in incl_args]
+
+    executor = _include_executor()
+    pending = set(submit(include_args, basedir))
+    try:
+        while pending:
+            done, pending = concurrent.futures.wait(pending,
+                return_when=concurrent.futures.FIRST_COMPLETED)
+            if cancelled and cancelled.is_set():
+                break
+            for future in done:
+                path, incl_args = future.result()
+                if path and path not in files:
+                    files.add(path)
+                    pending.update(submit(incl_args, os.path.dirname(path)))
+    finally:
+        for future in pending:
+            future.cancel()
     return files
 
 
+def _include_executor():
+    """Return the thread pool used to search for included files."""
+    global _executor
+    with _cache_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                min(8, (os.cpu_count() or 1) * 2))
+        return _executor
+
+
+def _resolve_include(arg, directories, listings, cancelled=None):
+    """Find the file arg, return its path and include arguments.
+
+    Runs in a thread of the pool. Returns (None, None) if the file was not
+    found.
+
+    """
+    path = _find_include(arg, directories, listings, cancelled)
+    if path:
+        return path, docinfo(path).include_args()
+    return None, None
+
+
+def _find_include(arg, directories, listings, cancelled=None):
+    """Return the real path of the first file arg found in directories, or None.
+
+    The listings dictionary caches the directory listings during one search,
+    see _listing().
+
+    """
+    for directory in directories:
+        if cancelled and cancelled.is_set():
+            return
+        path = os.path.join(directory, arg)
+        dirname, name = os.path.split(path)
+        names = _listing(dirname, listings)
+        if names is not None and _normcase(name) not in names:
+            continue
+        path = os.path.realpath(path)
+        if os.path.isfile(path):
+            return path
+
+
+def _normcase(name):
+    """Return the file name as it is compared on this platform."""
+    return name.casefold() if _case_insensitive else name
+
+
+def _listing(directory, listings):
+    """Return the set of file names in directory, or None if it can't be listed.
+
+    The listings are cached and only read again if the modification time of
+    the directory changed. The listings dictionary is used during one search,
+    so that the modification time of every directory is checked only once.
+
+    """
+    try:
+        return listings[directory]
+    except KeyError:
+        pass
+    with _cache_lock:
+        try:
+            names = _directory_cache[directory]
+        except KeyError:
+            names = None
+    if names is None:
+        try:
+            names = frozenset(map(_normcase, os.listdir(directory)))
+        except (FileNotFoundError, NotADirectoryError):
+            names = frozenset()
+        except OSError:
+            pass
+        else:
+            with _cache_lock:
+                _directory_cache[directory] = names
+    listings[directory] = names
+    return names
+
+
+class IncludeResolver(QObject):
+    """Searches the included files of a document in a background thread.
+
+    When the search has finished, the finished signal is emitted in the main
+    thread with the set of filenames. Starting a new search cancels the
+    search that is still running, its result is never emitted.
+
+    """
+    finished = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super(IncludeResolver, self).__init__(parent)
+        self._cancelled = None
+        self._relay = _Relay()
+        self._relay.done.connect(self._slotDone)
+
+    def start(self, filename, include_args, include_path=()):
+        """Start searching, see find_includefiles().
+
+        If include_args is None, they are read from the file filename.
+
+        """
+        self.cancel()
+        cancelled = self._cancelled = threading.Event()
+        def run():
+            try:
+                args = include_args
+                if args is None:
+                    args = docinfo(filename).include_args()
+                files = find_includefiles(filename, args,
+                                          include_path, cancelled)
+            except (IOError, OSError):
+                files = None
+            except RuntimeError:
+                # the thread pool is shut down when the application quits
+                return
+            if not cancelled.is_set():
+                self._relay.done.emit(cancelled, files)
+        threading.Thread(target=run, daemon=True).start()
+
+    def cancel(self):
+        """Stop searching, the result of the running search is not emitted."""
+        if self._cancelled:
+            self._cancelled.set()
+            self._cancelled = None
+
+    def isRunning(self):
+        """Return True if a search is running."""
+        return self._cancelled is not None
+
+    def _slotDone(self, cancelled, files):
+        """(internal) Called in the main thread when a search has finished."""
+        if cancelled is self._cancelled:
+            self._cancelled = None
+            if files is not None:
+                self.finished.emit(files)
+
+
+class _Relay(QObject):
+    """Carries the result from the search thread to the main thread."""
+    done = pyqtSignal(object, object)
+
+
 def basenames(dinfo, includefiles=(), filename=None, replace_suffix=True):
     """Returns the list of basenames a document is expected to create.
 
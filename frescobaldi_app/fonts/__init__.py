@@ -39,8 +39,6 @@ import icons
 import plugin
 import qutil
 
-from . import musicfonts, textfonts
-
 
 def fonts(mainwindow):
     return Fonts.instance(mainwindow)
@@ -124,6 +122,7 @@ class AvailableFonts(QObject):
 
     def __init__(self, lilypond_info):
         super(AvailableFonts, self).__init__()
+        from . import musicfonts, textfonts
         self.lilypond_info = lilypond_info
         self._music_fonts = musicfonts.InstalledMusicFonts(
             lilypond_info)
@@ -166,6 +165,7 @@ def set_music_fonts_repo():
             not _music_fonts_repo
             or _music_fonts_repo.root() != settings_path
         ):
+            from . import musicfonts
             _music_fonts_repo = musicfonts.MusicFontRepo(settings_path)
 
 
@@ -23,7 +23,9 @@ about a document's contents.
 """
 
 
+import time
 
+from PyQt5.QtCore import QTimer
 from PyQt5.QtGui import (
     QColor, QSyntaxHighlighter, QTextBlockUserData, QTextCharFormat,
     QTextCursor, QTextDocument)
@@ -38,6 +40,8 @@ import document
 import textformats
 import metainfo
 import plugin
+import signals
+import tokenstore
 import variables
 import documentinfo
 
@@ -93,9 +97,26 @@ class Highlighter(plugin.Plugin, QSyntaxHighlighter):
     - picks the mode from the variables if they specify that
 
     The Highlighter automatically re-reads the highlighting settings if they
-    are changed.
+    are changed. The tokens of a block are only lexed again if the text of the
+    block or the state at the end of the previous block has changed, so
+    re-highlighting after a settings change only re-applies the formats.
+
+    When a single change causes more than CHUNK_SIZE blocks to be lexed (e.g.
+    when loading a large document), lexing of the remaining blocks is
+    deferred: they are marked as pending and lexed in chunks while the event
+    loop is idle. Views call ensureHighlighted() for their visible blocks, and
+    tokeniter does so before returning tokens of a pending block.
 
     """
+
+    # the maximum number of blocks to lex before returning to the event loop
+    CHUNK_SIZE = 1000
+
+    # the block state of blocks that are not lexed yet
+    PENDING = -0x40000000
+
+    lexed = signals.Signal()    # (number of lexed blocks, seconds)
+
     def __init__(self, doc):
         QSyntaxHighlighter.__init__(self, doc)
         self._fridge = ly.lex.Fridge()
@@ -103,6 +124,15 @@ class Highlighter(plugin.Plugin, QSyntaxHighlighter):
         self._initialState = None
         self._highlighting = True
         self._mode = None
+        self._generation = 0        # invalidates the per-block token cache
+        self._lexUntil = None       # last block number to lex in this pass
+        self._lexCount = 0          # blocks lexed in this pass
+        self._lexTime = 0.0         # time spent lexing in this pass
+        self._lastLexCount = 0
+        self._lastLexTime = 0.0
+        self._pending = False       # are there pending blocks?
+        self._pendingHint = 0       # block number of the first pending block
+        self._timer = QTimer(singleShot=True, timeout=self._continueLexing)
         self.initializeDocument()
 
     def initializeDocument(self):
@@ -128,6 +158,7 @@ class Highlighter(plugin.Plugin, QSyntaxHighlighter):
         mode = documentinfo.mode(self.document(), False)
         if mode != self._mode:
             self._mode = mode
+            self._generation += 1
             self.rehighlight()
 
     def _resetHighlighting(self):
@@ -136,29 +167,139 @@ class Highlighter(plugin.Plugin, QSyntaxHighlighter):
 
     def highlightBlock(self, text):
         """Called by Qt when the highlighting of the current line needs updating."""
-        # find the state of the previous line
+        block = self.currentBlock()
+        data = cursortools.data(block)
         prev = self.previousBlockState()
-        state = self._fridge.thaw(prev)
-        blank = not state and (not text or text.isspace())
-        if not state:
-            state = self.initialState()
-
-        # collect and save the tokens
-        tokens = tuple(state.tokens(text))
-        cursortools.data(self.currentBlock()).tokens = tokens
-
-        # if blank thus far, keep the highlighter coming back
-        # because the parsing state is not yet known; else save the state
-        self.setCurrentBlockState(prev - 1 if blank else self._fridge.freeze(state))
+        if self._lexUntil is None:
+            # start of a new pass, ends when we return to the event loop
+            self._lexUntil = block.blockNumber() + self.CHUNK_SIZE
+            QTimer.singleShot(0, self._endPass)
+        if prev == self.PENDING or block.blockNumber() > self._lexUntil:
+            # defer lexing this block
+            self._setPending(block, data)
+            return
+
+        key = (self._generation, prev, text)
+        if getattr(data, 'lexkey', None) == key and hasattr(data, 'tokens'):
+            # text and previous state unchanged, reuse the tokens
+            self.setCurrentBlockState(data.lexstate)
+        else:
+            t = time.perf_counter()
+            # find the state of the previous line
+            state = self._fridge.thaw(prev)
+            blank = not state and (not text or text.isspace())
+            if not state:
+                state = self.initialState()
+
+            # collect and save the tokens
+            data.tokens = tokenstore.TokenStore(text, state.tokens(text))
+
+            # if blank thus far, keep the highlighter coming back
+            # because the parsing state is not yet known; else save the state
+            data.lexstate = prev - 1 if blank else self._fridge.freeze(state)
+            data.lexkey = key
+            self.setCurrentBlockState(data.lexstate)
+            self._lexCount += 1
+            self._lexTime += time.perf_counter() - t
 
         # apply highlighting if desired
         if self._highlighting:
-            setFormat = lambda f: self.setFormat(token.pos, len(token), f)
             mapping = highlight_mapping()
-            for token in tokens:
-                f = mapping[token]
+            for cls, pos, length in data.tokens.spans():
+                try:
+                    f = dict.__getitem__(mapping, cls)
+                except KeyError:
+                    # let the mapping find and cache the format for this class
+                    f = mapping[cls('', 0)]
                 if f:
-                    setFormat(f)
+                    self.setFormat(pos, length, f)
+
+    def _setPending(self, block, data):
+        """(internal) Mark the block as not yet lexed."""
+        for attr in ('tokens', 'lexkey'):
+            try:
+                delattr(data, attr)
+            except AttributeError:
+                pass
+        self.setCurrentBlockState(self.PENDING)
+        num = block.blockNumber()
+        if not self._pending or num < self._pendingHint:
+            self._pendingHint = num
+        self._pending = True
+        if not self._timer.isActive():
+            self._timer.start(0)
+
+    def _endPass(self):
+        """(internal) Called when a highlighting pass has ended."""
+        self._lexUntil = None
+        if self._lexCount:
+            self._lastLexCount, self._lastLexTime = self._lexCount, self._lexTime
+            self._lexCount, self._lexTime = 0, 0.0
+            self.lexed(self._lastLexCount, self._lastLexTime)
+
+    def _firstPendingBlock(self):
+        """(internal) Return the first pending block, or an invalid block."""
+        doc = self.document()
+        start = doc.findBlockByNumber(self._pendingHint)
+        if not start.isValid():
+            start = doc.lastBlock()
+        # the hint may be too late if blocks were removed
+        block = start.previous()
+        while block.isValid() and block.userState() == self.PENDING:
+            start, block = block, block.previous()
+        block = start
+        while block.isValid():
+            if block.userState() == self.PENDING:
+                self._pendingHint = block.blockNumber()
+                return block
+            block = block.next()
+        self._pending = False
+        return block
+
+    def _continueLexing(self):
+        """(internal) Lex the next chunk of pending blocks."""
+        if self._pending:
+            block = self._firstPendingBlock()
+            if block.isValid():
+                self._lexRange(block, block.blockNumber() + self.CHUNK_SIZE - 1)
+                self._timer.start(0)
+
+    def _lexRange(self, block, last):
+        """(internal) Lex from block until (including) the block number last."""
+        old, self._lexUntil = self._lexUntil, last
+        if old is None:
+            QTimer.singleShot(0, self._endPass)
+        try:
+            self.rehighlightBlock(block)
+        finally:
+            self._lexUntil = old
+
+    def ensureHighlighted(self, block):
+        """Lex all pending blocks up to and including the given block.
+
+        Returns True if lexing was needed.
+
+        """
+        if self._pending and block.blockNumber() >= self._pendingHint:
+            first = self._firstPendingBlock()
+            if first.isValid() and first.blockNumber() <= block.blockNumber():
+                self._lexRange(first, block.blockNumber())
+                self._pendingHint = block.blockNumber() + 1
+                return True
+        return False
+
+    def isPending(self):
+        """Return True if there are blocks that are not lexed yet."""
+        return self._pending
+
+    def lexStatistics(self):
+        """Return a two-tuple (blocks, seconds) about the last lexing pass.
+
+        The number of blocks is the number of blocks that really needed to be
+        lexed again after the last change, and seconds is the time it took.
+
+        """
+        return self._lastLexCount, self._lastLexTime
 
     def setHighlighting(self, enable):
         """Enable or disable highlighting."""
@@ -184,6 +325,7 @@ class Highlighter(plugin.Plugin, QSyntaxHighlighter):
     def setInitialState(self, state):
         """Force the initial state. Use None to enable auto-detection."""
         self._initialState = self._fridge.freeze(state) if state else None
+        self._generation += 1
 
     def initialState(self):
         """Return the initial State for this document."""
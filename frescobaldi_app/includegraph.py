@@ -0,0 +1,228 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Keeps track of which documents include which files.
+
+Every open document with a local filename is a "master" in the include
+graph. For every master the set of (recursively) included files is stored,
+and for every included file the set of masters including it, so that the
+question "which documents include this file" is answered without searching.
+
+The graph is updated when documents are loaded, saved, renamed, closed or
+changed on disk (see documentwatcher). The included files are searched for
+in the background.
+
+"""
+
+
+import collections
+import os
+
+import app
+import documentinfo
+import documentwatcher
+import fileinfo
+import signals
+
+
+# emitted with the master filename when its set of included files changed
+changed = signals.Signal()
+
+
+class IncludeGraph(object):
+    """Maps masters to included files and back.
+
+    All filenames should be absolute, real paths.
+
+    """
+    def __init__(self):
+        self._includes = {}
+        self._masters = collections.defaultdict(set)
+
+    def update(self, master, files):
+        """Set the files included by master.
+
+        Returns True if the set of included files changed.
+
+        """
+        files = frozenset(files)
+        old = self._includes.get(master, frozenset())
+        if master in self._includes and old == files:
+            return False
+        for filename in old - files:
+            self._remove_master(filename, master)
+        for filename in files - old:
+            self._masters[filename].add(master)
+        self._includes[master] = files
+        return True
+
+    def remove(self, master):
+        """Remove master from the graph."""
+        for filename in self._includes.pop(master, ()):
+            self._remove_master(filename, master)
+
+    def _remove_master(self, filename, master):
+        """(internal) Remove master from the set of masters of filename."""
+        masters = self._masters.get(filename)
+        if masters is not None:
+            masters.discard(master)
+            if not masters:
+                del self._masters[filename]
+
+    def includes(self, master):
+        """Return the set of files included by master."""
+        return self._includes.get(master, frozenset())
+
+    def masters(self, filename):
+        """Return the set of masters including filename."""
+        return frozenset(self._masters.get(filename, ()))
+
+    def all_masters(self):
+        """Return all masters in the graph."""
+        return list(self._includes)
+
+
+_graph = IncludeGraph()
+_resolvers = {}
+
+
+def graph():
+    """Return the global IncludeGraph."""
+    return _graph
+
+
+def masters(filename):
+    """Return the set of filenames of open documents that include filename."""
+    return _graph.masters(os.path.realpath(filename))
+
+
+def master_documents(filename):
+    """Return the list of open documents that include filename."""
+    names = masters(filename)
+    return [d for d in app.documents if names and _filename(d) in names]
+
+
+def _filename(doc):
+    """Return the real path of the document, or None if it is not local."""
+    filename = doc.url().toLocalFile()
+    if filename:
+        return os.path.realpath(filename)
+
+
+def _update(doc):
+    """Recompute the included files of the document.
+
+    The included files are searched in the background, a newer update of the
+    same document cancels the search that is still running.
+
+    """
+    filename = _filename(doc)
+    if filename:
+        dinfo = documentinfo.info(doc)
+        if doc.isLazy():
+            # not loaded yet, read the includes from the file
+            _resolver(filename).start(filename, None, dinfo.includepath())
+            return
+        lydinfo = dinfo.lydocinfo()
+        _resolver(filename).start(lydinfo.document.filename,
+                                  lydinfo.include_args(), dinfo.includepath())
+
+
+def _resolver(filename):
+    """Return the IncludeResolver for the master filename."""
+    try:
+        return _resolvers[filename]
+    except KeyError:
+        r = _resolvers[filename] = fileinfo.IncludeResolver()
+        @r.finished.connect
+        def finished(files):
+            if _graph.update(filename, files):
+                changed(filename)
+        return r
+
+
+def _remove(filename):
+    """Remove the master filename from the graph, cancel its update."""
+    r = _resolvers.pop(filename, None)
+    if r:
+        r.cancel()
+    _graph.remove(filename)
+
+
+def _update_masters(filename):
+    """Recompute the included files of all documents including filename.
+
+    Called when the file is saved or changed, as it may have changed its
+    own includes.
+
+    """
+    for doc in master_documents(filename):
+        _update(doc)
+
+
+@app.documentCreated.connect
+def _document_created(doc):
+    if doc.isLazy():
+        _update(doc)
+
+
+@app.documentLoaded.connect
+def _document_loaded(doc):
+    _update(doc)
+
+
+@app.sessionChanged.connect
+def _session_changed(name):
+    # the include path can be different
+    for doc in app.documents:
+        _update(doc)
+
+
+@app.documentSaved.connect
+def _document_saved(doc):
+    _update(doc)
+    filename = _filename(doc)
+    if filename:
+        _update_masters(filename)
+
+
+@app.documentUrlChanged.connect
+def _document_url_changed(doc, url, old):
+    filename = old.toLocalFile()
+    if filename and not app.findDocument(old):
+        _remove(os.path.realpath(filename))
+    _update(doc)
+
+
+@app.documentClosed.connect
+def _document_closed(doc):
+    filename = _filename(doc)
+    if filename:
+        for d in app.documents:
+            if d is not doc and d.url() == doc.url():
+                return
+        _remove(filename)
+
+
+@documentwatcher.documentChangedOnDisk.connect
+def _document_changed_on_disk(doc):
+    filename = _filename(doc)
+    if filename:
+        _update_masters(filename)
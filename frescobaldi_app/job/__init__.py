@@ -209,12 +209,20 @@ class Job(object):
     def start(self):
         """Starts the process."""
         self.configure_command()
+        self._reset()
+        self._start_process()
+
+    def _reset(self):
+        """(internal) Reset the state of the job before it is started."""
         self.success = None
         self.error = None
         self._aborted = False
         self._history = []
         self._elapsed = 0.0
         self._starttime = time.time()
+
+    def _start_process(self):
+        """(internal) Start the process with the configured command."""
         if self._process is None:
             self.set_process(QProcess())
         self._process.started.connect(self.started)
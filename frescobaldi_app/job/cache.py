@@ -0,0 +1,230 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+A persistent, content-addressed cache of LilyPond engrave results.
+
+The key of a cache entry is a hash over everything that determines the
+output of a LilyPond run: the main document, all (recursively) included
+files, the LilyPond version and the command line options.
+
+If a LilyPondJob is started and the cache contains an entry for its key,
+the result files (PDF, MIDI, SVG etc.) are copied back to the job's
+directory instead of running LilyPond.
+
+The cache is evicted in least-recently-used order when its total size
+exceeds the configured maximum.
+"""
+
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from PyQt5.QtCore import QSettings, QStandardPaths
+
+import util
+
+
+# The extensions of files that are stored in the cache
+RESULT_EXTENSIONS = (
+    '.pdf', '.midi', '.mid', '.svg', '.svgz', '.png', '.eps', '.ps')
+
+# The name of the file describing a cache entry
+MANIFEST = 'manifest.json'
+
+# Increase when the way the keys are computed changes
+_CACHE_VERSION = 1
+
+
+_cache = None
+
+def cache():
+    """Return the global EngraveCache, or None if caching is disabled."""
+    global _cache
+    s = QSettings()
+    s.beginGroup("lilypond_settings")
+    if not s.value("engrave_cache", False, bool):
+        return None
+    directory = s.value("engrave_cache_dir", "", str) or default_directory()
+    max_size = s.value("engrave_cache_size", 500, int) * 1024 * 1024
+    if _cache is None or _cache.directory != directory:
+        _cache = EngraveCache(directory, max_size)
+    else:
+        _cache.max_size = max_size
+    return _cache
+
+
+def default_directory():
+    """Return the default directory for the engrave cache."""
+    return os.path.join(QStandardPaths.writableLocation(
+        QStandardPaths.CacheLocation), 'engrave')
+
+
+class EngraveCache(object):
+    """Stores and restores the result files of LilyPond jobs."""
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+
+    def key(self, job):
+        """Return the cache key (a hex digest) for the given LilyPondJob.
+
+        Returns None if the key could not be computed, e.g. because one of
+        the files could not be read.
+
+        """
+        h = hashlib.sha1()
+        def add(text):
+            h.update(text.encode('utf-8'))
+            h.update(b'\0')
+        def add_file(filename):
+            add(filename)
+            with open(filename, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b''):
+                    h.update(chunk)
+            h.update(b'\0')
+
+        from .lilypond import serialize_d_options
+        info = job.lilypond_info
+        add(str(_CACHE_VERSION))
+        add(info.abscommand() or info.command)
+        add(info.versionString())
+        for arg in serialize_d_options(job._d_options, ordered=True):
+            add(arg)
+        for arg in job.arguments():
+            add(arg)
+        for arg in job.backend_args():
+            add(arg)
+        for path in job.includepath:
+            add(path)
+        try:
+            add_file(job.filename())
+            for filename in sorted(job.document_info.includefiles()):
+                add_file(filename)
+        except (OSError, IOError):
+            return None
+        return h.hexdigest()
+
+    def entry(self, key):
+        """Return the directory for the entry with the given key."""
+        return os.path.join(self.directory, key[:2], key)
+
+    def restore(self, key, directory):
+        """Copy the files of the entry with key to the directory.
+
+        Returns the list of restored filenames, or None if there was no
+        (usable) entry for the key.
+
+        """
+        entry = self.entry(key)
+        try:
+            with open(os.path.join(entry, MANIFEST), encoding='utf-8') as f:
+                names = json.load(f)['files']
+        except (OSError, IOError, ValueError, KeyError):
+            return None
+        files = []
+        try:
+            for i, name in enumerate(names):
+                filename = os.path.join(directory, name)
+                os.makedirs(os.path.dirname(filename), exist_ok=True)
+                shutil.copyfile(os.path.join(entry, str(i)), filename)
+                files.append(filename)
+            # mark the restored files and the entry as recently used
+            now = time.time()
+            for filename in files:
+                os.utime(filename, (now, now))
+            os.utime(entry, (now, now))
+        except (OSError, IOError):
+            return None
+        return files
+
+    def store(self, key, directory, files):
+        """Store the files (relative to directory) in the entry with key."""
+        entry = self.entry(key)
+        tmp = entry + '.tmp'
+        try:
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            names = []
+            for i, filename in enumerate(files):
+                shutil.copyfile(filename, os.path.join(tmp, str(i)))
+                names.append(os.path.relpath(filename, directory))
+            with open(os.path.join(tmp, MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump({'files': names}, f)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.rename(tmp, entry)
+        except (OSError, IOError):
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
+
+    def entries(self):
+        """Yield (mtime, size, path) tuples for all entries in the cache."""
+        try:
+            prefixes = os.listdir(self.directory)
+        except (OSError, IOError):
+            return
+        for prefix in prefixes:
+            d = os.path.join(self.directory, prefix)
+            try:
+                names = os.listdir(d)
+            except (OSError, IOError):
+                continue
+            for name in names:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(d, name)
+                try:
+                    mtime = os.path.getmtime(path)
+                    size = sum(e.stat().st_size for e in os.scandir(path))
+                except (OSError, IOError):
+                    continue
+                yield mtime, size, path
+
+    def size(self):
+        """Return the total size of the cache in bytes."""
+        return sum(size for mtime, size, path in self.entries())
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits."""
+        entries = sorted(self.entries())
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def result_files(job):
+    """Return the result files the (finished) LilyPondJob has created."""
+    files = util.files(job.document_info.basenames(), '.*')
+    try:
+        files = util.newer_files(files, job.start_time())
+    except (OSError, IOError):
+        return []
+    return [f for f in files
+            if os.path.splitext(f)[1].lower() in RESULT_EXTENSIONS]
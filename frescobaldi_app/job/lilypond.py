@@ -27,15 +27,16 @@ import glob
 import os
 import shutil
 import sys
+import time
 
-from PyQt5.QtCore import QSettings, QUrl
+from PyQt5.QtCore import QSettings, QTimer, QUrl
 
 import ly.document
 import ly.docinfo
 
 import document
 import documentinfo
-from . import Job
+from . import Job, NEUTRAL, SUCCESS
 import lilypondinfo
 import util
 
@@ -81,18 +82,31 @@ class LilyPondJob(Job):
     added from which the command line is implicitly composed in
     configure_command().
 
+    If the engrave cache is enabled in the Preferences and the results
+    of an identical run are available in the cache, they are restored
+    instead of running LilyPond. Set use_cache to False to prevent this.
+
     """
 
+    use_cache = True
+
     def __init__(self, doc, args=None, title=""):
         """Create a LilyPond job by first retrieving some context
-        from the document and feeding this into job.Job's __init__()."""
+        from the document and feeding this into job.Job's __init__().
+
+        A lazy document is loaded first; an IOError is raised if that fails.
+
+        """
         if isinstance(doc, QUrl):
             doc = document.Document(doc)
+        doc.loadLazy()
+        doc.waitForSave()
         self.document = doc
         self.document_info = docinfo = documentinfo.info(doc)
         self.lilypond_info = docinfo.lilypondinfo()
         self._d_options = {}
         self._backend_args = []
+        self._cache_key = None
         input, self.includepath = docinfo.jobinfo(True)
         directory = os.path.dirname(input)
 
@@ -179,6 +193,46 @@ class LilyPondJob(Job):
     def d_option(self, key):
         return self._d_options.get(key, None)
 
+    def start(self):
+        """Start the job, restoring the results from the cache if possible."""
+        from . import cache
+        self.configure_command()
+        self._reset()
+        c = cache.cache() if self.use_cache else None
+        self._cache_key = key = c.key(self) if c else None
+        if key:
+            files = c.restore(key, self.directory())
+            if files is not None:
+                self._restored_from_cache(files)
+                return
+            self.done.connect(self._store_in_cache)
+        self._start_process()
+
+    def _restored_from_cache(self, files):
+        """(internal) Finish the job after results were restored from the cache."""
+        self.started()
+        self.start_message()
+        self.message(_("Restored {count} file(s) from the engrave cache.").format(
+            count=len(files)), NEUTRAL)
+        self.message(_("Completed successfully in {time}.").format(
+            time=self.elapsed2str(time.time() - self._starttime)), SUCCESS)
+        def finish():
+            self._elapsed = time.time() - self._starttime
+            self.success = True
+            self.done(True)
+        # emit done() after the caller has finished starting the job
+        QTimer.singleShot(0, finish)
+
+    def _store_in_cache(self, success):
+        """(internal) Store the results of a successful run in the cache."""
+        self.done.disconnect(self._store_in_cache)
+        from . import cache
+        c = cache.cache()
+        if success and c and self._cache_key and not self.is_aborted():
+            files = cache.result_files(self)
+            if files:
+                c.store(self._cache_key, self.directory(), files)
+
     def paths(self, includepath):
         """Ensure paths have trailing slashes for Windows compatibility."""
         result = []
@@ -224,6 +278,9 @@ class VolatileTextJob(PublishJob):
     base_dir can be used to add a 'virtual' document Directory
     in order to use relative includes.
     """
+
+    use_cache = False
+
     def __init__(
         self, text, title=None, base_dir=None):
         # TODO: ???
@@ -276,6 +333,8 @@ class CachedPreviewJob(PublishJob):
 
     _target_dir = util.tempdir()
 
+    use_cache = False
+
     def __init__(
         self, text, target_dir=None, title=None, base_dir=None
     ):
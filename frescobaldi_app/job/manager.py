@@ -26,6 +26,8 @@ It also sends the app-wide signals jobStarted() and jobFinished().
 """
 
 
+import functools
+
 import app
 import plugin
 import signals
@@ -52,24 +54,63 @@ class JobManager(plugin.DocumentPlugin):
 
     def __init__(self, document):
         self._job = None
+        self._queued = None     # our job waiting in the global job queue
+        self._target = None     # the queue it is waiting in
 
     def start_job(self, job):
-        """Starts a Job on our behalf."""
+        """Starts a Job on our behalf.
+
+        A job of ours that is still waiting in the global job queue is
+        removed from the queue.
+
+        """
         if not self.is_running():
+            self._unqueue()
             self._job = job
-            job.done.connect(self._finished)
+            job.done.connect(functools.partial(self._finished, job))
             job.start()
             self.started(job)
             app.jobStarted(self.document(), job)
 
-    def _finished(self, success):
+    def queue_job(self, job, target='engrave'):
+        """Adds a Job to the global job queue on our behalf.
+
+        The started() and app.jobStarted() signals are emitted when the
+        queue actually starts the job. Nothing happens if a job is running
+        or already waiting in the queue.
+
+        """
+        if not self.is_running() and not self.is_queued():
+            self._job = self._queued = job
+            self._target = target
+            job.done.connect(functools.partial(self._finished, job))
+            job.started.connect(functools.partial(self._queued_job_started, job))
+            app.job_queue().add_job(job, target)
+
+    def _unqueue(self):
+        """Remove our job from the global job queue if it is still waiting."""
+        if self._queued:
+            app.job_queue().remove_job(self._queued, self._target)
+            self._queued = None
+
+    def _queued_job_started(self, job):
+        if job is self._queued:
+            self._queued = None
+            self.started(job)
+            app.jobStarted(self.document(), job)
+
+    def _finished(self, job, success):
         self.finished(job, success)
-        app.jobFinished(self.document(), self._job, success)
+        app.jobFinished(self.document(), job, success)
 
     def job(self):
         """Returns the last job if any."""
         return self._job
 
+    def is_queued(self):
+        """Returns True when our job is waiting in the global job queue."""
+        return self._queued is not None
+
     def is_running(self):
         """Returns True when a job is running."""
         if self._job:
@@ -23,9 +23,10 @@ A (multithreaded) Job queue
 
 from enum import Enum
 import collections
+import os
 import time
 
-from PyQt5.QtCore import QObject
+from PyQt5.QtCore import QObject, QSettings
 
 import app
 import signals
@@ -55,6 +56,10 @@ class Runner(QObject):
         self._index = index
         self._job = None
         self._completed = 0
+        self._created = time.time()
+        self._busy = 0.0
+        self._job_start = 0.0
+        self._retired = False
 
     def abort(self):
         """Aborts a running job if any."""
@@ -69,6 +74,36 @@ class Runner(QObject):
         """Return the index of the Runner in the JobQueue."""
         return self._index
 
+    def set_index(self, index):
+        """Set the index of the Runner, when the JobQueue is resized."""
+        self._index = index
+
+    def busy_time(self):
+        """Return the number of seconds the Runner has spent running jobs,
+        including the currently running job, if any."""
+        busy = self._busy
+        if self._job_start:
+            busy += time.time() - self._job_start
+        return busy
+
+    def utilization(self):
+        """Return the fraction (0.0 - 1.0) of the Runner's lifetime
+        that has been spent running jobs."""
+        lifetime = time.time() - self._created
+        if lifetime <= 0:
+            return 0.0
+        return min(1.0, self.busy_time() / lifetime)
+
+    def is_retired(self):
+        """Return True if the Runner has been removed from its queue
+        (while it still was running a job)."""
+        return self._retired
+
+    def retire(self):
+        """Mark the Runner as removed from its queue.
+        A running job is allowed to finish but no new job will be started."""
+        self._retired = True
+
     def is_running(self):
         return self._job and self._job.is_running()
 
@@ -78,10 +113,26 @@ class Runner(QObject):
     def job_done(self):
         """Count job, notify queue, remove reference to Job object."""
         self._completed += 1
+        if self._job_start:
+            self._busy += time.time() - self._job_start
+            self._job_start = 0.0
         job = self._job
         self._job = None
+        job.done.disconnect(self.job_done)
+        self.utilization_message(job)
         self._queue.job_completed(self, job)
 
+    def utilization_message(self, job):
+        """Write a message about the Runner's utilization to the job's log."""
+        from . import NEUTRAL
+        job.message(_(
+            "\nRunner {index} of {count}: {completed} job(s) completed, "
+            "{utilization}% utilized.").format(
+                index=self._index + 1,
+                count=self._queue.num_runners(),
+                completed=self._completed,
+                utilization=round(self.utilization() * 100)), NEUTRAL)
+
     def start(self, j, force=False):
         """Start a given job.
         If currently a job is running either abort that
@@ -95,6 +146,7 @@ class Runner(QObject):
         self._job = j
         j.set_runner(self)
         j.done.connect(self.job_done)
+        self._job_start = time.time()
         j.start()
 
 
@@ -128,6 +180,11 @@ class AbstractQueue(QObject):
         """Remove and return the next job."""
         raise NotImplementedError
 
+    def remove(self, j):
+        """Remove a job from the queue.
+        Raises ValueError if the job is not in the queue."""
+        raise NotImplementedError
+
 
 class AbstractStackQueue(AbstractQueue):
     """Common ancestor for LIFO and FIFO queues"""
@@ -143,6 +200,9 @@ class AbstractStackQueue(AbstractQueue):
     def pop(self):
         return self._queue.pop()
 
+    def remove(self, j):
+        self._queue.remove(j)
+
 
 class Queue(AbstractStackQueue):
     """First-in-first-out queue (default operation)."""
@@ -188,6 +248,15 @@ class PriorityQueue(AbstractQueue):
         from heapq import heappop
         return heappop(self._queue)[2]
 
+    def remove(self, j):
+        from heapq import heapify
+        for i, entry in enumerate(self._queue):
+            if entry[2] is j:
+                del self._queue[i]
+                heapify(self._queue)
+                return
+        raise ValueError("Job not in queue")
+
 
 class JobQueueException(Exception):
     """Abstract base exception for JobQueue related exceptions."""
@@ -343,6 +412,21 @@ class JobQueue(QObject):
                 QueueStatus.EMPTY if self._queue.empty()
                 else QueueStatus.STARTED)
 
+    def remove_job(self, job):
+        """Remove a job that is waiting in the queue.
+
+        Returns True if the job was removed, False if it was not waiting
+        (e.g. because it has already been started).
+        """
+        try:
+            self._queue.remove(job)
+        except ValueError:
+            return False
+        if self._queue.empty() and self.state() == QueueStatus.STARTED:
+            self.set_state(QueueStatus.EMPTY)
+            self.emptied.emit()
+        return True
+
     def completed(self, runner=-1):
         """Return the number of completed jobs,
         either for a given runner or the sum of all runners."""
@@ -389,7 +473,20 @@ class JobQueue(QObject):
         Manage behaviour at that point, depending on the
         queue's state and mode.
         """
-        if self.state() == QueueStatus.STARTED:
+        if runner.is_retired():
+            # the runner has been removed by resize() while running
+            if self.state() == QueueStatus.STARTED:
+                # a job may be waiting for a free runner
+                idle = self.idle_runner()
+                if idle:
+                    idle.start(self.pop())
+            elif self.state() != QueueStatus.PAUSED and self.is_idle():
+                if self.queue_mode() == QueueMode.SINGLE:
+                    self.queue_finished()
+                else:
+                    self.set_state(QueueStatus.IDLE)
+                    self.idle.emit()
+        elif self.state() == QueueStatus.STARTED:
             runner.start(self.pop())
         elif self.state() == QueueStatus.PAUSED:
             # If a SINGLE queue completes the last job while in PAUSE mode
@@ -410,6 +507,47 @@ class JobQueue(QObject):
                 self.idle.emit()
         self.job_done.emit(job)
 
+    def num_runners(self):
+        """Return the number of Runners in the queue."""
+        return len(self._runners)
+
+    def runners(self):
+        """Return a list of the queue's Runners."""
+        return list(self._runners)
+
+    def resize(self, num_runners):
+        """Change the number of Runners to num_runners.
+
+        Queued jobs are kept. If Runners are added to an active queue
+        they immediately start working on waiting jobs. When Runners are
+        removed, idle Runners are removed first. Busy Runners that have
+        to be removed are allowed to complete their running job.
+        """
+        num_runners = max(1, num_runners)
+        current = len(self._runners)
+        if num_runners > current:
+            self._runners.extend(
+                Runner(self, i) for i in range(current, num_runners))
+            if self.state() in [
+                QueueStatus.STARTED,
+                QueueStatus.EMPTY,
+                QueueStatus.IDLE,
+            ]:
+                for runner in self._runners[current:]:
+                    if self._queue.empty():
+                        break
+                    self.set_state(QueueStatus.STARTED)
+                    runner.start(self.pop())
+        elif num_runners < current:
+            runners = sorted(self._runners, key=lambda r: bool(r.is_running()))
+            keep, remove = runners[:num_runners], runners[num_runners:]
+            for runner in remove:
+                runner.retire()
+            keep.sort(key=lambda r: r.index())
+            for i, runner in enumerate(keep):
+                runner.set_index(i)
+            self._runners = keep
+
     def pause(self):
         """Pauses the execution of the queue.
         Running jobs are allowed to finish, but no new jobs will be started.
@@ -526,10 +664,11 @@ class GlobalJobQueue(QObject):
     """
 
     def __init__(self):
+        super(GlobalJobQueue, self).__init__()
         self.load_settings()
-        self._crawler = JobQueue()
-        self._engraver = JobQueue()
-        self._generic = JobQueue()
+        self._crawler = JobQueue(num_runners=self._num_runners['crawl'])
+        self._engraver = JobQueue(num_runners=self._num_runners['engrave'])
+        self._generic = JobQueue(num_runners=self._num_runners['generic'])
         self._queues = {
             'crawl': self._crawler,
             'engrave': self._engraver,
@@ -553,10 +692,45 @@ class GlobalJobQueue(QObject):
             raise ValueError(_("Invalid job queue target: {name}").format(name=target))
         target_queue.add_job(j)
 
+    def remove_job(self, j, target='engrave'):
+        """Remove a job that is still waiting in the specified job queue.
+        Returns True if the job was removed."""
+        return self._queues[target].remove_job(j)
+
     def load_settings(self):
-        # TODO: Load settings and create the JobQueues accordingly
-        pass
+        """Read the number of runners for each queue from the settings."""
+        self._num_runners = num_runners()
+
+    def queue(self, target='engrave'):
+        """Return the JobQueue for the specified target."""
+        return self._queues[target]
 
     def settings_changed(self):
-        # TODO: If multicore-related settings have changed update the queues
-        pass
+        """Resize the queues if the number of runners has changed."""
+        old = self._num_runners
+        self.load_settings()
+        for name, queue in self._queues.items():
+            if self._num_runners[name] != old[name]:
+                queue.resize(self._num_runners[name])
+
+
+def default_num_runners(target):
+    """Return the default number of runners for the given queue target.
+
+    The 'engrave' queue defaults to the number of CPU cores, the other
+    queues to a single runner.
+    """
+    if target == 'engrave':
+        return os.cpu_count() or 1
+    return 1
+
+
+def num_runners():
+    """Return a dictionary with the configured number of runners per queue."""
+    s = QSettings()
+    s.beginGroup("job_queue")
+    return {
+        target: max(1, s.value("{0}_runners".format(target),
+                               default_num_runners(target), int))
+        for target in ('crawl', 'engrave', 'generic')
+    }
@@ -36,6 +36,7 @@ import install          # Update QSettings structure etc. if needed
 import guistyle         # Setup GUI style
 import i18n.setup       # Setup language
 import remote           # IPC with other Frescobaldi instances
+import startupprofile   # Measure startup time (--profile-startup)
 
 
 def parse_commandline():
@@ -70,6 +71,21 @@ def parse_commandline():
         help=_("Always start a new instance"))
     parser.add_argument('--python-ly', type=str, metavar=_("STR"), default="",
         help=_("Path to python-ly"))
+    parser.add_argument('--engrave', action="store_true", default=False,
+        help=_("Engrave the given files, directories or glob patterns "
+               "without opening a window, and exit"))
+    parser.add_argument('--engrave-mode', choices=('publish', 'preview'),
+        default='publish', help=_("Engrave mode for --engrave (default: publish)"))
+    parser.add_argument('-j', '--jobs', type=int, metavar=_("NUM"),
+        help=_("Number of parallel jobs for --engrave"))
+    parser.add_argument('--summary', metavar=_("FILE"),
+        help=_("Write the JSON summary of --engrave to FILE instead of "
+               "standard output"))
+    parser.add_argument('--verbose', action="store_true", default=False,
+        help=_("Show the LilyPond output of --engrave jobs"))
+    parser.add_argument('--profile-startup', action="store_true", default=False,
+        help=_("Write a report of the time needed to import the modules "
+               "and to open the window to standard error"))
     parser.add_argument('files', metavar=_("file"), nargs='*',
         help=_("File to be opened"))
 
@@ -93,7 +109,10 @@ def parse_commandline():
                 break
             args.pop(0)
 
-    return parser.parse_args(args[1:])
+    options = parser.parse_args(args[1:])
+    if options.jobs is not None and options.jobs < 1:
+        parser.error(_("argument -j/--jobs: must be at least 1"))
+    return options
 
 
 def url(arg):
@@ -164,6 +183,10 @@ def main():
 
     check_ly()
 
+    if args.engrave:
+        import batchengrave
+        sys.exit(batchengrave.run(args))
+
     if args.list_sessions:
         import sessions
         for name in sessions.sessionNames():
@@ -210,12 +233,15 @@ def main():
         session.restoreSession(app.qApp.sessionKey())
         return
 
+    startupprofile.mark("modules imported")
+
     # Just create one MainWindow
     win = mainwindow.MainWindow()
     win.show()
     win.activateWindow()
     # make sure all dock tools are initialized and resized
     app.qApp.processEvents()
+    startupprofile.mark("main window shown")
 
     # load specified session?
     doc = None
@@ -241,6 +267,8 @@ def main():
         win.setCurrentDocument(doc)
     else:
         win.cleanStart()
+    startupprofile.mark("documents loaded")
+    QTimer.singleShot(0, startupprofile.finish)
 
     if urls and args.line is not None:
         # set the last loaded document active and apply navigation if requested
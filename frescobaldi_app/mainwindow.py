@@ -351,6 +351,7 @@ class MainWindow(QMainWindow):
 
         If modified, asks the user. The document is not closed.
         """
+        doc.waitForSave()
         if not doc.isModified():
             allow_close = True
         else:
@@ -563,12 +564,16 @@ class MainWindow(QMainWindow):
         else:
             return False
 
-    def saveDocument(self, doc, save_as=False):
+    def saveDocument(self, doc, save_as=False, background=False):
         """ Saves the document, asking for a name if necessary.
 
         If save_as is True, a name is always asked.
         Returns True if saving succeeded.
 
+        If background is True, the document is written in a background
+        thread, and True is returned if saving was started. An error is
+        reported when saving has finished.
+
         """
         if save_as or doc.url().isEmpty():
             filename = doc.url().toLocalFile()
@@ -601,15 +606,23 @@ class MainWindow(QMainWindow):
 
         # we only support local files for now
         filename = url.toLocalFile()
+        if background:
+            def finished(error):
+                if error:
+                    self.saveDocumentFailed(filename, error)
+                else:
+                    recentfiles.add(doc.url())
+            try:
+                doc.saveInBackground(url, makeBackup=True, finished=finished)
+            except IOError as e:
+                self.saveDocumentFailed(filename, e)
+                return False
+            return True
         b = backup.backup(filename)
         try:
             doc.save(url)
         except IOError as e:
-            msg = _("{message}\n\n{strerror} ({errno})").format(
-                message = _("Could not write to: {url}").format(url=filename),
-                strerror = e.strerror,
-                errno = e.errno)
-            QMessageBox.critical(self, app.caption(_("Error")), msg)
+            self.saveDocumentFailed(filename, e)
             return False
         else:
             if b:
@@ -617,6 +630,18 @@ class MainWindow(QMainWindow):
             recentfiles.add(doc.url())
         return True
 
+    def saveDocumentFailed(self, filename, e):
+        """Show a message that the document could not be saved.
+
+        e is the IOError that occurred.
+
+        """
+        msg = _("{message}\n\n{strerror} ({errno})").format(
+            message = _("Could not write to: {url}").format(url=filename),
+            strerror = e.strerror,
+            errno = e.errno)
+        QMessageBox.critical(self, app.caption(_("Error")), msg)
+
     def saveDocumentAs(self, doc):
         """ Saves the document, always asking for a name.
 
@@ -643,10 +668,10 @@ class MainWindow(QMainWindow):
         return self.renameDocument(self.currentDocument())
 
     def saveCurrentDocument(self):
-        return self.saveDocument(self.currentDocument())
+        return self.saveDocument(self.currentDocument(), background=True)
 
     def saveCurrentDocumentAs(self):
-        return self.saveDocumentAs(self.currentDocument())
+        return self.saveDocument(self.currentDocument(), True, background=True)
 
     def saveCopyAs(self):
         import ly.lex
@@ -19,12 +19,23 @@
 
 """
 Store meta information about documents.
+
+The information is stored in an SQLite database in the configuration
+directory, one row per document URL. Changes are written in batches, a short
+while after a document is closed and when the application quits.
+
+Older versions stored the information in a QSettings group per document;
+those groups are moved to the database the first time it is opened.
+
 """
 
 
+import json
+import os
+import sqlite3
 import time
 
-from PyQt5.QtCore import QSettings, QUrl
+from PyQt5.QtCore import QSettings, QStandardPaths, QTimer
 
 import app
 import plugin
@@ -37,6 +48,16 @@ __all__ = ["info", "define"]
 # This dictionary store the default values: "name": [default, readfunc]
 _defaults = {}
 
+# The database connection, False if the database could not be opened
+_db = None
+
+# Rows that still need to be written: key -> (time, data)
+_pending = {}
+_write_timer = None
+
+# Write pending rows this many msec after the last change
+WRITE_DELAY = 2000
+
 
 def info(doc):
     """Returns a MetaInfo object for the Document."""
@@ -67,6 +88,95 @@ def define(name, default, readfunc=None):
         minfo.loadValue(name)
 
 
+def database_filename():
+    """Return the filename of the metainfo database."""
+    return os.path.join(QStandardPaths.writableLocation(
+        QStandardPaths.AppConfigLocation), 'metainfo.sqlite')
+
+
+def database():
+    """Return the database connection, or None if it can't be opened."""
+    global _db
+    if _db is None:
+        filename = database_filename()
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            _db = sqlite3.connect(filename)
+            with _db:
+                _db.execute("CREATE TABLE IF NOT EXISTS metainfo ("
+                            "key TEXT PRIMARY KEY, time REAL, data TEXT)")
+                _db.execute("CREATE INDEX IF NOT EXISTS metainfo_time "
+                            "ON metainfo (time)")
+            migrate()
+        except (OSError, sqlite3.Error):
+            _db = False
+    return _db or None
+
+
+def migrate():
+    """Move the metainfo stored in QSettings groups to the database."""
+    s = app.settings('metainfo')
+    groups = s.childGroups()
+    if not groups:
+        return
+    rows = []
+    for key in groups:
+        s.beginGroup(key)
+        data = {name: s.value(name) for name in s.childKeys() if name != "time"}
+        rows.append((key, s.value("time", 0.0, float), json.dumps(data)))
+        s.endGroup()
+    with _db:
+        _db.executemany("INSERT OR IGNORE INTO metainfo (key, time, data) "
+                        "VALUES (?, ?, ?)", rows)
+    s.remove("")
+
+
+def load(key):
+    """Return the stored dictionary for the key, or an empty dictionary."""
+    try:
+        return _pending[key][1]
+    except KeyError:
+        pass
+    db = database()
+    if db:
+        try:
+            row = db.execute("SELECT data FROM metainfo WHERE key = ?",
+                             (key,)).fetchone()
+        except sqlite3.Error:
+            row = None
+        if row:
+            try:
+                return json.loads(row[0])
+            except ValueError:
+                pass
+    return {}
+
+
+def store(key, data):
+    """Store the dictionary for the key; it is written a bit later."""
+    global _write_timer
+    _pending[key] = (time.time(), data)
+    if _write_timer is None:
+        _write_timer = QTimer(singleShot=True, timeout=flush)
+    _write_timer.start(WRITE_DELAY)
+
+
+def flush():
+    """Write all pending changes to the database."""
+    if _write_timer:
+        _write_timer.stop()
+    db = database()
+    if db and _pending:
+        rows = [(key, t, json.dumps(data)) for key, (t, data) in _pending.items()]
+        try:
+            with db:
+                db.executemany("INSERT OR REPLACE INTO metainfo (key, time, data) "
+                               "VALUES (?, ?, ?)", rows)
+        except sqlite3.Error:
+            pass
+    _pending.clear()
+
+
 class MetaInfo(plugin.DocumentPlugin):
     """Stores meta-information for a Document."""
     def __init__(self, doc):
@@ -75,40 +185,56 @@ class MetaInfo(plugin.DocumentPlugin):
             doc.loaded.connect(self.load, -999) # before all others
             doc.closed.connect(self.save,  999) # after all others
 
-    def settingsGroup(self):
+    def key(self):
+        """Return the key the info is stored under, None for an unnamed document."""
         url = self.document().url()
         if not url.isEmpty():
-            s = app.settings('metainfo')
-            s.beginGroup(url.toString().replace('\\', '_').replace('/', '_'))
-            return s
+            return url.toString().replace('\\', '_').replace('/', '_')
+
+    def data(self):
+        """Return the stored dictionary, empty if nothing is stored (or wanted)."""
+        key = self.key()
+        if key and QSettings().value("metainfo", True, bool):
+            return load(key)
+        return {}
 
     def load(self):
-        s = self.settingsGroup()
+        data = self.data()
         for name in _defaults:
-            self.loadValue(name, s)
+            self.loadValue(name, data)
 
-    def loadValue(self, name, settings=None):
-        s = settings or self.settingsGroup()
+    def loadValue(self, name, data=None):
+        if data is None:
+            data = self.data()
         default, readfunc = _defaults[name]
-        if s and QSettings().value("metainfo", True, bool):
-            self.__dict__[name] = readfunc(s.value(name, default))
+        if name in data:
+            self.__dict__[name] = readfunc(data[name])
         else:
             self.__dict__[name] = default
 
     def save(self):
-        s = self.settingsGroup()
-        if s:
-            s.setValue("time", time.time())
+        key = self.key()
+        if key:
+            # keep values of names that are not defined in this session
+            data = dict(load(key))
             for name in _defaults:
                 value = self.__dict__[name]
-                s.remove(name) if value == _defaults[name][0] else s.setValue(name, value)
+                if value != _defaults[name][0]:
+                    data[name] = value
+                else:
+                    data.pop(name, None)
+            store(key, data)
 
 
 @app.aboutToQuit.connect
 def prune():
-    """Prune old info."""
-    s = app.settings('metainfo')
-    month_ago = time.time() - 31 * 24 * 3600
-    for key in s.childGroups():
-        if s.value(key + "/time", 0.0, float) < month_ago:
-            s.remove(key)
+    """Write pending changes and prune old info."""
+    flush()
+    db = database()
+    if db:
+        month_ago = time.time() - 31 * 24 * 3600
+        try:
+            with db:
+                db.execute("DELETE FROM metainfo WHERE time < ?", (month_ago,))
+        except sqlite3.Error:
+            pass
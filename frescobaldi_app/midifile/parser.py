@@ -25,12 +25,19 @@ its tracks.
 A basic event factory returns the MIDI events as simple named tuples,
 but you can subclass the event factory for more sophisticated behaviour.
 
+Alternatively, parse_midi_table() decodes all tracks into an EventTable,
+which stores the events in compact arrays, without creating an object for
+every event.
+
 Runs with Python 2.6, 2.7 and 3.
 
 """
 
 
 
+import array
+import operator
+import re
 import sys
 import struct
 
@@ -199,10 +206,185 @@ def time_events_grouped(track, time=0):
         yield time, evs
 
 
+class EventTable(object):
+    """Stores the events of MIDI tracks in compact arrays, one per column.
+
+    Event i is described by:
+
+    time[i]:    the MIDI time of the event
+    track[i]:   the track number
+    type[i]:    the event type (status >> 4) for channel events, or the status
+                byte (0xF0, 0xF7 or 0xFF) for sysex and meta events
+    channel[i]: the channel
+    data1[i]:   the note, controller or program number, the (pitch bend,
+                aftertouch) value, or the meta type for meta events
+    data2[i]:   the note or controller value, or for sysex and meta events,
+                the index of the event data in the data list
+
+    After finish() is called, the events are sorted on time; events at the
+    same time remain sorted on track and original order.
+
+    """
+    def __init__(self):
+        self.time = array.array('l')
+        self.track = array.array('H')
+        self.type = array.array('B')
+        self.channel = array.array('B')
+        self.data1 = array.array('i')
+        self.data2 = array.array('i')
+        self.data = []
+
+    def __len__(self):
+        return len(self.time)
+
+    def columns(self):
+        """Return the list of the column arrays."""
+        return [self.time, self.track, self.type, self.channel, self.data1, self.data2]
+
+    def finish(self):
+        """Sort the events on time, call this after the tracks are added."""
+        time = self.time
+        if any(map(operator.gt, time, time[1:])):
+            # sort is stable, so the track order is retained
+            order = operator.itemgetter(*sorted(range(len(time)), key=time.__getitem__))
+            for col in self.columns():
+                col[:] = array.array(col.typecode, order(col))
+
+    def add_track(self, s, track=0):
+        """Parses the bytes string s (a track) and appends the events.
+
+        Raises ValueError or IndexError on invalid MIDI data.
+
+        """
+        # the events are collected in one flat list, the columns are
+        # created from it using slices
+        events = []
+        add = events.extend
+        data = self.data
+
+        running_status = None
+        time = 0
+        pos = 0
+        end = len(s)
+        while pos < end:
+
+            delta = s[pos]
+            if delta & 0x80:
+                delta, pos = read_var_len(s, pos)
+            else:
+                pos += 1
+            time += delta
+
+            status = s[pos]
+            if status & 0x80:
+                running_status = status
+                pos += 1
+            elif not running_status:
+                raise ValueError("invalid running status")
+            else:
+                status = running_status
+
+            ev_type = status >> 4
+
+            if ev_type <= 0x0B:
+                # note on, off, aftertouch or controller
+                add((time, ev_type, status & 0x0F, s[pos], s[pos+1]))
+                pos += 2
+            elif ev_type == 0x0F:
+                running_status = None
+                if status == 0xFF:
+                    # meta event
+                    meta_type = s[pos]
+                    size, pos = read_var_len(s, pos+1)
+                else:
+                    # some sort of sysex
+                    meta_type = 0
+                    size, pos = read_var_len(s, pos)
+                add((time, status, 0, meta_type, len(data)))
+                data.append(s[pos:pos+size])
+                pos += size
+            elif ev_type == 0x0E:
+                # Pitch Bend
+                add((time, ev_type, status & 0x0F, s[pos] + s[pos+1] * 128, 0))
+                pos += 2
+            else:
+                # Program Change or Channel AfterTouch
+                add((time, ev_type, status & 0x0F, s[pos], 0))
+                pos += 1
+        if pos > end:
+            raise IndexError("incomplete MIDI event")
+        for i, col in enumerate((self.time, self.type, self.channel, self.data1, self.data2)):
+            col.extend(array.array(col.typecode, events[i::5]))
+        self.track.extend(array.array('H', [track]) * (len(events) // 5))
+
+    def event(self, i, factory=None):
+        """Return an event object for event i, like parse_midi_events() does."""
+        if factory is None:
+            factory = event.EventFactory()
+        ev_type = self.type[i]
+        channel = self.channel[i]
+        data1 = self.data1[i]
+        data2 = self.data2[i]
+        if ev_type == 0xFF:
+            return factory.meta_event(data1, self.data[data2])
+        elif ev_type >= 0xF0:
+            return factory.sysex_event(ev_type, self.data[data2])
+        elif ev_type <= 0x0A:
+            return factory.note_event(ev_type, channel, data1, data2)
+        elif ev_type == 0x0B:
+            return factory.controller_event(channel, data1, data2)
+        elif ev_type == 0x0C:
+            return factory.programchange_event(channel, data1)
+        elif ev_type == 0x0D:
+            return factory.channelaftertouch_event(channel, data1)
+        return factory.pitchbend_event(channel, data1)
+
+    def events(self, factory=None):
+        """Return a list with an event object for every event.
+
+        The objects are the same as the ones event() returns.
+
+        """
+        if factory is None:
+            factory = event.EventFactory()
+        # first create note events for all, then replace the other events
+        columns = self.type, self.channel, self.data1, self.data2
+        if factory.note_event is event.NoteEvent:
+            # _make() avoids a Python-level call for every event
+            result = list(map(event.NoteEvent._make, zip(*columns)))
+        else:
+            result = list(map(factory.note_event, *columns))
+        for m in re.finditer(b'[\x0b-\xff]', self.type.tobytes()):
+            i = m.start()
+            result[i] = self.event(i, factory)
+        return result
+
+    def meta_events(self, meta_type):
+        """Yield (time, data) for all meta events of the specified type."""
+        types = self.type.tobytes()
+        data1 = self.data1
+        i = types.find(b'\xff')
+        while i != -1:
+            if data1[i] == meta_type:
+                yield self.time[i], self.data[self.data2[i]]
+            i = types.find(b'\xff', i + 1)
+
+
+def parse_midi_table(tracks):
+    """Parses the list of tracks (bytes strings) into an EventTable.
+
+    Raises ValueError or IndexError on invalid MIDI data.
+
+    """
+    table = EventTable()
+    for n, track in enumerate(tracks):
+        table.add_track(track, n)
+    table.finish()
+    return table
+
 
 if __name__ == '__main__':
     """Test specified MIDI files."""
-    import sys
     files = sys.argv[1:]
     for f in files:
         with open(f, 'rb') as midifile:
@@ -21,23 +21,27 @@ midifile.song -- structures MIDI file data as a song.
 """
 
 
+import bisect
 import collections
+import gc
 
 from . import event
 from . import parser
 
 
-def load(filename):
+def load(filename, table=False):
     """Convenience function to instantiate a Song from a filename.
 
     If the filename is a type 2 MIDI file, just returns the first track.
+    If table is True, a TableSong is returned.
 
     """
     with open(filename, 'rb') as midifile:
         fmt, div, tracks = parser.parse_midi_data(midifile.read())
     if fmt == 2:
         tracks = tracks[:1]
-    return Song(div, tracks)
+    cls = TableSong if table else Song
+    return cls(div, tracks)
 
 
 def events_dict(tracks):
@@ -75,7 +79,12 @@ def is_tempo(e):
 
 def get_tempo(e):
     """Returns the tempo from the Set Tempo Meta-event."""
-    return e.data[0]*65536 + e.data[1]*256 + e.data[2]
+    return tempo(e.data)
+
+
+def tempo(data):
+    """Returns the tempo from the data of a Set Tempo Meta-event."""
+    return data[0]*65536 + data[1]*256 + data[2]
 
 
 def is_time_signature(e):
@@ -118,31 +127,39 @@ def iter_events_dict(evs):
 class TempoMap(object):
     """Converts midi time to real time in microseconds."""
     def __init__(self, d, division):
-        """Initialize our tempo map based on events d and division."""
-        # are the events one list (single-track) or a dict (per-track)?
+        """Initialize our tempo map based on events d and division.
+
+        d may also be a parser.EventTable.
+
+        """
         self.division = smpte_division(division)
         self.times = times = []
-        events = events_iter(d)
-        if events:
-            for midi_time, evs in sorted(d.items()):
-                for e in events(evs):
-                    if is_tempo(e):
-                        times.append((midi_time, get_tempo(e)))
-                        break
+        if isinstance(d, parser.EventTable):
+            for midi_time, data in d.meta_events(0x51):
+                if not times or times[-1][0] != midi_time:
+                    times.append((midi_time, tempo(data)))
+        else:
+            # are the events one list (single-track) or a dict (per-track)?
+            events = events_iter(d)
+            if events:
+                for midi_time, evs in sorted(d.items()):
+                    for e in events(evs):
+                        if is_tempo(e):
+                            times.append((midi_time, get_tempo(e)))
+                            break
         if not times or times[0][0] != 0:
             times.insert(0, (0, 500000))
+        # the real time (times division) at every tempo change
+        self._starts = [midi_time for midi_time, t in times]
+        self._real_times = real_times = [0]
+        for (time1, t), (time2, t2) in zip(times, times[1:]):
+            real_times.append(real_times[-1] + (time2 - time1) * t)
 
     def real_time(self, midi_time):
         """Returns the real time in microseconds for the given MIDI time."""
-        real_time = 0
-        times = self.times
-        for i in range(1, len(times)):
-            if times[i][0] >= midi_time:
-                real_time += (midi_time - times[i-1][0]) * times[i-1][1]
-                break
-            real_time += (times[i][0] - times[i-1][0]) * times[i-1][1]
-        else:
-            real_time += (midi_time - times[-1][0]) * times[-1][1]
+        i = max(bisect.bisect_left(self._starts, midi_time) - 1, 0)
+        real_time = (self._real_times[i] +
+                     (midi_time - self._starts[i]) * self.times[i][1])
         return real_time // self.division
 
     def msec(self, midi_time):
@@ -159,16 +176,26 @@ def beats(d, division):
     With this you can easily add measure numbers and find measure positions
     in the MIDI.
 
+    d may also be a parser.EventTable.
+
     """
-    events = events_iter(d)
-    if not events:
-        return
-    time_sigs = []
-    times = sorted(d)
-    for midi_time in times:
-        for e in events(d[midi_time]):
-            if is_time_signature(e):
-                time_sigs.append((midi_time, get_time_signature(e)))
+    if isinstance(d, parser.EventTable):
+        if not len(d):
+            return
+        time_sigs = [(midi_time, tuple(data))
+                     for midi_time, data in d.meta_events(0x58)]
+        last = d.time[-1]
+    else:
+        events = events_iter(d)
+        if not events:
+            return
+        time_sigs = []
+        times = sorted(d)
+        for midi_time in times:
+            for e in events(d[midi_time]):
+                if is_time_signature(e):
+                    time_sigs.append((midi_time, get_time_signature(e)))
+        last = times[-1]
     if not time_sigs or time_sigs[0][0] != 0:
         # default time signature at start
         time_sigs.insert(0, (0, (4, 4, 24, 8)))
@@ -176,7 +203,7 @@ def beats(d, division):
     # now yield a tuple for every beat
     time = 0
     sigs_index = 0
-    while time <= times[-1]:
+    while time <= last:
 
         if sigs_index < len(time_sigs) and time >= time_sigs[sigs_index][0]:
             # new time signature
@@ -190,6 +217,21 @@ def beats(d, division):
         beat = beat % num + 1
 
 
+def beat_list(tempo_map, beats):
+    """Returns a list of tuples(msec, measnum, beat, num, den).
+
+    The beats are the tuples yielded by the beats() function.
+
+    """
+    result = []
+    measnum = 0
+    for midi_time, beat, num, den in beats:
+        if beat == 1:
+            measnum += 1
+        result.append((tempo_map.msec(midi_time), measnum, beat, num, den))
+    return result
+
+
 class Song(object):
     """A loaded MIDI file.
 
@@ -213,13 +255,7 @@ class Song(object):
         self.events = events_dict(tracks)
         self.tempo_map = t = TempoMap(self.events, division)
         self.length = t.msec(max(self.events))
-
-        self.beats = b = []
-        measnum = 0
-        for midi_time, beat, num, den in beats(self.events, division):
-            if beat == 1:
-                measnum += 1
-            b.append((t.msec(midi_time), measnum, beat, num, den))
+        self.beats = beat_list(t, beats(self.events, division))
         self.music = [(t.msec(midi_time), evs)
                       for midi_time, evs in sorted(self.events.items())]
 
@@ -240,3 +276,83 @@ class Song(object):
         return self.beats[min(pos, len(self.beats) - 1)]
 
 
+
+
+class TableSong(Song):
+    """A loaded MIDI file, with the events stored in a parser.EventTable.
+
+    This loads faster and uses less memory than Song, because the tempo map
+    and the beats are computed from the table. The events and music
+    attributes are only created when they are first asked for, e.g. when
+    the song is played.
+
+    In addition to the Song attributes, the table attribute is set to the
+    parser.EventTable.
+
+    """
+    def __init__(self, division, tracks):
+        """Initialize the Song with the given division and track chunks."""
+        self.division = division
+        self.ntracks = len(tracks)
+        self.table = table = parser.parse_midi_table(tracks)
+        self.tempo_map = t = TempoMap(table, division)
+        self.length = t.msec(table.time[-1]) if len(table) else 0
+        self.beats = beat_list(t, beats(table, division))
+        self._events = None
+        self._music = None
+
+    @property
+    def events(self):
+        if self._events is None:
+            self._create_events()
+        return self._events
+
+    @property
+    def music(self):
+        if self._music is None:
+            self._create_events()
+        return self._music
+
+    def _create_events(self):
+        """(internal) Create the events and music from the table.
+
+        The garbage collector is paused meanwhile: the many objects that are
+        created can't form reference cycles, and would otherwise cause a lot
+        of useless collections.
+
+        """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._create_events_from_table()
+        finally:
+            if enabled:
+                gc.enable()
+
+    def _create_events_from_table(self):
+        """(internal) Create the events and music from the table."""
+        table = self.table
+        msec = self.tempo_map.msec
+        self._events = events = collections.defaultdict(dict)
+        self._music = music = []
+        if not len(table):
+            return
+        evs = table.events()
+        # the table is sorted on time and track: find the range of every
+        # time and every track within it by bisecting, instead of looking
+        # at every event
+        times, tracks = table.time, table.track
+        bisect_right = bisect.bisect_right
+        start, count = 0, len(times)
+        while start < count:
+            midi_time = times[start]
+            end = bisect_right(times, midi_time, start)
+            d = events[midi_time]
+            music.append((msec(midi_time), d))
+            while start < end:
+                track = tracks[start]
+                # most times have events of only one track
+                stop = end if tracks[end-1] == track else bisect_right(
+                    tracks, track, start, end)
+                d[track] = evs[start:stop]
+                start = stop
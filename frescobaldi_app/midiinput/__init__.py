@@ -21,7 +21,6 @@ import weakref
 
 from PyQt5.QtCore import QObject, QSettings, QThread, pyqtSignal
 
-import midihub
 import midifile.event
 import midifile.parser
 import documentinfo
@@ -44,6 +43,7 @@ class MidiIn(object):
         return self._widget()
 
     def open(self):
+        import midihub  # loads the portmidi library, so not on startup
         s = QSettings()
         self._portname = s.value("midi/midi/input_port", midihub.default_input(), str)
         self._pollingtime = s.value("midi/polling_time", 10, int)
@@ -61,7 +61,7 @@ class MidiFiles(plugin.DocumentPlugin):
             self.update()
         song = self._songs[index]
         if not song:
-            song = self._songs[index] = midifile.song.load(self._files[index])
+            song = self._songs[index] = midifile.song.load(self._files[index], table=True)
         return song
 
     def model(self):
@@ -22,6 +22,7 @@ Code to load and manage PDF documents to view.
 """
 
 import itertools
+import weakref
 
 from PyQt5.QtCore import QSettings
 
@@ -40,6 +41,35 @@ import pagedview
 # This signal gets emitted when a finished Job has created new PDF document(s).
 documentUpdated = signals.Signal() # Document
 
+# weak references to the documents that were shown, least recently shown first
+_opened = []
+
+
+def max_open_documents():
+    """Returns the number of PDF documents that may be kept open in memory."""
+    return max(2, QSettings().value("musicview/max_open_documents", 8, int))
+
+
+def opened(doc):
+    """Call this when a PDF Document is shown in a view.
+
+    The Document objects returned by DocumentGroup.documents() only open the
+    PDF file when their pages are asked for. This function records the
+    document as the most recently shown one, and closes (invalidates) the
+    least recently shown documents when more than max_open_documents() are
+    open. An invalidated document simply reopens the PDF when it is shown
+    again.
+
+    """
+    global _opened
+    _opened = [ref for ref in _opened if ref() not in (None, doc)]
+    _opened.append(weakref.ref(doc))
+    for ref in _opened[:-max_open_documents()]:
+        d = ref()
+        if d:
+            d.invalidate()
+    del _opened[:-max_open_documents()]
+
 
 @app.jobFinished.connect
 def _on_job_finished(document, job):
@@ -55,6 +85,9 @@ def group(document):
 class DocumentGroup(plugin.DocumentPlugin):
     """Represents a group of PDF documents, created by the text document it belongs to.
 
+    The PDF files are not opened when the group is updated, but only when a
+    Document is shown in a view (see opened()).
+
     Multiple MusicView instances can use this group, they can store the positions
     of the Documents in the viewer themselves via a weak-key dictionary on the Document
     instances returned by documents(). On update() these Document instances will be reused.
@@ -19,17 +19,30 @@
 
 """
 Handles Point and Click.
+
+The textedit links of a PDF document are collected in a background thread,
+page by page, so the links of the first pages are available right away.
+When the filename of the PDF document is known, the collected links are
+stored on disk, so reopening an unchanged PDF does not need to collect
+them again.
 """
 
 
 
+import collections
 import re
 import os
 import sys
+import hashlib
+import pickle
+import time
 import weakref
 
+from PyQt5.QtCore import QRectF, QStandardPaths, QThread, pyqtSignal
+
 import qpageview.locking
 
+import app
 import util
 import textedit
 import pointandclick
@@ -38,23 +51,34 @@ import pointandclick
 # cache point and click handlers for poppler documents
 _cache = weakref.WeakKeyDictionary()
 
+# increase this when the format of the links stored on disk changes
+_PERSISTENT_CACHE_VERSION = 1
+
+# the least recently used links are removed on exit when the stored links
+# take more than this
+_PERSISTENT_CACHE_MAX_SIZE = 50 * 1024 * 1024
+
+
+def links(document, filename=None):
+    """Return the Links for the Poppler document.
+
+    If filename (the filename of the PDF document) is given, the links are
+    read from disk when they were stored earlier for the same PDF file.
+    Otherwise, the links are collected in a background thread, and the
+    returned Links object is filled while the pages are read.
 
-def links(document):
+    """
     try:
         return _cache[document]
     except KeyError:
         l = _cache[document] = Links()
-        with l:
-            import popplerqt5
-            with qpageview.locking.lock(document):
-                for num in range(document.numPages()):
-                    page = document.page(num)
-                    for link in page.links():
-                        if isinstance(link, popplerqt5.Poppler.LinkBrowse):
-                            t = textedit.link(link.url())
-                            if t:
-                                filename = util.normpath(t.filename)
-                                l.add_link(filename, t.line, t.column, (num, link.linkArea()))
+        stored = _load_links(filename) if filename else None
+        if stored is None:
+            l.collect(document, filename)
+        else:
+            with l:
+                for linkfile, line, column, num, rect in stored:
+                    l.add_link(linkfile, line, column, (num, QRectF(*rect)))
         return l
 
 
@@ -64,6 +88,51 @@ class Links(pointandclick.Links):
     Only textedit:// urls are stored.
 
     """
+    def __init__(self):
+        super(Links, self).__init__()
+        self._collector = None
+
+    def collect(self, document, filename=None):
+        """Collect the links of the Poppler document in a background thread.
+
+        The links are added while the pages are read. If filename is given,
+        the links are stored on disk when all pages have been read.
+
+        """
+        self.finish()
+        try:
+            self._key = _persistent_key(filename) if filename else None
+        except OSError:
+            self._key = None
+        self._filename = filename
+        self._collected = []
+        c = self._collector = LinkCollector(document)
+        c.linksFound.connect(self.slotLinksFound)
+        c.finished.connect(self.slotCollectorFinished)
+        c.start()
+
+    def isCollecting(self):
+        """Return True if the links are still being collected."""
+        return self._collector is not None
+
+    def slotLinksFound(self, links):
+        """Called when the LinkCollector has read some pages."""
+        added = collections.defaultdict(set)
+        for filename, line, column, destination in links:
+            self.add_link(filename, line, column, destination)
+            added[filename].add((line, column))
+        self._collected.extend(links)
+        for filename, positions in added.items():
+            self.bind_links(filename, positions)
+
+    def slotCollectorFinished(self):
+        """Called when all pages have been read."""
+        # the collector keeps itself alive until its thread has ended
+        self._collector = None
+        if self._key:
+            _save_links(self._filename, self._key, self._collected)
+        del self._collected
+
     def cursor(self, link, load=False):
         """Returns the destination of a link as a QTextCursor of the destination document.
 
@@ -80,6 +149,128 @@ class Links(pointandclick.Links):
             return super(Links, self).cursor(filename, t.line, t.column, load)
 
 
-positions = pointandclick.positions
+class LinkCollector(QThread):
+    """Reads the textedit links of a Poppler document in a background thread.
+
+    The linksFound signal is emitted with a list of (filename, line, column,
+    (pagenum, rect)) tuples every INTERVAL seconds and when all pages are read.
+
+    """
+    linksFound = pyqtSignal(object)
+
+    INTERVAL = 0.2
+
+    # references to the running collectors, so they are not destroyed
+    # before their thread has ended
+    _running = set()
+
+    def __init__(self, document):
+        super(LinkCollector, self).__init__()
+        self._document = document
+        self.finished.connect(self._slotFinished)
+
+    def start(self):
+        """Start reading the links."""
+        LinkCollector._running.add(self)
+        super(LinkCollector, self).start()
 
+    def _slotFinished(self):
+        """Called in the main thread when run() has returned."""
+        self.wait()
+        LinkCollector._running.discard(self)
 
+    def run(self):
+        import popplerqt5
+        document = self._document
+        with qpageview.locking.lock(document):
+            count = document.numPages()
+        found = []
+        last = time.time()
+        for num in range(count):
+            # only lock per page, so the pages can be rendered meanwhile
+            with qpageview.locking.lock(document):
+                pagelinks = document.page(num).links()
+            for link in pagelinks:
+                if isinstance(link, popplerqt5.Poppler.LinkBrowse):
+                    t = textedit.link(link.url())
+                    if t:
+                        filename = util.normpath(t.filename)
+                        found.append((filename, t.line, t.column, (num, link.linkArea())))
+            if found and time.time() - last > self.INTERVAL:
+                self.linksFound.emit(found)
+                found = []
+                last = time.time()
+        if found:
+            self.linksFound.emit(found)
+
+
+def _persistent_cache_directory():
+    """Return the directory the links are stored in."""
+    return os.path.join(QStandardPaths.writableLocation(
+        QStandardPaths.CacheLocation), 'pointandclick')
+
+
+def _persistent_cache_filename(filename):
+    """Return the name of the file the links of the PDF filename are stored in."""
+    name = hashlib.sha1(filename.encode('utf-8', 'surrogateescape')).hexdigest()
+    return os.path.join(_persistent_cache_directory(), name[:2], name)
+
+
+def prune_persistent_cache(max_size=_PERSISTENT_CACHE_MAX_SIZE):
+    """Remove the least recently used stored links until they fit max_size.
+
+    The modification time of the stored links of a PDF is updated when they
+    are used. This is called when Frescobaldi exits.
+
+    """
+    util.prune_files(_persistent_cache_directory(), max_size)
+
+
+app.aboutToQuit.connect(prune_persistent_cache)
+
+
+def _persistent_key(filename):
+    """Return the key that must match for stored links to be valid."""
+    st = os.stat(filename)
+    return (filename, st.st_mtime, st.st_size, _PERSISTENT_CACHE_VERSION)
+
+
+def _save_links(filename, key, links):
+    """Store the links collected from the PDF filename on disk."""
+    data = {
+        'key': key,
+        'links': [(linkfile, line, column, num, rect.getRect())
+                  for linkfile, line, column, (num, rect) in links],
+    }
+    cachefile = _persistent_cache_filename(filename)
+    try:
+        os.makedirs(os.path.dirname(cachefile), exist_ok=True)
+        with open(cachefile + '.tmp', 'wb') as f:
+            pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(cachefile + '.tmp', cachefile)
+    except (OSError, pickle.PickleError):
+        pass
+
+
+def _load_links(filename):
+    """Return the list of links stored for the PDF filename, or None."""
+    cachefile = _persistent_cache_filename(filename)
+    try:
+        key = _persistent_key(filename)
+        with open(cachefile, 'rb') as f:
+            data = pickle.load(f)
+        if data['key'] != key:
+            return None
+        links = data['links']
+    except Exception:
+        # any problem with the stored data simply means we read the PDF again
+        return None
+    try:
+        # mark the links as recently used
+        os.utime(cachefile)
+    except OSError:
+        pass
+    return links
+
+
+positions = pointandclick.positions
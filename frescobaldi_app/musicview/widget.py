@@ -51,6 +51,7 @@ import lydocument
 import viewhighlighter
 import ly.lex.lilypond
 
+from . import documents
 from . import pointandclick
 
 
@@ -100,9 +101,10 @@ class MusicView(QWidget):
         """Open a qpageview.Document instance."""
         self._links = None
         self._highlightRange = None
+        documents.opened(doc)
         document = doc.document()
         if document:
-            self._links = pointandclick.links(document)
+            self._links = pointandclick.links(document, doc.filename())
         self.view.setDocument(doc)
 
     def clear(self):
@@ -38,12 +38,15 @@ class Widget(QTreeWidget):
         super(Widget, self).__init__(tool,
             headerHidden=True)
         self._timer = QTimer(singleShot=True, timeout=self.updateView)
+        self._document = None
+        self._items = []    # the items in document order
+        self._changed = None    # the range of text changed since the update
         tool.mainwindow().currentDocumentChanged.connect(self.slotCurrentDocumentChanged)
         self.itemClicked.connect(self.slotItemClicked)
         self.itemActivated.connect(self.slotItemClicked)
         self.itemCollapsed.connect(self.slotItemCollapsed)
         self.itemExpanded.connect(self.slotItemExpanded)
-        app.settingsChanged.connect(self.updateView)
+        app.settingsChanged.connect(self.slotSettingsChanged)
         doc = tool.mainwindow().currentDocument()
         if doc:
             self.slotCurrentDocumentChanged(doc)
@@ -54,96 +57,217 @@ class Widget(QTreeWidget):
             old.contentsChange.disconnect(self.slotContentsChange)
         if doc:
             doc.contentsChange.connect(self.slotContentsChange)
+            self._document = None
             self._timer.start(100)
 
-    def slotContentsChange(self, position, added, removed):
+    def slotContentsChange(self, position, removed, added):
         """Updates the view on contents change."""
+        # keep track of the range of changed text
+        if self._changed:
+            start, end = self._changed
+            if end >= position + removed:
+                end += added - removed
+            self._changed = (min(start, position), max(end, position + added))
+        else:
+            self._changed = (position, position + added)
         if added + removed > 1000:
             self._timer.start(100)
         else:
-            self._timer.start(2000)
+            self._timer.start(500)
 
     def updateView(self):
-        """Recreate the items in the view."""
+        """Update the items in the view.
+
+        If the view already shows the current document, only the items
+        that were added or removed in the outline are changed; otherwise
+        all items are recreated.
+
+        """
+        doc = self.parent().mainwindow().currentDocument()
+        outline = documentstructure.DocumentStructure.instance(doc).outline() if doc else []
         with qutil.signalsBlocked(self):
-            self.clear()
-            doc = self.parent().mainwindow().currentDocument()
-            if not doc:
-                return
-            view_cursor_position = self.parent().mainwindow().textCursor().position()
-            structure = documentstructure.DocumentStructure.instance(doc)
-            last_item = None
-            current_item = None
-            last_block = None
-            for i in structure.outline():
-                position = i.start()
-                block = doc.findBlock(position)
-                depth = tokeniter.state(block).depth()
-                if block == last_block:
-                    parent = last_item
-                elif last_block is None or depth == 1:
-                    # a toplevel item anyway
-                    parent = self
-                else:
-                    while last_item and depth <= last_item.depth:
-                        last_item = last_item.parent()
-                    if not last_item:
-                        parent = self
-                    else:
-                        # the item could belong to a parent item, but see if they
-                        # really are in the same (toplevel) state
-                        b = last_block.next()
-                        while b < block:
-                            depth2 = tokeniter.state(b).depth()
-                            if depth2 == 1:
-                                parent = self
-                                break
-                            while last_item and depth2 <= last_item.depth:
-                                last_item = last_item.parent()
-                            if not last_item:
-                                parent = self
-                                break
-                            b = b.next()
-                        else:
-                            parent = last_item
-
-                item = last_item = QTreeWidgetItem(parent)
-
-                # set item text and display style bold if 'title' was used
-                for name, text in i.groupdict().items():
-                    if text:
-                        if name.startswith('title'):
-                            font = item.font(0)
-                            font.setWeight(QFont.Bold)
-                            item.setFont(0, font)
-                            break
-                        elif name.startswith('alert'):
-                            color = item.foreground(0).color()
-                            color = qutil.addcolor(color, 128, 0, 0)
-                            item.setForeground(0, QBrush(color))
-                            font = item.font(0)
-                            font.setStyle(QFont.StyleItalic)
-                            item.setFont(0, font)
-                        elif name.startswith('text'):
-                            break
-                else:
-                    text = i.group()
-                item.setText(0, text)
-
-                # remember whether is was collapsed by the user
-                try:
-                    collapsed = block.userData().collapsed
-                except AttributeError:
-                    collapsed = False
-                item.setExpanded(not collapsed)
-                item.depth = depth
-                item.position = position
-                last_block = block
-                # scroll to the item at the view's cursor later
-                if position <= view_cursor_position:
-                    current_item = item
-            if current_item:
-                self.scrollToItem(current_item)
+            if doc is not self._document or not self.updateItems(outline):
+                self.createItems(outline)
+        self._document = doc
+        self._changed = None
+
+    def createItems(self, outline):
+        """Recreate all the items in the view."""
+        self.clear()
+        self._items = []
+        if not outline:
+            return
+        view_cursor_position = self.parent().mainwindow().textCursor().position()
+        current_item = None
+        last_item = None
+        for entry in outline:
+            item = last_item = self.createItem(entry, last_item)
+            self._items.append(item)
+            # scroll to the item at the view's cursor later
+            if item.position <= view_cursor_position:
+                current_item = item
+        if current_item:
+            self.scrollToItem(current_item)
+
+    def updateItems(self, outline):
+        """Only change the items that changed in the outline.
+
+        Returns False if this is not possible because the tree structure
+        changed, then the caller should recreate all items.
+
+        """
+        if not self._changed:
+            return True
+        items = self._items
+        for item in items:
+            item.position = item.entry.start()
+        # the unchanged entries are the same objects
+        count = min(len(items), len(outline))
+        prefix = 0
+        while prefix < count and items[prefix].entry is outline[prefix]:
+            prefix += 1
+        suffix = 0
+        while (suffix < count - prefix
+               and items[-1-suffix].entry is outline[-1-suffix]):
+            suffix += 1
+        removed = items[prefix:len(items)-suffix]
+        added = outline[prefix:len(outline)-suffix]
+
+        # a removed item may not have children that are kept
+        removed_set = set(map(id, removed))
+        for item in removed:
+            for i in range(item.childCount()):
+                if id(item.child(i)) not in removed_set:
+                    return False
+        for item in reversed(removed):
+            (item.parent() or self.invisibleRootItem()).removeChild(item)
+
+        last_item = items[prefix-1] if prefix else None
+        new_items = []
+        for entry in added:
+            item = last_item = self.createItem(entry, last_item)
+            new_items.append(item)
+        items[prefix:len(items)-suffix] = new_items
+        new_set = set(map(id, new_items))
+
+        # check if the items in and directly after the changed text
+        # still are at the same place in the tree
+        doc = self.document()
+        start = doc.findBlock(self._changed[0]).position()
+        end = self._changed[1]
+        lo, hi = 0, len(items)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if items[mid].position < start:
+                lo = mid + 1
+            else:
+                hi = mid
+        for i in range(lo, len(items)):
+            item = items[i]
+            block = doc.findBlock(item.position)
+            depth = tokeniter.state(block).depth()
+            parent = self.findParent(items[i-1] if i else None, block, depth)
+            if depth != item.depth or parent is not (item.parent() or self):
+                return False
+            # if the lexer state did not change, the following items are
+            # unchanged as well
+            state = block.previous().userState()
+            if (block.position() > end and state == item.state
+                    and id(item) not in new_set):
+                break
+            item.state = state
+        return True
+
+    def document(self):
+        """Return the currently displayed document."""
+        return self.parent().mainwindow().currentDocument()
+
+    def findParent(self, last_item, block, depth):
+        """Return the parent for a new item after last_item."""
+        if not last_item:
+            return self
+        last_block = self.document().findBlock(last_item.position)
+        if block == last_block:
+            return last_item
+        elif depth == 1:
+            # a toplevel item anyway
+            return self
+        while last_item and depth <= last_item.depth:
+            last_item = last_item.parent()
+        if not last_item:
+            return self
+        # the item could belong to a parent item, but see if they
+        # really are in the same (toplevel) state
+        b = last_block.next()
+        while b < block:
+            depth2 = tokeniter.state(b).depth()
+            if depth2 == 1:
+                return self
+            while last_item and depth2 <= last_item.depth:
+                last_item = last_item.parent()
+            if not last_item:
+                return self
+            b = b.next()
+        return last_item
+
+    def createItem(self, entry, last_item):
+        """Create and return an item for the outline entry after last_item."""
+        position = entry.start()
+        block = self.document().findBlock(position)
+        depth = tokeniter.state(block).depth()
+        parent = self.findParent(last_item, block, depth)
+
+        # insert the item directly after last_item
+        item = QTreeWidgetItem()
+        if parent is self:
+            parent = self.invisibleRootItem()
+        if parent is last_item:
+            parent.insertChild(0, item)
+        else:
+            child = last_item
+            while child and child.parent() is not (
+                    None if parent is self.invisibleRootItem() else parent):
+                child = child.parent()
+            index = parent.indexOfChild(child) + 1 if child else 0
+            parent.insertChild(index, item)
+
+        # set item text and display style bold if 'title' was used
+        for name, text in entry.groupdict().items():
+            if text:
+                if name.startswith('title'):
+                    font = item.font(0)
+                    font.setWeight(QFont.Bold)
+                    item.setFont(0, font)
+                    break
+                elif name.startswith('alert'):
+                    color = item.foreground(0).color()
+                    color = qutil.addcolor(color, 128, 0, 0)
+                    item.setForeground(0, QBrush(color))
+                    font = item.font(0)
+                    font.setStyle(QFont.StyleItalic)
+                    item.setFont(0, font)
+                elif name.startswith('text'):
+                    break
+        else:
+            text = entry.group()
+        item.setText(0, text)
+
+        # remember whether is was collapsed by the user
+        try:
+            collapsed = block.userData().collapsed
+        except AttributeError:
+            collapsed = False
+        item.setExpanded(not collapsed)
+        item.depth = depth
+        item.state = block.previous().userState()
+        item.position = position
+        item.entry = entry
+        return item
+
+    def slotSettingsChanged(self):
+        """Called when the settings change, recreates all items."""
+        self._document = None
+        self.updateView()
 
     def cursorForItem(self, item):
         """Returns a cursor for the specified item.
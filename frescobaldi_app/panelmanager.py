@@ -76,6 +76,7 @@ class PanelManager(plugin.MainWindowPlugin):
         self.loadPanel("quickinsert.QuickInsertPanel", "coding")
         self.loadPanel("charmap.CharMap", "coding")
         self.loadPanel("snippet.tool.SnippetTool", "coding")
+        self.loadPanel("projectsearch.ProjectSearchPanel", "coding")
         self.loadPanel("doclist.DocumentList", "structure")
         self.loadPanel("outline.OutlinePanel", "structure")
         self.loadPanel("miditool.MidiTool", "midi")
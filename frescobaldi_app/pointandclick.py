@@ -24,6 +24,7 @@ Generic Point and Click handling.
 
 import os
 import collections
+import heapq
 
 from PyQt5.QtCore import QUrl
 from PyQt5.QtGui import QTextCursor
@@ -85,6 +86,22 @@ class Links(object):
         if filename not in self._docs:
             self._docs[filename] = BoundLinks(doc, self._links[filename])
 
+    def bind_links(self, filename, positions):
+        """Binds links that were added for filename after binding.
+
+        positions are the (line, column) tuples of the added links.
+        If no document was bound yet, an already loaded document is bound.
+
+        """
+        bound = self._docs.get(filename)
+        if bound:
+            links = self._links[filename]
+            bound.add({pos: links[pos] for pos in positions})
+        else:
+            doc = scratchdir.findDocument(filename)
+            if doc:
+                self.bind(filename, doc)
+
     def slotDocumentLoaded(self, doc):
         """Called when a new document is loaded, it maybe possible to bind to it."""
         filename = doc.url().toLocalFile()
@@ -142,6 +159,32 @@ class BoundLinks(object):
                 cursors.append(c)
                 destinations.append(dest)
 
+    def add(self, links):
+        """Adds links that are not yet bound.
+
+        links is a mapping from (line, column) to a destinations list, like
+        the links given on construction. The cursors of the links that were
+        already bound are kept, so they keep tracking changes in the document.
+
+        """
+        doc = self.document
+        new = []
+        for pos, dest in links.items():
+            if pos not in self._cursor_dict:
+                line, column = pos
+                b = doc.findBlockByNumber(line - 1)
+                if b.isValid():
+                    c = self._cursor_dict[pos] = QTextCursor(doc)
+                    c.setPosition(b.position() + column)
+                    new.append((c.position(), c, dest))
+        if new:
+            new.sort(key=lambda n: n[0])
+            old = zip((c.position() for c in self._cursors),
+                      self._cursors, self._destinations)
+            merged = list(heapq.merge(old, new, key=lambda n: n[0]))
+            self._cursors[:] = [c for pos, c, dest in merged]
+            self._destinations[:] = [dest for pos, c, dest in merged]
+
     def cursor(self, line, column):
         """Returns the QTextCursor for the give line/col."""
         return self._cursor_dict.get((line, column))
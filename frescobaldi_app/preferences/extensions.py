@@ -32,6 +32,7 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QHeaderView,
     QLabel,
+    QSpinBox,
     QTreeView,
     QVBoxLayout,
     QWidget
@@ -89,6 +90,16 @@ class General(preferences.Group):
         self.root.changed.connect(self.changed)
         layout.addWidget(self.root)
 
+        budget_layout = QHBoxLayout()
+        self.budget_label = QLabel()
+        self.budget = QSpinBox(minimum=0, maximum=10000, singleStep=10)
+        self.budget.valueChanged.connect(self.budget_changed)
+        self.budget_label.setBuddy(self.budget)
+        budget_layout.addWidget(self.budget_label)
+        budget_layout.addWidget(self.budget)
+        budget_layout.addStretch()
+        layout.addLayout(budget_layout)
+
         app.translateUI(self)
 
     def translateUI(self):
@@ -97,18 +108,30 @@ class General(preferences.Group):
         self.api_version.setText(_("Extension API: {apiversion}").format(
             apiversion=appinfo.extension_api))
         self.active.setToolTip(_("If unchecked don't look for extensions."))
+        self.budget_label.setText(_("Load time budget:"))
+        self.budget.setSuffix(_(" ms"))
+        self.budget.setSpecialValueText(_("None"))
+        self.budget.setToolTip(_(
+            "Extensions that need more time to load are marked "
+            "in the list of installed extensions."))
 
     def loadSettings(self):
         s = QSettings()
         s.beginGroup("extension-settings")
         self.active.setChecked(s.value("active", True, bool))
         self.root.setPath(s.value("root-directory", '', str))
+        self.budget.setValue(s.value("load-time-budget", 100, int))
 
     def saveSettings(self):
         s = QSettings()
         s.beginGroup("extension-settings")
         s.setValue("active", self.active.isChecked())
         s.setValue("root-directory", self.root.path())
+        s.setValue("load-time-budget", self.budget.value())
+
+    def budget_changed(self, value):
+        self.siblingGroup(Installed).mark_slow(value)
+        self.changed.emit()
 
     def root_changed(self):
         self.changed.emit()
@@ -123,7 +146,8 @@ class Installed(preferences.Group):
 
     With a checkbox individual extensions can be deactivated.
     Metadata is listed for all *installed* extensions, regardless
-    of manual deactivation or load failure.
+    of manual deactivation or load failure. Extensions that needed
+    more time to load than the load time budget are shown in bold.
     """
 
     def __init__(self, page):
@@ -138,6 +162,7 @@ class Installed(preferences.Group):
 
         self.tree = QTreeView()
         self.name_items = {}
+        self.load_times = {}
         self._selected_extension = ''
         self.tree.setModel(QStandardItemModel())
         self.tree.model().setColumnCount(2)
@@ -199,6 +224,7 @@ class Installed(preferences.Group):
             loaded_extension = extensions.get(ext)
             if loaded_extension:
                 display_name += ' ({})'.format(loaded_extension.load_time())
+                self.load_times[ext] = loaded_extension.load_time_ms()
 
             name_item = QStandardItem(display_name)
             name_item.extension_name = ext
@@ -246,6 +272,21 @@ class Installed(preferences.Group):
                                 appinfo.appname,
                                 api_version))
                 name_item.appendRow([label_item, details_item])
+        self.mark_slow(extensions.load_time_budget())
+
+    def mark_slow(self, budget):
+        """Show the extensions that needed more than budget msec to load
+        in bold. No extension is marked if budget is 0."""
+        for ext, item in self.name_items.items():
+            load_time = self.load_times.get(ext)
+            slow = bool(budget and load_time and load_time > budget)
+            font = item.font()
+            font.setBold(slow)
+            item.setFont(font)
+            item.setToolTip(_(
+                "Loading this extension took {time:.0f} ms, which is more "
+                "than the load time budget of {budget} ms.").format(
+                    time=load_time, budget=budget) if slow else "")
 
     def selected_extension(self):
         """Return the (directory) name of the extension that
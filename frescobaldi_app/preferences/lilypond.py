@@ -29,7 +29,7 @@ from PyQt5.QtCore import QSettings, Qt
 from PyQt5.QtWidgets import (
     QAbstractItemView, QCheckBox, QDialog, QDialogButtonBox, QFileDialog,
     QGridLayout, QHBoxLayout, QLabel, QLineEdit, QListWidgetItem,
-    QPushButton, QRadioButton, QTabWidget, QVBoxLayout, QWidget)
+    QPushButton, QRadioButton, QSpinBox, QTabWidget, QVBoxLayout, QWidget)
 
 import app
 import userguide
@@ -58,6 +58,7 @@ class LilyPondPrefs(preferences.ScrolledGroupsPage):
         layout.addWidget(Versions(self))
         layout.addWidget(Target(self))
         layout.addWidget(Running(self))
+        layout.addWidget(JobQueues(self))
 
 
 class Versions(preferences.Group):
@@ -310,17 +311,30 @@ class Running(preferences.Group):
         self.setLayout(layout)
 
         self.saveDocument = QCheckBox(clicked=self.changed)
+        self.engraveMasters = QCheckBox(clicked=self.changed)
         self.deleteFiles = QCheckBox(clicked=self.changed)
         self.embedSourceCode = QCheckBox(clicked=self.changed)
         self.noTranslation = QCheckBox(clicked=self.changed)
+        self.engraveCache = QCheckBox(clicked=self.changed)
+        self.engraveCacheSizeLabel = QLabel()
+        self.engraveCacheSize = QSpinBox(valueChanged=self.changed)
+        self.engraveCacheSize.setRange(10, 100000)
+        self.engraveCacheSizeLabel.setBuddy(self.engraveCacheSize)
         self.includeLabel = QLabel()
         self.include = widgets.listedit.FilePathEdit()
         self.include.listBox.setDragDropMode(QAbstractItemView.InternalMove)
         self.include.changed.connect(self.changed)
         layout.addWidget(self.saveDocument)
+        layout.addWidget(self.engraveMasters)
         layout.addWidget(self.deleteFiles)
         layout.addWidget(self.embedSourceCode)
         layout.addWidget(self.noTranslation)
+        layout.addWidget(self.engraveCache)
+        cacheSize = QHBoxLayout()
+        cacheSize.addWidget(self.engraveCacheSizeLabel)
+        cacheSize.addWidget(self.engraveCacheSize)
+        cacheSize.addStretch(1)
+        layout.addLayout(cacheSize)
         layout.addWidget(self.includeLabel)
         layout.addWidget(self.include)
         app.translateUI(self)
@@ -331,6 +345,10 @@ class Running(preferences.Group):
         self.saveDocument.setToolTip(_(
             "If checked, the document is saved when it is local and modified.\n"
             "Otherwise a temporary file is used to run LilyPond."))
+        self.engraveMasters.setText(_("Engrave documents including a saved file"))
+        self.engraveMasters.setToolTip(_(
+            "If checked, saving a file engraves all open documents that\n"
+            "include that file (directly or indirectly)."))
         self.deleteFiles.setText(_("Delete intermediate output files"))
         self.deleteFiles.setToolTip(_(
             "If checked, LilyPond will delete intermediate PostScript files."))
@@ -343,23 +361,36 @@ class Running(preferences.Group):
         self.noTranslation.setToolTip(_(
             "If checked, LilyPond's output messages will be in English.\n"
             "This can be useful for bug reports."))
+        self.engraveCache.setText(_("Cache engrave results"))
+        self.engraveCache.setToolTip(_(
+            "If checked, the output of LilyPond is stored in a cache.\n"
+            "When a document and all its included files are unchanged,\n"
+            "the output is restored from the cache instead of running LilyPond."))
+        self.engraveCacheSizeLabel.setText(_("Maximum cache size:"))
+        self.engraveCacheSize.setSuffix(" " + _("MB"))
         self.includeLabel.setText(_("LilyPond include path:"))
 
     def loadSettings(self):
         s = settings()
         self.saveDocument.setChecked(s.value("save_on_run", False, bool))
+        self.engraveMasters.setChecked(s.value("engrave_masters_on_save", False, bool))
         self.deleteFiles.setChecked(s.value("delete_intermediate_files", True, bool))
         self.embedSourceCode.setChecked(s.value("embed_source_code", False, bool))
         self.noTranslation.setChecked(s.value("no_translation", False, bool))
+        self.engraveCache.setChecked(s.value("engrave_cache", False, bool))
+        self.engraveCacheSize.setValue(s.value("engrave_cache_size", 500, int))
         include_path = qsettings.get_string_list(s, "include_path")
         self.include.setValue(include_path)
 
     def saveSettings(self):
         s = settings()
         s.setValue("save_on_run", self.saveDocument.isChecked())
+        s.setValue("engrave_masters_on_save", self.engraveMasters.isChecked())
         s.setValue("delete_intermediate_files", self.deleteFiles.isChecked())
         s.setValue("embed_source_code", self.embedSourceCode.isChecked())
         s.setValue("no_translation", self.noTranslation.isChecked())
+        s.setValue("engrave_cache", self.engraveCache.isChecked())
+        s.setValue("engrave_cache_size", self.engraveCacheSize.value())
         s.setValue("include_path", self.include.value())
 
 
@@ -413,3 +444,57 @@ class Target(preferences.Group):
         s.setValue("open_default_view", self.openDefaultView.isChecked())
 
 
+
+
+class JobQueues(preferences.Group):
+    def __init__(self, page):
+        super(JobQueues, self).__init__(page)
+
+        layout = QGridLayout()
+        self.setLayout(layout)
+
+        self.engraveLabel = QLabel()
+        self.engraveRunners = QSpinBox(valueChanged=self.changed)
+        self.genericLabel = QLabel()
+        self.genericRunners = QSpinBox(valueChanged=self.changed)
+        self.crawlLabel = QLabel()
+        self.crawlRunners = QSpinBox(valueChanged=self.changed)
+        for row, (label, spinbox) in enumerate((
+                (self.engraveLabel, self.engraveRunners),
+                (self.genericLabel, self.genericRunners),
+                (self.crawlLabel, self.crawlRunners))):
+            spinbox.setRange(1, 64)
+            label.setBuddy(spinbox)
+            layout.addWidget(label, row, 0)
+            layout.addWidget(spinbox, row, 1)
+        layout.setColumnStretch(2, 1)
+        app.translateUI(self)
+
+    def translateUI(self):
+        self.setTitle(_("Parallel jobs"))
+        self.engraveLabel.setText(_("Number of parallel engrave jobs:"))
+        self.engraveRunners.setToolTip(_(
+            "The maximum number of LilyPond engrave jobs that run at the same time.\n"
+            "Defaults to the number of processor cores."))
+        self.genericLabel.setText(_("Number of parallel other jobs:"))
+        self.genericRunners.setToolTip(_(
+            "The maximum number of other jobs (e.g. convert-ly or MIDI export)\n"
+            "that run at the same time."))
+        self.crawlLabel.setText(_("Number of parallel background jobs:"))
+        self.crawlRunners.setToolTip(_(
+            "The maximum number of jobs that collect information in the\n"
+            "background at the same time."))
+
+    def loadSettings(self):
+        import job.queue
+        num_runners = job.queue.num_runners()
+        self.engraveRunners.setValue(num_runners['engrave'])
+        self.genericRunners.setValue(num_runners['generic'])
+        self.crawlRunners.setValue(num_runners['crawl'])
+
+    def saveSettings(self):
+        s = QSettings()
+        s.beginGroup("job_queue")
+        s.setValue("engrave_runners", self.engraveRunners.value())
+        s.setValue("generic_runners", self.genericRunners.value())
+        s.setValue("crawl_runners", self.crawlRunners.value())
@@ -94,6 +94,12 @@ class MusicView(preferences.Group):
         layout.addWidget(self.magnifierScaleSlider, 3, 1, 1, 2)
         layout.addWidget(self.magnifierScaleSpinBox, 3, 3)
 
+        self.maxOpenDocumentsLabel = QLabel()
+        self.maxOpenDocuments = QSpinBox(valueChanged=self.changed)
+        self.maxOpenDocuments.setRange(2, 100)
+        layout.addWidget(self.maxOpenDocumentsLabel, 4, 0, 1, 3)
+        layout.addWidget(self.maxOpenDocuments, 4, 3)
+
         app.translateUI(self)
 
     def translateUI(self):
@@ -121,6 +127,10 @@ class MusicView(preferences.Group):
         self.magnifierScaleLabel.setToolTip(_(
             "Magnification of the magnifier."))
         self.magnifierScaleSpinBox.setSuffix(_("percent unit sign", "%"))
+        self.maxOpenDocumentsLabel.setText(_("Maximum number of open PDF documents:"))
+        self.maxOpenDocumentsLabel.setToolTip(_(
+            "The number of PDF documents that are kept in memory. Documents\n"
+            "that were not shown recently are closed and reopened when needed."))
 
     def loadSettings(self):
         s = QSettings()
@@ -137,6 +147,7 @@ class MusicView(preferences.Group):
         self.arthurBackend.setChecked(useArthur)
         self.magnifierSizeSlider.setValue(s.value("magnifier/size", 350, int))
         self.magnifierScaleSlider.setValue(round(s.value("magnifier/scalef", 3.0, float) * 100))
+        self.maxOpenDocuments.setValue(s.value("max_open_documents", 8, int))
 
     def saveSettings(self):
         s = QSettings()
@@ -148,6 +159,7 @@ class MusicView(preferences.Group):
         s.setValue("arthurbackend", self.arthurBackend.isChecked())
         s.setValue("magnifier/size", self.magnifierSizeSlider.value())
         s.setValue("magnifier/scalef", self.magnifierScaleSlider.value() / 100.0)
+        s.setValue("max_open_documents", self.maxOpenDocuments.value())
 
 
 class Printing(preferences.Group):
@@ -0,0 +1,177 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Searches a list of files in a pool of worker threads.
+
+Files on disk are read using mmap. For plain (not regular expression),
+case sensitive searches, files that do not contain the search text at all
+are skipped without decoding them.
+
+"""
+
+
+import codecs
+import collections
+import concurrent.futures
+import mmap
+import os
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+import util
+
+
+# a search result
+Match = collections.namedtuple('Match', 'start end line column text')
+
+
+class Scanner(QObject):
+    """Searches files in worker threads and emits the results per file.
+
+    The found signal is emitted in the main thread with the filename and
+    a list of Match tuples, for every file (also if nothing was found).
+    The finished signal is emitted when all files are searched.
+
+    """
+    found = pyqtSignal(str, object)
+    finished = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super(Scanner, self).__init__(parent)
+        self._executor = None
+        self._cancelled = None
+        self._remaining = 0
+        self._results = _Relay()
+        self._results.found.connect(self._slotFound)
+
+    def start(self, pattern, files, texts=None, literal=None):
+        """Start searching the files for the compiled regular expression.
+
+        texts, if given, is a dictionary mapping filenames to the text to
+        search instead of the file contents, e.g. for files that are open
+        in the editor. If literal is given, it is the plain text that is
+        searched for case sensitively, which makes it possible to skip
+        files without decoding them.
+
+        """
+        self.cancel()
+        texts = texts or {}
+        if not files:
+            self.finished.emit()
+            return
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                min(8, os.cpu_count() or 1))
+        cancelled = self._cancelled = threading.Event()
+        self._remaining = len(files)
+        for filename in files:
+            self._executor.submit(self._run, pattern, filename,
+                texts.get(filename), literal, cancelled)
+
+    def cancel(self):
+        """Stop searching, results still being searched are not emitted."""
+        if self._cancelled:
+            self._cancelled.set()
+            self._cancelled = None
+        self._remaining = 0
+
+    def isRunning(self):
+        """Return True if files are being searched."""
+        return self._remaining > 0
+
+    def _run(self, pattern, filename, text, literal, cancelled):
+        """(internal) Search one file in a worker thread."""
+        if cancelled.is_set():
+            return
+        try:
+            matches = search_file(pattern, filename, text, literal)
+        except Exception:
+            # unreadable file; the file must still be reported
+            matches = []
+        if not cancelled.is_set():
+            self._results.found.emit(cancelled, filename, matches)
+
+    def _slotFound(self, cancelled, filename, matches):
+        """(internal) Called in the main thread with the results of a file."""
+        if cancelled is self._cancelled:
+            self.found.emit(filename, matches)
+            self._remaining -= 1
+            if not self._remaining:
+                self._cancelled = None
+                self.finished.emit()
+
+
+class _Relay(QObject):
+    """Carries the results from the worker threads to the main thread."""
+    found = pyqtSignal(object, str, object)
+
+
+def read_file(filename, literal=None):
+    """Return the text of the file, or None if it does not contain literal.
+
+    The file is read using mmap, and decoded like Frescobaldi does when
+    loading a document.
+
+    """
+    try:
+        needle = literal.encode('ascii') if literal else None
+    except UnicodeError:
+        needle = None
+    with open(filename, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return None if literal else ''
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            # an ASCII search text can be found in the bytes, unless the
+            # file is encoded in UTF-16 or UTF-32
+            if (needle
+                and m[:2] not in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+                and m[:4] != codecs.BOM_UTF32_BE
+                and m.find(needle) == -1):
+                return None
+            data = m[:]
+    return util.universal_newlines(util.decode(data))
+
+
+def search_file(pattern, filename, text=None, literal=None):
+    """Search the text (or else the contents of the file) for pattern.
+
+    Returns a list of Match tuples. The line numbers start with 1, the
+    columns with 0.
+
+    """
+    if text is None:
+        text = read_file(filename, literal)
+        if text is None:
+            return []
+    matches = []
+    line = 1
+    pos = 0
+    for m in pattern.finditer(text):
+        start = m.start()
+        line += text.count('\n', pos, start)
+        line_start = text.rfind('\n', 0, start) + 1
+        line_end = text.find('\n', start)
+        if line_end == -1:
+            line_end = len(text)
+        matches.append(Match(start, m.end(), line, start - line_start,
+                             text[line_start:line_end]))
+        pos = start
+    return matches
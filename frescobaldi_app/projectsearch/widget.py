@@ -0,0 +1,255 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+The Search in Project widget.
+"""
+
+
+import os
+import re
+
+from PyQt5.QtCore import QUrl
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import (
+    QCheckBox, QGridLayout, QLabel, QLineEdit, QPushButton, QTreeWidget,
+    QTreeWidgetItem, QVBoxLayout, QWidget)
+
+import app
+import browseriface
+import cursortools
+import includegraph
+
+from . import scanner
+
+
+class Widget(QWidget):
+    def __init__(self, panel):
+        super(Widget, self).__init__(panel)
+        self._pattern = None
+        self._regex = False
+        self._count = 0
+
+        self._scanner = scanner.Scanner(self)
+        self._scanner.found.connect(self.slotFound)
+        self._scanner.finished.connect(self.slotFinished)
+
+        layout = QVBoxLayout(spacing=2)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+        grid = QGridLayout(spacing=2)
+        layout.addLayout(grid)
+
+        self.searchLabel = QLabel()
+        self.searchEntry = QLineEdit(returnPressed=self.startSearch)
+        self.caseCheck = QCheckBox(checked=True)
+        self.regexCheck = QCheckBox()
+        self.searchButton = QPushButton(clicked=self.startSearch)
+        self.replaceLabel = QLabel()
+        self.replaceEntry = QLineEdit()
+        self.replaceButton = QPushButton(clicked=self.replaceAll)
+        self.replaceButton.setEnabled(False)
+
+        grid.addWidget(self.searchLabel, 0, 0)
+        grid.addWidget(self.searchEntry, 0, 1)
+        grid.addWidget(self.caseCheck, 0, 2)
+        grid.addWidget(self.regexCheck, 0, 3)
+        grid.addWidget(self.searchButton, 0, 4)
+        grid.addWidget(self.replaceLabel, 1, 0)
+        grid.addWidget(self.replaceEntry, 1, 1)
+        grid.addWidget(self.replaceButton, 1, 4)
+
+        self.tree = QTreeWidget(headerHidden=True)
+        self.tree.itemActivated.connect(self.slotItemActivated)
+        layout.addWidget(self.tree)
+        self.statusLabel = QLabel()
+        layout.addWidget(self.statusLabel)
+
+        app.translateUI(self)
+
+    def translateUI(self):
+        self.searchLabel.setText(_("Search:"))
+        self.caseCheck.setText(_("&Case"))
+        self.caseCheck.setToolTip(_("Case Sensitive"))
+        self.regexCheck.setText(_("&Regex"))
+        self.regexCheck.setToolTip(_("Regular Expression"))
+        self.searchButton.setText(_("&Search"))
+        self.searchButton.setToolTip(_(
+            "Searches all open documents and the files they include."))
+        self.replaceLabel.setText(_("Replace:"))
+        self.replaceButton.setText(_("Replace &All"))
+        self.replaceButton.setToolTip(_(
+            "Replaces all occurrences in the found files. The files are opened "
+            "if needed, and the replacements in every document can be undone "
+            "in one step."))
+
+    def mainwindow(self):
+        return self.parent().mainwindow()
+
+    def pattern(self):
+        """Return the compiled regular expression to search for, or None."""
+        search = self.searchEntry.text()
+        if search:
+            flags = re.MULTILINE | re.DOTALL
+            if not self.caseCheck.isChecked():
+                flags |= re.IGNORECASE
+            if not self.regexCheck.isChecked():
+                search = re.escape(search)
+            try:
+                return re.compile(search, flags)
+            except re.error as e:
+                self.statusLabel.setText(_("Invalid regular expression: {message}").format(
+                    message=e))
+
+    def startSearch(self):
+        """Search all files of the project."""
+        pattern = self.pattern()
+        if not pattern:
+            return
+        self._pattern = pattern
+        self._regex = self.regexCheck.isChecked()
+        self._count = 0
+        self.tree.clear()
+        self.replaceButton.setEnabled(False)
+        files, texts = project_files()
+        literal = None
+        if not self._regex and self.caseCheck.isChecked():
+            literal = self.searchEntry.text()
+        self.statusLabel.setText(_("Searching..."))
+        self._scanner.start(pattern, files, texts, literal)
+
+    def slotFound(self, filename, matches):
+        """Called when a file has been searched."""
+        if not matches:
+            return
+        self._count += len(matches)
+        item = QTreeWidgetItem(self.tree)
+        item.setText(0, "{0} ({1})".format(os.path.basename(filename), len(matches)))
+        item.setToolTip(0, filename)
+        item.filename = filename
+        for m in matches:
+            child = QTreeWidgetItem(item)
+            child.setText(0, "{0}: {1}".format(m.line, m.text.strip()))
+            child.filename = filename
+            child.match = m
+        self.statusLabel.setText(self.foundMessage())
+
+    def slotFinished(self):
+        """Called when all files have been searched."""
+        self.statusLabel.setText(self.foundMessage())
+        self.replaceButton.setEnabled(bool(self._count))
+
+    def foundMessage(self):
+        """Return the text describing the number of search results."""
+        return _("Found {count} occurrence.", "Found {count} occurrences.",
+                 self._count).format(count=self._count)
+
+    def slotItemActivated(self, item):
+        """Called when the user activates an item, shows the search result."""
+        try:
+            doc = app.openUrl(QUrl.fromLocalFile(item.filename))
+        except (OSError, IOError):
+            return
+        cursor = QTextCursor(doc)
+        m = getattr(item, 'match', None)
+        if m:
+            block = doc.findBlockByNumber(m.line - 1)
+            if block.isValid():
+                pos = block.position() + min(m.column, block.length() - 1)
+                cursor.setPosition(pos)
+                end = min(pos + m.end - m.start, doc.characterCount() - 1)
+                cursor.setPosition(end, QTextCursor.KeepAnchor)
+        browseriface.get(self.mainwindow()).setTextCursor(cursor)
+        self.mainwindow().currentView().centerCursor()
+
+    def replaceAll(self):
+        """Replace all occurrences in the files that were found."""
+        if not self._pattern or self._scanner.isRunning():
+            return
+        replace = self.replaceEntry.text()
+        if self._regex:
+            # check the replacement text before any document is changed;
+            # sub() parses the template even if there is nothing to replace
+            try:
+                self._pattern.sub(replace, '')
+            except (re.error, IndexError) as e:
+                self.statusLabel.setText(_("Invalid replacement text: {message}").format(
+                    message=e))
+                return
+        filenames = [self.tree.topLevelItem(i).filename
+                     for i in range(self.tree.topLevelItemCount())]
+        count = 0
+        for filename in filenames:
+            try:
+                doc = app.openUrl(QUrl.fromLocalFile(filename))
+            except (OSError, IOError):
+                continue
+            count += replace_all(doc, self._pattern, replace, self._regex)
+        self.tree.clear()
+        self.replaceButton.setEnabled(False)
+        self.statusLabel.setText(_("Replaced {count} occurrence.",
+            "Replaced {count} occurrences.", count).format(count=count))
+
+
+def project_files():
+    """Return the files to search and the texts of the open documents.
+
+    Returns a tuple (files, texts). files is the sorted list of the open
+    documents and all the files they include, according to the include
+    graph. texts is a dictionary mapping the filenames of the open documents
+    to their current text, which is searched instead of the file on disk.
+    Documents that are not loaded yet are searched on disk.
+
+    """
+    graph = includegraph.graph()
+    files = set()
+    texts = {}
+    for doc in app.documents:
+        filename = doc.url().toLocalFile()
+        if filename:
+            filename = os.path.realpath(filename)
+            if not doc.isLazy():
+                texts[filename] = doc.toPlainText()
+            files.add(filename)
+            files.update(graph.includes(filename))
+    return sorted(files), texts
+
+
+def replace_all(doc, pattern, replace, expand=False):
+    """Replace all matches of pattern in the document as one undo step.
+
+    If expand is True, backslash escapes and group references in the
+    replacement text are expanded. Returns the number of replacements.
+
+    """
+    matches = list(pattern.finditer(doc.toPlainText()))
+    if not matches:
+        return 0
+    if expand:
+        # raises re.error or IndexError before the document is changed
+        replacements = [m.expand(replace) for m in matches]
+    else:
+        replacements = [replace] * len(matches)
+    cursor = QTextCursor(doc)
+    with cursortools.compress_undo(cursor):
+        for m, text in zip(reversed(matches), reversed(replacements)):
+            cursor.setPosition(m.start())
+            cursor.setPosition(m.end(), QTextCursor.KeepAnchor)
+            cursor.insertText(text)
+    return len(matches)
@@ -22,11 +22,10 @@ Widget for search and replace.
 """
 
 
-import bisect
 import re
 import weakref
 
-from PyQt5.QtCore import QEvent, Qt
+from PyQt5.QtCore import QEvent, QPoint, Qt, QTimer
 from PyQt5.QtGui import QKeySequence, QPalette, QTextCursor
 from PyQt5.QtWidgets import (
     QAction, QApplication, QCheckBox, QGridLayout, QLabel, QLineEdit,
@@ -43,12 +42,23 @@ import wordboundary
 import viewhighlighter
 import gadgets.borderlayout
 
+from . import matchindex
+
 
 class Search(plugin.MainWindowPlugin, QWidget):
+
+    # number of blocks around the visible region for which the search
+    # results are highlighted
+    WINDOW = 100
+
     def __init__(self, mainwindow):
         QWidget.__init__(self, mainwindow)
         self._currentView = None
-        self._positions = []
+        self._index = None          # MatchIndex for the current document
+        self._count = 0             # total number of search results
+        self._range = (0, None)     # part of the document that is searched
+        self._positions = []        # search results near the visible region
+        self._window = None         # (first, last) block number of _positions
         self._positionsDirty = True
         self._replace = False  # are we in replace mode?
         self._going = False    # are we moving the text cursor?
@@ -91,6 +101,10 @@ class Search(plugin.MainWindowPlugin, QWidget):
         grid.addWidget(self.countLabel, 0, 6)
         grid.addWidget(self.closeButton, 0, 7)
 
+        # wait for the user to stop typing before searching
+        self._searchTimer = QTimer(self, singleShot=True, interval=150,
+                                   timeout=self.searchChanged)
+
         self.caseCheck.toggled.connect(self.slotSearchChanged)
         self.regexCheck.toggled.connect(self.slotSearchChanged)
 
@@ -142,9 +156,15 @@ class Search(plugin.MainWindowPlugin, QWidget):
         if cur:
             cur.selectionChanged.disconnect(self.slotSelectionChanged)
             cur.document().contentsChanged.disconnect(self.slotDocumentContentsChanged)
+            cur.verticalScrollBar().valueChanged.disconnect(self.slotScrolled)
+        if self._index:
+            self._index.close()
+            self._index = None
         if view:
             view.selectionChanged.connect(self.slotSelectionChanged)
             view.document().contentsChanged.connect(self.slotDocumentContentsChanged)
+            view.verticalScrollBar().valueChanged.connect(self.slotScrolled)
+            self._index = matchindex.MatchIndex(view.document())
         self._currentView = weakref.ref(view) if view else None
 
     def showWidget(self):
@@ -163,6 +183,10 @@ class Search(plugin.MainWindowPlugin, QWidget):
         if view:
             self.highlightingOff()
             self.hide()
+            # stop updating the search results while hidden
+            self._searchTimer.stop()
+            self._index.setPattern(None)
+            self.markPositionsDirty()
             layout = gadgets.borderlayout.BorderLayout.get(view)
             layout.removeWidget(self)
 
@@ -188,6 +212,14 @@ class Search(plugin.MainWindowPlugin, QWidget):
             self.updatePositions()
             self.highlightingOn()
 
+    def slotScrolled(self):
+        """Called when the View scrolls, updates the highlighted results."""
+        if self.isVisible() and not self._positionsDirty:
+            first, last = self.visibleBlocks()
+            if not self._window or first < self._window[0] or last > self._window[1]:
+                self.updateVisiblePositions()
+                self.highlightingOn()
+
     def slotHide(self):
         """Called when the close button is clicked."""
         view = self.currentView()
@@ -218,7 +250,7 @@ class Search(plugin.MainWindowPlugin, QWidget):
                 word = re.escape(word)
             with qutil.signalsBlocked(self.searchEntry):
                 self.searchEntry.setText(word)
-            self.slotSearchChanged()
+            self.searchChanged()
         else:
             self.searchEntry.selectAll()
             self.highlightingOn()
@@ -244,26 +276,36 @@ class Search(plugin.MainWindowPlugin, QWidget):
 
     def slotSearchChanged(self):
         """Called on every change in the search text entry."""
+        self._searchTimer.start()
+
+    def searchChanged(self):
+        """Called when the search text or options have changed."""
+        self._searchTimer.stop()
         self._going = True
         self.markPositionsDirty()
         self.updatePositions()
         self.highlightingOn()
-        if not self._replace and self._positions:
-            positions = [c.position() for c in self._positions]
+        if not self._replace and self._count:
             cursor = self.currentView().textCursor()
-            index = bisect.bisect_left(positions, cursor.selectionStart())
-            if index == len(positions):
-                index -= 1
-            elif index > 0:
-                # it might be possible that the text cursor currently already
-                # is in a search result. This happens when the search is pop up
-                # with an empty text and the current word is then set as search
-                # text.
-                if cursortools.contains(self._positions[index-1], cursor):
-                    index -= 1
-            self.gotoPosition(index)
+            pos = cursor.selectionStart()
+            start, end = self._range
+            # it might be possible that the text cursor currently already
+            # is in a search result. This happens when the search is pop up
+            # with an empty text and the current word is then set as search
+            # text.
+            match = next(self._index.backward(pos, start), None)
+            if not match or match[1] < cursor.selectionEnd():
+                match = (next(self._index.forward(pos, end), None)
+                         or next(self._index.backward(end, start)))
+            self.gotoMatch(match)
         self._going = False
 
+    def flushSearch(self):
+        """Search now if the user was still typing."""
+        if self._searchTimer.isActive():
+            self._searchTimer.stop()
+            self.markPositionsDirty()
+
     def highlightingOn(self, view=None):
         """Show the current search result positions."""
         if view is None:
@@ -281,77 +323,110 @@ class Search(plugin.MainWindowPlugin, QWidget):
     def markPositionsDirty(self):
         """Delete positions and mark them dirty, i.e. they need updating."""
         self._positions = []
+        self._window = None
+        self._count = 0
         self._positionsDirty = True
 
-    def updatePositions(self):
-        """Update the search result positions if necessary."""
-        view = self.currentView()
-        if not view or not self._positionsDirty:
-            return
+    def pattern(self):
+        """Return the compiled regular expression to search for, or None."""
         search = self.searchEntry.text()
-        cursor = view.textCursor()
-        document = view.document()
-        self._positions = []
         if search:
-            text = document.toPlainText()
-            start = 0
-            if (self._replace or not self._going) and cursor.hasSelection():
-                # don't search outside the selection
-                start = cursor.selectionStart()
-                text = text[start:cursor.selectionEnd()]
             flags = re.MULTILINE | re.DOTALL
             if not self.caseCheck.isChecked():
                 flags |= re.IGNORECASE
             if not self.regexCheck.isChecked():
                 search = re.escape(search)
             try:
-                matches = re.finditer(search, text, flags)
+                return re.compile(search, flags)
             except re.error:
                 pass
-            else:
-                for m in matches:
-                    c = QTextCursor(document)
-                    c.setPosition(start + m.end())
-                    c.setPosition(start + m.start(), QTextCursor.KeepAnchor)
-                    self._positions.append(c)
-        self.countLabel.setText(format(len(self._positions)))
-        enabled = len(self._positions) > 0
+
+    def updatePositions(self):
+        """Update the search result positions if necessary."""
+        view = self.currentView()
+        if not view or not self._positionsDirty:
+            return
+        cursor = view.textCursor()
+        self._range = (0, None)
+        if (self._replace or not self._going) and cursor.hasSelection():
+            # don't search outside the selection
+            self._range = (cursor.selectionStart(), cursor.selectionEnd())
+        self._index.setPattern(self.pattern())
+        self._count = self._index.count(*self._range)
+        self.countLabel.setText(format(self._count))
+        enabled = self._count > 0
         self.replaceButton.setEnabled(enabled)
         self.replaceAllButton.setEnabled(enabled)
         self.prevButton.setEnabled(enabled)
         self.nextButton.setEnabled(enabled)
         self._positionsDirty = False
+        self.updateVisiblePositions()
+
+    def visibleBlocks(self):
+        """Return the numbers of the first and last block visible in the View."""
+        view = self.currentView()
+        first = view.cursorForPosition(QPoint(0, 0)).blockNumber()
+        last = view.cursorForPosition(QPoint(0, view.viewport().height())).blockNumber()
+        return first, last
+
+    def updateVisiblePositions(self):
+        """Create the QTextCursors for the search results near the visible region.
+
+        Only WINDOW blocks before and after the visible region are taken
+        into account, so the number of cursors stays small.
+
+        """
+        first, last = self.visibleBlocks()
+        document = self.currentView().document()
+        first = max(0, first - self.WINDOW)
+        last = min(document.blockCount() - 1, last + self.WINDOW)
+        self._window = (first, last)
+        start, end = self._range
+        block = document.findBlockByNumber(last)
+        start = max(start, document.findBlockByNumber(first).position())
+        last_pos = block.position() + block.length() - 1
+        end = last_pos if end is None else min(end, last_pos)
+        self._positions = [self.cursor(match)
+                           for match in self._index.forward(start, end)]
+
+    def cursor(self, match):
+        """Return a QTextCursor selecting the (start, end) tuple match."""
+        c = QTextCursor(self.currentView().document())
+        c.setPosition(match[1])
+        c.setPosition(match[0], QTextCursor.KeepAnchor)
+        return c
 
     def findNext(self):
         """Called on menu Find Next."""
         self._going = True
+        self.flushSearch()
         self.updatePositions()
         view = self.currentView()
-        if view and self._positions:
-            positions = [c.position() for c in self._positions]
-            index = bisect.bisect_right(positions, view.textCursor().position())
-            if index < len(positions):
-                self.gotoPosition(index)
-            else:
-                self.gotoPosition(0)
+        if view and self._count:
+            start, end = self._range
+            pos = max(start, view.textCursor().position() + 1)
+            match = (next(self._index.forward(pos, end), None)
+                     or next(self._index.forward(start, end)))
+            self.gotoMatch(match)
             view.ensureCursorVisible()
         self._going = False
 
     def findPrevious(self):
         """Called on menu Find Previous."""
         self._going = True
+        self.flushSearch()
         self.updatePositions()
         view = self.currentView()
-        positions = [c.position() for c in self._positions]
-        if view and positions:
-            index = bisect.bisect_left(positions, view.textCursor().position()) - 1
-            self.gotoPosition(index)
+        if view and self._count:
+            start, end = self._range
+            match = (next(self._index.backward(view.textCursor().position(), start), None)
+                     or next(self._index.backward(end, start)))
+            self.gotoMatch(match)
         self._going = False
 
-    def gotoPosition(self, index):
-        """Scrolls the current View to the position in the _positions list at index."""
-        c = QTextCursor(self._positions[index])
-        #c.clearSelection()
+    def gotoMatch(self, match):
+        """Scrolls the current View to the (start, end) tuple match."""
+        c = self.cursor(match)
         self.currentView().gotoTextCursor(c)
         self.currentView().ensureCursorVisible()
 
@@ -378,7 +453,7 @@ class Search(plugin.MainWindowPlugin, QWidget):
     def keyPressEvent(self, ev):
         """Catches Up and Down to jump between search results."""
         # if in search mode, Up and Down jump between search results
-        if not self._replace and self._positions and self.searchEntry.text() and not ev.modifiers():
+        if not self._replace and self._count and self.searchEntry.text() and not ev.modifiers():
             if ev.key() == Qt.Key_Up:
                 self.findPrevious()
                 return
@@ -414,21 +489,25 @@ class Search(plugin.MainWindowPlugin, QWidget):
 
     def slotReplace(self):
         """Called when the user clicks Replace."""
+        self.flushSearch()
+        self.updatePositions()
         view = self.currentView()
-        if view and self._positions:
-            positions = [c.position() for c in self._positions]
-            index = bisect.bisect_left(positions, view.textCursor().position())
-            if index >= len(positions):
-                index = 0
-            if self.doReplace(self._positions[index]):
+        if view and self._count:
+            start, end = self._range
+            pos = max(start, view.textCursor().position())
+            match = (next(self._index.forward(pos, end), None)
+                     or next(self._index.forward(start, end)))
+            if self.doReplace(self.cursor(match)):
                 self.findNext()
 
     def slotReplaceAll(self):
         """Called when the user clicks Replace All."""
+        self.flushSearch()
+        self.updatePositions()
         view = self.currentView()
         if view:
             replaced = False
-            cursors = self._positions
+            cursors = [self.cursor(match) for match in self._index.forward(*self._range)]
             if view.textCursor().hasSelection():
                 cursors = [cursor for cursor in cursors if cursortools.contains(view.textCursor(), cursor)]
             with cursortools.compress_undo(view.textCursor()):
@@ -0,0 +1,263 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Keeps the matches of a search pattern in a document up to date.
+
+The matches are stored per text block, relative to the start of the block.
+When the document changes, only the changed blocks are searched again.
+
+Patterns that may match across line ends (e.g. containing a newline, a
+negated character set or whitespace), can't be searched per block; for those the
+full text is searched again after every change, when the matches are asked
+for.
+
+"""
+
+
+import bisect
+
+try:
+    from re import _parser as sre_parse     # Python >= 3.11
+except ImportError:
+    import sre_parse
+
+
+class MatchIndex(object):
+    """The matches of a compiled regular expression in a QTextDocument."""
+    def __init__(self, document):
+        self._document = document
+        self._pattern = None
+        self._multiline = False
+        self._blocks = []       # per block a tuple of (start, end) tuples
+        self._count = 0
+        self._matches = None    # list of (start, end) for multiline patterns
+        document.contentsChange.connect(self.slotContentsChange)
+
+    def document(self):
+        """Return the QTextDocument."""
+        return self._document
+
+    def close(self):
+        """Stop keeping track of the document."""
+        self.setPattern(None)
+        self._document.contentsChange.disconnect(self.slotContentsChange)
+
+    def pattern(self):
+        """Return the compiled regular expression, None if not searching."""
+        return self._pattern
+
+    def setPattern(self, pattern):
+        """Set the compiled regular expression to search for.
+
+        Set to None to stop keeping track of the matches.
+
+        """
+        if pattern == self._pattern:
+            return
+        self._pattern = pattern
+        self._blocks = []
+        self._count = 0
+        self._matches = None
+        if pattern is not None:
+            self._multiline = may_match_newline(pattern)
+            if not self._multiline:
+                self._blocks = self.search(self.document().firstBlock(), -1)
+                self._count = sum(map(len, self._blocks))
+
+    def slotContentsChange(self, position, removed, added):
+        """Called when the document changes, searches the changed blocks again."""
+        if self._pattern is None:
+            return
+        elif self._multiline:
+            self._matches = None
+            return
+        doc = self.document()
+        end = min(position + added, doc.characterCount() - 1)
+        first = doc.findBlock(position).blockNumber()
+        last = doc.findBlock(end).blockNumber()
+        old_last = last + len(self._blocks) - doc.blockCount()
+        if first < 0 or last < first or old_last < first - 1:
+            # should not happen, just search everything again
+            pattern, self._pattern = self._pattern, None
+            self.setPattern(pattern)
+            return
+        new = self.search(doc.findBlockByNumber(first), last - first + 1)
+        self._count += sum(map(len, new)) - sum(map(len, self._blocks[first:old_last+1]))
+        self._blocks[first:old_last+1] = new
+
+    def search(self, block, count):
+        """(internal) Return a list with the matches of count blocks.
+
+        If count is -1, searches until the end of the document.
+
+        """
+        search = self._pattern.finditer
+        result = []
+        while count and block.isValid():
+            result.append(tuple(m.span() for m in search(block.text())))
+            block = block.next()
+            count -= 1
+        return result
+
+    def allMatches(self):
+        """(internal) Return the list of all matches for a multiline pattern."""
+        if self._matches is None:
+            text = self.document().toPlainText()
+            self._matches = [m.span() for m in self._pattern.finditer(text)]
+        return self._matches
+
+    def count(self, start=0, end=None):
+        """Return the number of matches, optionally between start and end."""
+        if self._pattern is None:
+            return 0
+        elif start == 0 and end is None:
+            return len(self.allMatches()) if self._multiline else self._count
+        return sum(1 for m in self.forward(start, end))
+
+    def forward(self, start=0, end=None):
+        """Yield the (start, end) tuples of the matches between start and end.
+
+        Only matches that start at or after start, and end before or at end
+        are yielded.
+
+        """
+        if self._pattern is None:
+            return
+        if self._multiline:
+            matches = self.allMatches()
+            i = bisect.bisect_left(matches, (start,))
+            for m in matches[i:]:
+                if end is not None and m[1] > end:
+                    if m[0] > end:
+                        return
+                    continue
+                yield m
+            return
+        doc = self.document()
+        block = doc.findBlock(start)
+        while block.isValid():
+            pos = block.position()
+            if end is not None and pos > end:
+                return
+            for s, e in self._blocks[block.blockNumber()]:
+                s += pos
+                e += pos
+                if s >= start and (end is None or e <= end):
+                    yield s, e
+            block = block.next()
+
+    def backward(self, end=None, start=0):
+        """Yield the (start, end) tuples of matches before end, backwards.
+
+        Only matches that start before end (and at or after start) are yielded.
+
+        """
+        if self._pattern is None:
+            return
+        if self._multiline:
+            matches = self.allMatches()
+            i = len(matches) if end is None else bisect.bisect_left(matches, (end,))
+            for m in reversed(matches[:i]):
+                if m[0] < start:
+                    return
+                yield m
+            return
+        doc = self.document()
+        block = doc.lastBlock() if end is None else doc.findBlock(end)
+        if not block.isValid():
+            block = doc.lastBlock()
+        while block.isValid():
+            pos = block.position()
+            if pos + block.length() <= start:
+                return
+            for s, e in reversed(self._blocks[block.blockNumber()]):
+                s += pos
+                e += pos
+                if (end is None or s < end) and s >= start:
+                    yield s, e
+            block = block.previous()
+
+
+def may_match_newline(pattern):
+    r"""Return True if the compiled regular expression may match a newline.
+
+    Also returns True when the pattern behaves differently when searched
+    per line, e.g. because of \A or \Z, or when it can't be determined.
+
+    """
+    try:
+        return _may_match_newline(sre_parse.parse(pattern.pattern, pattern.flags))
+    except Exception:
+        return True
+
+
+# character categories that contain the newline
+_newline_categories = {
+    'CATEGORY_SPACE', 'CATEGORY_NOT_WORD', 'CATEGORY_NOT_DIGIT',
+    'CATEGORY_LINEBREAK',
+}
+
+
+def _may_match_newline(items):
+    """Return True if the parsed pattern items may match a newline."""
+    for op, av in items:
+        op = str(op)
+        if op == 'LITERAL':
+            if av == 10:
+                return True
+        elif op == 'NOT_LITERAL':
+            if av != 10:
+                return True
+        elif op == 'ANY':
+            # DOTALL is always used
+            return True
+        elif op == 'IN':
+            for setop, setav in av:
+                setop = str(setop)
+                if (setop == 'NEGATE'
+                    or (setop == 'LITERAL' and setav == 10)
+                    or (setop == 'RANGE' and setav[0] <= 10 <= setav[1])
+                    or (setop == 'CATEGORY' and str(setav) in _newline_categories)):
+                    return True
+        elif op == 'AT':
+            if str(av) in ('AT_BEGINNING_STRING', 'AT_END_STRING'):
+                return True
+        elif op == 'BRANCH':
+            if any(_may_match_newline(b) for b in av[1]):
+                return True
+        elif op == 'SUBPATTERN':
+            if _may_match_newline(av[-1]):
+                return True
+        elif op in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'):
+            if _may_match_newline(av[2]):
+                return True
+        elif op in ('ASSERT', 'ASSERT_NOT'):
+            if _may_match_newline(av[1]):
+                return True
+        elif op == 'ATOMIC_GROUP':
+            if _may_match_newline(av):
+                return True
+        elif op == 'GROUPREF_EXISTS':
+            if _may_match_newline(av[1]) or (av[2] and _may_match_newline(av[2])):
+                return True
+        elif op != 'GROUPREF':
+            # unknown construct
+            return True
+    return False
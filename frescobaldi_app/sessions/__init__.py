@@ -27,6 +27,8 @@ A session is a global list of open documents, with some additional preferences s
 
 
 import itertools
+import os
+import time
 
 from PyQt5.QtCore import QSettings, QUrl
 
@@ -99,24 +101,40 @@ def loadSession(name):
     Return the document that should become the active one.
     If None is returned, the session did not open any documents!
 
+    If the session is restored lazily, only the active document is loaded,
+    the other documents are loaded when they are first shown. The time the
+    loading took is stored in the session, see loadTime().
+
     """
+    start = time.perf_counter()
     session = sessionGroup(name)
     urls = qsettings.get_url_list(session, "urls")
     active = session.value("active", -1, int)
+    lazy = session.value("lazy", False, bool)
+    if active not in range(len(urls)):
+        active = 0
     result = None
     docs = []
-    for url in urls:
-        try:
-            doc = app.openUrl(url)
-        except IOError:
-            pass
+    for i, url in enumerate(urls):
+        if lazy and i != active and not app.findDocument(url):
+            if not os.path.isfile(url.toLocalFile()):
+                continue
+            import document
+            doc = document.EditorDocument(url, lazy=True)
         else:
-            docs.append(doc)
+            try:
+                doc = app.openUrl(url)
+            except IOError:
+                continue
+        docs.append(doc)
+        if i == active:
+            result = doc
     setCurrentSession(name)
+    session.setValue("load-time", time.perf_counter() - start)
+    session.setValue("load-count", len(docs))
+    session.setValue("load-lazy", sum(doc.isLazy() for doc in docs))
     if docs:
-        if active not in range(len(docs)):
-            active = 0
-        return docs[active]
+        return result or docs[0]
 
 def saveSession(name, documents, activeDocument=None):
     """Saves the list of documents and which one is active."""
@@ -130,6 +148,20 @@ def saveSession(name, documents, activeDocument=None):
         session.remove("active")
     app.saveSessionData(name)
 
+def loadTime(name):
+    """Return the time in seconds loading the session took the last time.
+
+    Returns a tuple (time, count, lazy), where count is the number of
+    opened documents and lazy the number of those that were not loaded
+    yet. Returns None if the session was never loaded.
+
+    """
+    session = sessionGroup(name)
+    if session.contains("load-time"):
+        return (session.value("load-time", 0.0, float),
+                session.value("load-count", 0, int),
+                session.value("load-lazy", 0, int))
+
 def deleteSession(name):
     session = app.settings("sessions")
     for group in session.childGroups():
@@ -149,6 +149,16 @@ class SessionList(widgets.listedit.ListEdit):
         self.setValue(names)
         if current in names:
             self.setCurrentRow(names.index(current))
+        for item in self.items():
+            loaded = sessions.loadTime(item.text())
+            if loaded:
+                seconds, count, lazy = loaded
+                item.setToolTip(_(
+                    "Opened {count} document ({lazy} loaded later) "
+                    "in {seconds:.2f} seconds.",
+                    "Opened {count} documents ({lazy} loaded later) "
+                    "in {seconds:.2f} seconds.", count).format(
+                    count=count, lazy=lazy, seconds=seconds))
 
     def removeItem(self, item):
         """Reimplemented to delete the specified session."""
@@ -219,11 +229,14 @@ class SessionEditor(QDialog):
         self.autosave = QCheckBox()
         grid.addWidget(self.autosave, 1, 1)
 
+        self.lazy = QCheckBox()
+        grid.addWidget(self.lazy, 2, 1)
+
         self.basedir = widgets.urlrequester.UrlRequester()
         self.basedirLabel = l = QLabel()
         l.setBuddy(self.basedir)
-        grid.addWidget(l, 2, 0)
-        grid.addWidget(self.basedir, 2, 1)
+        grid.addWidget(l, 3, 0)
+        grid.addWidget(self.basedir, 3, 1)
 
         self.inclPaths = ip = QGroupBox(self, checkable=True, checked=False)
         ipLayout = QVBoxLayout()
@@ -237,7 +250,7 @@ class SessionEditor(QDialog):
         self.include.listBox.setDragDropMode(QAbstractItemView.InternalMove)
         ipLayout.addWidget(self.include)
 
-        grid.addWidget(ip, 3, 1)
+        grid.addWidget(ip, 4, 1)
 
         self.revt = QPushButton(self)
         self.clear = QPushButton(self)
@@ -259,6 +272,10 @@ class SessionEditor(QDialog):
     def translateUI(self):
         self.nameLabel.setText(_("Name:"))
         self.autosave.setText(_("Always save the list of documents in this session"))
+        self.lazy.setText(_("Load documents when they are first shown"))
+        self.lazy.setToolTip(_(
+            "When checked, only the active document is loaded when the session "
+            "is opened, which makes opening large sessions faster."))
         self.basedirLabel.setText(_("Base directory:"))
         self.inclPaths.setTitle(_("Use session specific include path"))
         self.replPaths.setText(_("Replace global path"))
@@ -271,6 +288,7 @@ class SessionEditor(QDialog):
     def load(self, name):
         settings = sessions.sessionGroup(name)
         self.autosave.setChecked(settings.value("autosave", True, bool))
+        self.lazy.setChecked(settings.value("lazy", False, bool))
         self.basedir.setPath(settings.value("basedir", "", str))
         self.include.setValue(qsettings.get_string_list(settings, "include-path"))
         self.inclPaths.setChecked(settings.value("set-paths", False, bool))
@@ -320,6 +338,7 @@ class SessionEditor(QDialog):
     def save(self, name):
         settings = sessions.sessionGroup(name)
         settings.setValue("autosave", self.autosave.isChecked())
+        settings.setValue("lazy", self.lazy.isChecked())
         settings.setValue("basedir", self.basedir.path())
         settings.setValue("set-paths", self.inclPaths.isChecked())
         settings.setValue("repl-paths", self.replPaths.isChecked())
@@ -329,6 +348,7 @@ class SessionEditor(QDialog):
 
     def defaults(self):
         self.autosave.setChecked(True)
+        self.lazy.setChecked(False)
         self.basedir.setPath('')
         self.inclPaths.setChecked(False)
         self.replPaths.setChecked(False)
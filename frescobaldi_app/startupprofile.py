@@ -0,0 +1,141 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Measures the startup time of Frescobaldi (the --profile-startup option).
+
+This module is imported by the startup script before all other modules. If
+--profile-startup is on the command line, the time needed to import every
+module, to run every function registered with app.oninit() and to reach
+some milestones (see mark()) is recorded, and a report is written to
+standard error when the event loop is entered.
+
+This module only uses the standard library, because it must be imported
+before everything else.
+
+"""
+
+
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+
+
+_start = time.perf_counter()
+enabled = '--profile-startup' in sys.argv[1:]
+
+_imports = {}   # module name: [self time, total time]
+_inits = []     # (function name, time)
+_marks = []     # (milestone, time since start)
+_stack = []     # time spent in nested imports, per running import
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """Replacement for builtins.__import__ that records the time per module.
+
+    Imports in other threads than the main thread are not recorded.
+
+    """
+    if threading.current_thread() is not _main_thread:
+        return _import(name, globals, locals, fromlist, level)
+    module = name
+    if level:
+        try:
+            module = importlib.util.resolve_name('.' * level + name,
+                                                 globals.get('__package__'))
+        except (AttributeError, ImportError, ValueError):
+            return _import(name, globals, locals, fromlist, level)
+    if module in sys.modules and not fromlist:
+        return _import(name, globals, locals, fromlist, level)
+    _stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _import(name, globals, locals, fromlist, level)
+    finally:
+        total = time.perf_counter() - start
+        nested = _stack.pop()
+        if _stack:
+            _stack[-1] += total
+        if total > 1e-5:
+            t = _imports.setdefault(module, [0.0, 0.0])
+            t[0] += total - nested
+            t[1] += total
+
+
+def timed_init(func):
+    """Return func, or a wrapper that records its running time if enabled.
+
+    Used by app.oninit().
+
+    """
+    if not enabled:
+        return func
+    def wrapper():
+        start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            _inits.append(('{0}.{1}'.format(func.__module__, func.__qualname__),
+                           time.perf_counter() - start))
+    return wrapper
+
+
+def mark(milestone):
+    """Record the time since the start of the application at a milestone."""
+    if enabled:
+        _marks.append((milestone, time.perf_counter() - _start))
+
+
+def report(count=30):
+    """Return the report as a string.
+
+    The count most expensive imports (by time spent in the module itself)
+    are listed.
+
+    """
+    lines = ["Startup profile (msec since the start of Frescobaldi)", ""]
+    lines.extend("{0:10.1f}  {1}".format(t * 1000, m) for m, t in _marks)
+    lines.extend(["", "{0:>10}  {1:>10}  {2}".format("self", "total", "import")])
+    imports = sorted(_imports.items(), key=lambda i: i[1][0], reverse=True)
+    lines.extend("{0:10.1f}  {1:10.1f}  {2}".format(s * 1000, t * 1000, name)
+                 for name, (s, t) in imports[:count])
+    lines.append("{0:10.1f}  {1:>10}  ({2} modules)".format(
+        sum(s for s, t in _imports.values()) * 1000, "", len(_imports)))
+    lines.extend(["", "{0:>10}  {1}".format("time", "app.oninit() function")])
+    lines.extend("{0:10.1f}  {1}".format(t * 1000, name) for name, t
+                 in sorted(_inits, key=lambda i: i[1], reverse=True))
+    return '\n'.join(lines) + '\n'
+
+
+def finish():
+    """Stop recording and write the report to standard error."""
+    global enabled
+    if enabled:
+        mark("event loop running")
+        builtins.__import__ = _import
+        enabled = False
+        sys.stderr.write(report())
+
+
+_import = builtins.__import__
+_main_thread = threading.main_thread()
+if enabled:
+    builtins.__import__ = _timed_import
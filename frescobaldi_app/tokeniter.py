@@ -40,10 +40,21 @@ import highlighter
 
 
 def tokens(block):
-    """Returns the tokens for the given block as a (possibly empty) tuple."""
+    """Returns the tokens for the given block as a (possibly empty) tuple.
+
+    The highlighter stores the tokens in a compact tokenstore.TokenStore,
+    the Token instances are created when they are requested.
+
+    """
     try:
-        return block.userData().tokens
+        return block.userData().tokens.tokens()
     except AttributeError:
+        # the highlighter may not have lexed this block yet
+        if highlighter.highlighter(block.document()).ensureHighlighted(block):
+            try:
+                return block.userData().tokens.tokens()
+            except AttributeError:
+                pass
         # we used to call highlighter.highlighter(block.document()).rehighlight()
         # here, but there is a bug in PyQt-4.9.6 causing QTextBlockUserData to
         # lose its Python attributes. So we only run the highlighter when the
@@ -56,6 +67,8 @@ def state(block):
     hl = highlighter.highlighter(block.document())
     if block.previous().userState() == -1 and block.blockNumber() > 0:
         hl.rehighlight()
+    elif block.blockNumber() > 0:
+        hl.ensureHighlighted(block.previous())
     return hl.state(block.previous())
 
 
@@ -64,6 +77,8 @@ def state_end(block):
     hl = highlighter.highlighter(block.document())
     if block.userState() == -1:
         hl.rehighlight()
+    else:
+        hl.ensureHighlighted(block)
     return hl.state(block)
 
 
@@ -0,0 +1,149 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2021 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Compact storage of the tokens of a line of text.
+
+Instead of keeping a tuple of ly.lex Token instances for every QTextBlock,
+the highlighter stores a TokenStore: an array with a (class id, position,
+length) triple per token, and a reference to the text of the line.
+
+The Token instances are only created when they are asked for, and the most
+recently created tuples are kept in a small cache, so that code iterating
+over the same blocks repeatedly gets the same Token instances.
+"""
+
+
+import array
+import collections
+import sys
+
+
+# maps token class to id and back
+_classes = []
+_class_ids = {}
+
+# cache of recently materialized token tuples
+_cache = collections.OrderedDict()
+CACHE_SIZE = 500
+
+
+def class_id(cls):
+    """Return the integer id for the Token class."""
+    try:
+        return _class_ids[cls]
+    except KeyError:
+        i = _class_ids[cls] = len(_classes)
+        _classes.append(cls)
+        return i
+
+
+def token_class(i):
+    """Return the Token class for the integer id."""
+    return _classes[i]
+
+
+class TokenStore(object):
+    """Stores the tokens of a line of text in a compact way."""
+    __slots__ = ('text', '_data', '__weakref__')
+
+    def __init__(self, text, tokens):
+        self.text = text
+        data = self._data = array.array('i')
+        for t in tokens:
+            data.extend((class_id(type(t)), t.pos, len(t)))
+
+    def __len__(self):
+        return len(self._data) // 3
+
+    def __bool__(self):
+        return bool(self._data)
+
+    def __iter__(self):
+        return iter(self.tokens())
+
+    def __getitem__(self, index):
+        return self.tokens()[index]
+
+    def spans(self):
+        """Yield (cls, pos, length) tuples without creating Token instances."""
+        data = self._data
+        for i in range(0, len(data), 3):
+            yield _classes[data[i]], data[i+1], data[i+2]
+
+    def tokens(self):
+        """Return a tuple of Token instances."""
+        key = id(self)
+        try:
+            store, tokens = _cache[key]
+        except KeyError:
+            pass
+        else:
+            if store is self:
+                _cache.move_to_end(key)
+                return tokens
+        text = self.text
+        tokens = tuple(cls(text[pos:pos+length], pos)
+                       for cls, pos, length in self.spans())
+        _cache[key] = (self, tokens)
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+        return tokens
+
+    def memory(self):
+        """Return the number of bytes used by this store (excluding the text)."""
+        return sys.getsizeof(self) + sys.getsizeof(self._data)
+
+
+def clear_cache():
+    """Remove all materialized tokens from the cache."""
+    _cache.clear()
+
+
+def tuple_memory(tokens):
+    """Return the number of bytes used by a tuple of Token instances."""
+    size = sys.getsizeof(tokens)
+    for t in tokens:
+        size += sys.getsizeof(t)
+        # small integers are shared by Python
+        size += sum(sys.getsizeof(n) for n in (t.pos, t.end) if n > 256)
+    return size
+
+
+def memory_report(text, state):
+    """Lex text and compare the memory used by both token representations.
+
+    state is a ly.lex.State instance to start with. Returns a dictionary with
+    the number of lines and tokens, and the number of bytes used by tuples of
+    Tokens ('tuple') and by TokenStores ('store').
+
+    """
+    lines = tokens = tuple_bytes = store_bytes = 0
+    for line in text.splitlines():
+        t = tuple(state.tokens(line))
+        lines += 1
+        tokens += len(t)
+        tuple_bytes += tuple_memory(t)
+        store_bytes += TokenStore(line, t).memory()
+    return {
+        'lines': lines,
+        'tokens': tokens,
+        'tuple': tuple_bytes,
+        'store': store_bytes,
+    }
@@ -147,6 +147,34 @@ def newer_files(files, time):
     return [f for f in files if os.path.getmtime(f) >= time]
 
 
+def prune_files(directory, max_size):
+    """Remove the least recently modified files below directory.
+
+    Files are removed, oldest first, until the total size of the remaining
+    files is at most max_size bytes. Used to keep caches on disk small.
+
+    """
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()
+    total = sum(size for mtime, size, path in entries)
+    for mtime, size, path in entries:
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
 def group_files(names, groups):
     """Groups the given filenames by extension.
 
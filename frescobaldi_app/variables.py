@@ -37,6 +37,7 @@ __all__ = ['get', 'update', 'manager', 'variables']
 _variable_re = re.compile(r'\s*?([a-z]+(?:-[a-z]+)*):[ \t]*(.*?);')
 
 _LINES = 5      # how many lines from top and bottom to scan for variables
+_CHUNK = 4096   # how many characters to split into lines first
 
 
 def get(doc, varname, default=None):
@@ -68,16 +69,35 @@ def manager(doc):
 
 def variables(text):
     """Reads variables from the first and last _LINES lines of text."""
-    lines = text.splitlines()
-    start, count = 0, len(lines)
+    head, tail = headtail(text)
     d = {}
-    if count > 2 * _LINES:
-        d.update(m.group(1, 2) for n, m in positions(lines[:_LINES]))
-        start = count - _LINES
-    d.update(m.group(1, 2) for n, m in positions(lines[start:]))
+    d.update(m.group(1, 2) for n, m in positions(head))
+    d.update(m.group(1, 2) for n, m in positions(tail))
     return d
 
 
+def headtail(text):
+    """Returns the first and last _LINES lines of text as two lists.
+
+    If the text has no more than 2 * _LINES lines, the first list contains
+    all lines and the second list is empty. Only the beginning and the end of
+    the text are split into lines, so this is fast for large texts.
+
+    """
+    size = _CHUNK
+    while len(text) > size * 2:
+        head = text[:size].splitlines()
+        tail = text[-size:].splitlines()
+        # the last line of head and the first of tail can be incomplete
+        if len(head) > _LINES and len(tail) > _LINES:
+            return head[:_LINES], tail[-_LINES:]
+        size *= 4
+    lines = text.splitlines()
+    if len(lines) > _LINES * 2:
+        return lines[:_LINES], lines[-_LINES:]
+    return lines, []
+
+
 class VariableManager(plugin.DocumentPlugin):
     """Caches variables in the document and monitors for changes.
 
@@ -89,6 +109,9 @@ class VariableManager(plugin.DocumentPlugin):
 
     def __init__(self, doc):
         self._updateTimer = QTimer(singleShot=True, timeout=self.slotTimeout)
+        self._head = {}         # variables in the first _LINES blocks
+        self._tail = None       # in the last _LINES blocks, None if all blocks are in head
+        self._readHead = self._readTail = True
         self._variables = self.readVariables()
         if doc.__class__ == document.EditorDocument:
             doc.contentsChange.connect(self.slotContentsChange)
@@ -101,9 +124,23 @@ class VariableManager(plugin.DocumentPlugin):
             self.changed()
 
     def slotContentsChange(self, position, removed, added):
-        """Called if the document changes."""
-        if (self.document().findBlock(position).blockNumber() < _LINES or
-            self.document().findBlock(position + added).blockNumber() > self.document().blockCount() - _LINES):
+        """Called if the document changes, reads the variables again if needed.
+
+        Only the first or last _LINES blocks are read again, and only if the
+        change touches them.
+
+        """
+        doc = self.document()
+        count = doc.blockCount()
+        if count <= _LINES * 2 or self._tail is None:
+            self._readHead = self._readTail = True
+        else:
+            end = min(position + added, doc.characterCount() - 1)
+            if doc.findBlock(position).blockNumber() < _LINES:
+                self._readHead = True
+            if doc.findBlock(end).blockNumber() >= count - _LINES:
+                self._readTail = True
+        if self._readHead or self._readTail:
             self._updateTimer.start(500)
 
     def variables(self):
@@ -115,20 +152,33 @@ class VariableManager(plugin.DocumentPlugin):
         return self._variables
 
     def readVariables(self):
-        """Reads the variables from the document and returns a dictionary. Internal."""
-        count = self.document().blockCount()
-        blocks = [self.document().firstBlock()]
-        if count > _LINES * 2:
-            blocks.append(self.document().findBlockByNumber(count - _LINES))
-            count = _LINES
+        """Reads the variables from the document and returns a dictionary. Internal.
+
+        Only the first or last _LINES blocks that changed are read again.
+
+        """
+        doc = self.document()
+        count = doc.blockCount()
+        if count <= _LINES * 2:
+            self._head = self._read(doc.firstBlock(), count)
+            self._tail = None
+        else:
+            if self._readHead or self._tail is None:
+                self._head = self._read(doc.firstBlock(), _LINES)
+            if self._readTail or self._tail is None:
+                self._tail = self._read(doc.findBlockByNumber(count - _LINES), _LINES)
+        self._readHead = self._readTail = False
+        variables = dict(self._head)
+        variables.update(self._tail or {})
+        return variables
+
+    def _read(self, block, count):
+        """Returns the variables in count blocks, starting with block."""
         def lines(block):
             for i in range(count):
                 yield block.text()
                 block = block.next()
-        variables = {}
-        for block in blocks:
-            variables.update(m.group(1, 2) for n, m in positions(lines(block)))
-        return variables
+        return dict(m.group(1, 2) for n, m in positions(lines(block)))
 
 
 def positions(lines):
@@ -27,7 +27,8 @@ has support for showing multiple Views in a window.
 
 import weakref
 
-from PyQt5.QtCore import QEvent, QMimeData, QSettings, Qt, QTimer, pyqtSignal
+from PyQt5.QtCore import (
+    QEvent, QMimeData, QPoint, QSettings, Qt, QTimer, pyqtSignal)
 from PyQt5.QtGui import (
     QContextMenuEvent, QKeySequence, QPainter, QTextCursor, QCursor)
 from PyQt5.QtWidgets import QApplication, QPlainTextEdit, QToolTip
@@ -36,6 +37,7 @@ import app
 import metainfo
 import textformats
 import cursortools
+import highlighter
 import variables
 import cursorkeys
 import open_file_at_cursor
@@ -66,10 +68,13 @@ class View(QPlainTextEdit):
         # restore saved cursor position (defaulting to 0)
         document.loaded.connect(self.restoreCursor)
         document.loaded.connect(self.setTabWidth)
+        document.loaded.connect(self.slotDocumentLoaded)
         document.closed.connect(self.slotDocumentClosed)
         self.textChanged.connect(self.invalidateCurrentBlock)
+        self.updateRequest.connect(self.ensureVisibleBlocksHighlighted)
         variables.manager(document).changed.connect(self.setTabWidth)
         self.restoreCursor()
+        self.setReadOnly(document.isLazy())
         app.settingsChanged.connect(self.readSettings)
         self.readSettings() # will also call updateCursor
         # line wrap preference is only read on init
@@ -190,6 +195,13 @@ class View(QPlainTextEdit):
         else:
             super(View, self).dropEvent(ev)
 
+    def ensureVisibleBlocksHighlighted(self):
+        """Lex the visible blocks first if the highlighter has pending blocks."""
+        hl = highlighter.highlighter(self.document())
+        if hl.isPending():
+            bottom = self.cursorForPosition(QPoint(0, self.viewport().height()))
+            hl.ensureHighlighted(bottom.block())
+
     def paintEvent(self, ev):
         """Reimplemented to paint a cursor if we have no focus."""
         super(View, self).paintEvent(ev)
@@ -232,6 +244,10 @@ class View(QPlainTextEdit):
         self.setPalette(data.palette())
         self.setTabWidth()
 
+    def slotDocumentLoaded(self):
+        """Make the view editable once a lazy document has been loaded."""
+        self.setReadOnly(self.document().isLazy())
+
     def slotDocumentClosed(self):
         """Store the current cursor position in a document on close"""
         if self.hasFocus():
@@ -19,67 +19,12 @@
 
 """
 Handles Point and Click.
-"""
-
-
-
-import re
-import os
-import sys
-import weakref
-
-import qpageview.locking
-
-import util
-import textedit
-import pointandclick
-
-
-# cache point and click handlers for poppler documents
-_cache = weakref.WeakKeyDictionary()
-
-
-def links(document):
-    try:
-        return _cache[document]
-    except KeyError:
-        l = _cache[document] = Links()
-        with l:
-            import popplerqt5
-            with qpageview.locking.lock(document):
-                for num in range(document.numPages()):
-                    page = document.page(num)
-                    for link in page.links():
-                        if isinstance(link, popplerqt5.Poppler.LinkBrowse):
-                            t = textedit.link(link.url())
-                            if t:
-                                filename = util.normpath(t.filename)
-                                l.add_link(filename, t.line, t.column, (num, link.linkArea()))
-        return l
-
-
-class Links(pointandclick.Links):
-    """Stores all the links of a Poppler document sorted by URL and text position.
-
-    Only textedit:// urls are stored.
-
-    """
-    def cursor(self, link, load=False):
-        """Returns the destination of a link as a QTextCursor of the destination document.
-
-        If load (defaulting to False) is True, the document is loaded if it is not yet loaded.
-        Returns None if the url was not valid or the document could not be loaded.
-
-        """
-        import qpageview.link
-        if not isinstance(link, qpageview.link.Link) or not link.url:
-            return
-        t = textedit.link(link.url)
-        if t:
-            filename = util.normpath(t.filename)
-            return super(Links, self).cursor(filename, t.line, t.column, load)
 
+The viewers use the same point and click handling as the Music View,
+see musicview/pointandclick.py.
+"""
 
-positions = pointandclick.positions
 
+from musicview.pointandclick import links, positions
 
+__all__ = ['links', 'positions']
@@ -165,7 +165,7 @@ class AbstractPopplerWidget(abstractviewwidget.AbstractViewWidget):
             document = doc.document()
             doc.ispresent = True
             if document:
-                self._links = pointandclick.links(document)
+                self._links = pointandclick.links(document, doc.filename())
         except OSError:
             # the file is not found on the given path
             dlg = widgets.dialog.Dialog(buttons=('yes', 'no'))
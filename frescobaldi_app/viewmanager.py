@@ -31,8 +31,8 @@ import weakref
 from PyQt5.QtCore import QEvent, Qt, pyqtSignal
 from PyQt5.QtGui import QKeySequence, QPixmap
 from PyQt5.QtWidgets import (
-    QAction, QHBoxLayout, QLabel, QMenu, QProgressBar, QSplitter,
-    QStackedWidget, QVBoxLayout, QWidget)
+    QAction, QHBoxLayout, QLabel, QMenu, QMessageBox, QProgressBar,
+    QSplitter, QStackedWidget, QVBoxLayout, QWidget)
 
 import actioncollection
 import app
@@ -144,6 +144,16 @@ class ViewSpace(QWidget):
                 self.views.remove(view)
                 break
         else:
+            try:
+                doc.loadLazy()
+            except IOError as e:
+                # the view stays read-only until the document is reloaded
+                filename = doc.url().toLocalFile()
+                msg = _("{message}\n\n{strerror} ({errno})").format(
+                    message = _("Could not read from: {url}").format(url=filename),
+                    strerror = e.strerror,
+                    errno = e.errno)
+                QMessageBox.critical(self, app.caption(_("Error")), msg)
             view = view_.View(doc)
             self.stack.addWidget(view)
         self.views.append(view)